@@ -3,6 +3,8 @@ import random
 import shutil
 from PIL import Image
 from tqdm import tqdm
+import DatasetGenerator
+from DatasetGenerator import save_image
 
 # --- CONFIGURATION ---
 BACKGROUND_DIR = 'HomeAssignment/Dataset/wallpaper_dataset'   # Your downloaded wallpapers
@@ -19,6 +21,7 @@ TOTAL_EMPTY_IMAGES = 500
 
 WINDOW_SCALE_MIN = 0.3
 WINDOW_SCALE_MAX = 0.8
+OUTPUT_ENCODING = DatasetGenerator.OUTPUT_ENCODING   # DatasetGenerator.save_image settings - see EncodingBenchmark.py
 # ---------------------
 
 def setup_directories():
@@ -112,7 +115,7 @@ def generate_dataset():
                     
                     # Save
                     final_name = f"pos_{global_count:06d}"
-                    comp.convert("RGB").save(f"{OUTPUT_BASE}/images/train/{final_name}.jpg")
+                    save_image(comp, f"{OUTPUT_BASE}/images/train/{final_name}", OUTPUT_ENCODING)
 
                     # Label
                     bbox = convert_to_yolo(bg_w, bg_h, px, py, px+new_w, py+new_h)
@@ -134,7 +137,7 @@ def generate_dataset():
             bg = Image.open(bg_path).convert("RGB")
             
             final_name = f"neg_{i:06d}"
-            bg.save(f"{OUTPUT_BASE}/images/train/{final_name}.jpg")
+            save_image(bg, f"{OUTPUT_BASE}/images/train/{final_name}", OUTPUT_ENCODING)
             
             # Create EMPTY label file
             with open(f"{OUTPUT_BASE}/labels/train/{final_name}.txt", 'w') as f:
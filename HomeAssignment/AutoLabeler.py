@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from SampleMetadata import MetadataWriter
+from VideoIndex import IndexStore, extract_frames, frame_filename
+
+# Pseudo-labels for real screen recordings. The current model labels frames
+# sampled every FRAME_INTERVAL seconds; confident frames become training samples
+# in the images/{split} + labels/{split} layout of DatasetGenerator.process_partition,
+# uncertain ones go to a review queue instead.
+#
+# Throughput for hours of footage:
+#   - a decode thread seeks through the video with the keyframe index (VideoIndex)
+#     and hashes every sampled frame; near-identical frames (static screen) are
+#     dropped before they ever reach the model
+#   - the main thread runs batched inference while the decode thread fills the
+#     next batch (cv2 decoding and torch inference both release the GIL)
+#   - JPEG/label writing runs on a small thread pool
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'HomeAssignment/AI Models/FinalAIModel/weights/best.pt'
+RECORDINGS = ['HomeAssignment/test.mkv', 'output_1fps.mp4']
+OUTPUT_BASE = 'HomeAssignment/Dataset/PseudoLabels'
+SPLIT = 'train'
+
+FRAME_INTERVAL = 2.0          # Seconds between sampled frames
+BATCH_SIZE = 16
+IMG_SIZE = 640
+PREFETCH_BATCHES = 2          # Decoded batches allowed to wait for the model
+
+ACCEPT_CONFIDENCE = 0.7       # Every detection of a frame at or above this -> training sample
+DETECT_CONFIDENCE = 0.05      # Any detection between this and ACCEPT_CONFIDENCE -> review queue
+NEGATIVE_EVERY = 10           # Keep every Nth frame with nothing above DETECT_CONFIDENCE as a negative (0 = none)
+
+HASH_SIZE = 16                # Difference hash of a HASH_SIZE x HASH_SIZE grid (256 bits)
+DEDUP_DISTANCE = 2            # Max differing bits between hashes of "the same" frame (synthetic 1080p desktop:
+                              # static/cursor-only frames dropped 40/40, a new 400x350 window 0/40, 200x150 9/40)
+DEDUP_WINDOW = 64             # How many recently kept frames a new frame is compared with
+WRITE_WORKERS = 2
+JPEG_QUALITY = 95
+# ---------------------
+
+def frame_hash(frame, size=HASH_SIZE):
+    """
+    Difference hash: sign of horizontal gradients on a (size + 1) x size grayscale
+    thumbnail, packed into bytes. A 16 x 16 grid gives every bit a ~1/256 screen
+    cell, so a window opening in part of the screen still flips enough bits.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+class Deduper:
+    """Remembers the hashes of the last `window` kept frames; a frame within max_distance bits of one is a duplicate."""
+    def __init__(self, max_distance=DEDUP_DISTANCE, window=DEDUP_WINDOW):
+        self.max_distance = max_distance
+        self.recent = deque(maxlen=window)
+
+    def is_duplicate(self, h):
+        if self.recent:
+            xor = np.bitwise_xor(np.stack(self.recent), h)
+            if np.unpackbits(xor, axis=1).sum(axis=1).min() <= self.max_distance:
+                return True
+        self.recent.append(h)
+        return False
+
+def _decode(paths, frame_interval, dedup_distance, out_queue, stats, stop):
+    """Decode thread: sampled, deduplicated frames -> out_queue as (path, frame, seconds, image); None at the end."""
+    store = IndexStore()
+    try:
+        for path in paths:
+            if not os.path.exists(path):
+                print(f"  [Warning] {path} not found - skipped.")
+                continue
+            index = store.get(path)
+            frames = np.unique(index.frames_at(np.arange(0, index.duration, frame_interval)))
+            deduper = Deduper(dedup_distance)
+            for frame, image in extract_frames(path, frames, index):
+                if stop.is_set():
+                    return
+                stats['decoded'] += 1
+                if deduper.is_duplicate(frame_hash(image)):
+                    stats['duplicates'] += 1
+                    continue
+                out_queue.put((path, frame, (index.pts[frame] - index.pts[0]) / 1000, image))
+    finally:
+        store.close()
+        out_queue.put(None)
+
+def _write_sample(image_path, label_path, image, lines):
+    if not cv2.imwrite(image_path, image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]):
+        raise OSError(f"Could not write {image_path}")
+    with open(label_path, 'w') as f:
+        f.write(''.join(lines))
+
+def _yolo_lines(cls, boxes):
+    """Normalised xyxy -> YOLO 'cls xc yc w h' lines."""
+    return [f"{int(c)} {(x1 + x2) / 2:.6f} {(y1 + y2) / 2:.6f} {x2 - x1:.6f} {y2 - y1:.6f}\n"
+            for c, (x1, y1, x2, y2) in zip(cls, boxes)]
+
+def label_recordings(paths=RECORDINGS, model_path=MODEL_PATH, output_base=OUTPUT_BASE, split=SPLIT,
+                     frame_interval=FRAME_INTERVAL, batch_size=BATCH_SIZE, dedup_distance=DEDUP_DISTANCE, model=None):
+    """
+    Labels the recordings into output_base. Returns the stats Counter.
+    Review candidates are written to output_base/review/{images,labels} with the
+    model's proposed boxes, and listed (most uncertain first) in review/queue.json.
+    """
+    if model is None:
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+    names = model.names
+
+    img_dir, lbl_dir = f"{output_base}/images/{split}", f"{output_base}/labels/{split}"
+    review_dir = f"{output_base}/review"
+    for d in (img_dir, lbl_dir, f"{review_dir}/images", f"{review_dir}/labels"):
+        os.makedirs(d, exist_ok=True)
+
+    stats = Counter()
+    frames_queue = queue.Queue(maxsize=batch_size * PREFETCH_BATCHES)
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode, args=(paths, frame_interval, dedup_distance, frames_queue, stats, stop),
+                               name='autolabel-decode', daemon=True)
+    writer = ThreadPoolExecutor(max_workers=WRITE_WORKERS, thread_name_prefix='autolabel-write')
+    review, pending_writes = [], []
+    negatives_seen = 0
+    wait_time = infer_time = 0.0
+    start = time.perf_counter()
+
+    def handle(batch):
+        nonlocal negatives_seen, infer_time
+        t0 = time.perf_counter()
+        # Low threshold: a frame only counts as empty if the model sees nothing at all worth reviewing
+        results = model([item[3] for item in batch], conf=DETECT_CONFIDENCE, imgsz=IMG_SIZE, verbose=False)
+        infer_time += time.perf_counter() - t0
+        stats['inferred'] += len(batch)
+
+        for (path, frame, seconds, image), r in zip(batch, results):
+            conf = r.boxes.conf.cpu().numpy()
+            cls = r.boxes.cls.cpu().numpy().astype(int)
+            boxes = r.boxes.xyxyn.cpu().numpy()
+            name = os.path.splitext(frame_filename(path, frame))[0]
+            h, w = image.shape[:2]
+            uncertain = conf < ACCEPT_CONFIDENCE
+
+            if uncertain.any():
+                stats['review'] += 1
+                pending_writes.append(writer.submit(_write_sample, f"{review_dir}/images/{name}.jpg",
+                                                    f"{review_dir}/labels/{name}.txt", image, _yolo_lines(cls, boxes)))
+                review.append({'name': name, 'video': path, 'frame': int(frame), 'seconds': round(float(seconds), 2),
+                               'uncertainty': float(np.max(ACCEPT_CONFIDENCE - conf[uncertain])),
+                               'detections': [[names[int(c)], round(float(p), 3)] for c, p in zip(cls, conf)]})
+                continue
+            if not len(conf):
+                negatives_seen += 1
+                if not NEGATIVE_EVERY or negatives_seen % NEGATIVE_EVERY:
+                    continue
+                stats['negatives'] += 1
+                meta.add(name, bg_path=path, bg_w=w, bg_h=h, negative=1)
+            else:
+                stats['accepted'] += 1
+                # The sidecar has one box per sample: it records the most confident one, the label file has them all
+                main = int(np.argmax(conf))
+                x1, y1, x2, y2 = boxes[main]
+                meta.add(name, class_name=names[int(cls[main])], class_id=int(cls[main]), bg_path=path, bg_w=w, bg_h=h,
+                         box_w=int((x2 - x1) * w), box_h=int((y2 - y1) * h))
+            pending_writes.append(writer.submit(_write_sample, f"{img_dir}/{name}.jpg", f"{lbl_dir}/{name}.txt",
+                                                image, _yolo_lines(cls, boxes)))
+        # Don't let finished write futures (and the frames they hold) pile up - but surface their errors
+        still_running = []
+        for f in pending_writes:
+            if f.done():
+                f.result()
+            else:
+                still_running.append(f)
+        pending_writes[:] = still_running
+
+    # Images and labels accumulate in the split across runs, so the sidecar (and review queue) must as well
+    with MetadataWriter(output_base, split, append=True) as meta:
+        decoder.start()
+        batch = []
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = frames_queue.get()
+                wait_time += time.perf_counter() - t0
+                if item is None:
+                    break
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    handle(batch)
+                    batch = []
+            if batch:
+                handle(batch)
+        finally:
+            stop.set()
+            while decoder.is_alive():            # Unblock the decode thread if it is waiting on a full queue
+                try:
+                    frames_queue.get_nowait()
+                except queue.Empty:
+                    decoder.join(0.1)
+            writer.shutdown(wait=True)
+        for f in pending_writes:
+            f.result()                            # Raises if a final image/label write failed
+
+    queue_path = f"{review_dir}/queue.json"
+    if os.path.exists(queue_path):
+        with open(queue_path) as f:
+            new = {r['name'] for r in review}
+            review += [r for r in json.load(f) if r['name'] not in new]
+    review.sort(key=lambda r: r['uncertainty'], reverse=True)
+    with open(queue_path, 'w') as f:
+        json.dump(review, f, indent=1)
+    with open(f"{output_base}/pseudo_labels.yaml", 'w') as f:
+        f.write(f"path: {os.path.abspath(output_base)}\ntrain: images/{split}\nval: images/{split}\n\n"
+                f"nc: {len(names)}\nnames: {[names[i] for i in sorted(names)]}\n")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n--- AUTO-LABELING ({len(paths)} recordings, one frame every {frame_interval:g} s) ---")
+    print(f"  sampled {stats['decoded']}, near-duplicates skipped {stats['duplicates']}, inferred {stats['inferred']}")
+    print(f"  accepted {stats['accepted']}, negatives {stats['negatives']}, to review {stats['review']} "
+          f"(queue: {review_dir}/queue.json)")
+    print(f"  {elapsed:.1f} s total, {stats['inferred'] / max(elapsed, 1e-9):.1f} frames/s; "
+          f"model {infer_time:.1f} s, waiting for frames {wait_time:.1f} s")
+    return stats
+
+if __name__ == "__main__":
+    label_recordings()
@@ -3,6 +3,8 @@ import random
 import shutil
 from PIL import Image
 from tqdm import tqdm
+import DatasetGenerator
+from DatasetGenerator import save_image
 
 # --- CONFIGURATION ---
 BACKGROUND_DIR = 'HomeAssignment/Dataset/wallpaper_dataset'
@@ -24,6 +26,7 @@ NEGATIVES_COUNT = 500       # Empty wallpapers
 
 SCALE_MIN = 0.3
 SCALE_MAX = 0.8
+OUTPUT_ENCODING = DatasetGenerator.OUTPUT_ENCODING   # DatasetGenerator.save_image settings - see EncodingBenchmark.py
 # ---------------------
 
 def setup_directories():
@@ -113,7 +116,7 @@ def process_partition(split_name, fg_root, bg_images, class_map, copies_per_img)
 
                     # Save
                     fname = f"{split_name}_{class_name}_{global_count:06d}"
-                    final_img.convert("RGB").save(f"{OUTPUT_BASE}/images/{split_name}/{fname}.jpg")
+                    save_image(final_img, f"{OUTPUT_BASE}/images/{split_name}/{fname}", OUTPUT_ENCODING)
                     
                     # Label
                     bbox = convert_to_yolo(bg_w, bg_h, x1, y1, x2, y2)
@@ -136,7 +139,7 @@ def process_partition(split_name, fg_root, bg_images, class_map, copies_per_img)
                 final_img, _ = paste_window(bg, dist_img, SCALE_MIN, SCALE_MAX)
                 
                 fname = f"{split_name}_distractor_{global_count:06d}"
-                final_img.convert("RGB").save(f"{OUTPUT_BASE}/images/{split_name}/{fname}.jpg")
+                save_image(final_img, f"{OUTPUT_BASE}/images/{split_name}/{fname}", OUTPUT_ENCODING)
                 
                 # EMPTY LABEL FILE -> "Nothing to see here"
                 with open(f"{OUTPUT_BASE}/labels/{split_name}/{fname}.txt", 'w') as f: pass
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import random
+import shutil
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+from tqdm import tqdm
+
+import DatasetGenerator
+from DatasetGenerator import get_images, get_RGBA_image, paste_window_safe, convert_to_yolo, save_image
+
+# What does the output encoding of the generators (DatasetGenerator.save_image)
+# cost and buy? For every setting below, the same seeded composites are encoded
+# and we report:
+#   encode   - ms per image to write it (paid once per generated sample)
+#   decode   - ms per image for cv2.imread, which is what the training dataloader pays every epoch
+#   size     - KB per image on disk
+#   PSNR     - fidelity to the uncompressed composite
+#   mAP50    - optional (RUN_MAP): a short training run per setting, all scored on the same
+#              losslessly stored test set, so only the training images' encoding differs
+
+# --- CONFIGURATION ---
+BENCH_DIR = 'HomeAssignment/Dataset/EncodingBenchmark'
+RESULTS_FILE = f'{BENCH_DIR}/results.json'
+N_SAMPLES = 100                  # Composites for the speed/size/PSNR measurements
+SEED = 0
+SETTINGS = {
+    'jpg q75 (PIL default)': {'format': 'jpg', 'quality': 75, 'subsampling': '4:2:0', 'optimize': False, 'progressive': False},
+    'jpg q90':               {'format': 'jpg', 'quality': 90, 'subsampling': '4:2:0', 'optimize': False, 'progressive': False},
+    'jpg q95 4:4:4':         {'format': 'jpg', 'quality': 95, 'subsampling': '4:4:4', 'optimize': False, 'progressive': False},
+    'jpg q90 optimized':     {'format': 'jpg', 'quality': 90, 'subsampling': '4:2:0', 'optimize': True, 'progressive': False},
+    'jpg q90 progressive':   {'format': 'jpg', 'quality': 90, 'subsampling': '4:2:0', 'optimize': True, 'progressive': True},
+    'webp q80':              {'format': 'webp', 'quality': 80, 'method': 4},
+    'webp q90 fast':         {'format': 'webp', 'quality': 90, 'method': 0},
+    'webp lossless':         {'format': 'webp', 'lossless': True, 'quality': 0, 'method': 0},
+    'png level 1':           {'format': 'png', 'compress_level': 1},
+    'bmp (raw)':             {'format': 'bmp'},
+}
+BASELINE = 'jpg q75 (PIL default)'
+
+RUN_MAP = False                  # Trains one small model per setting - hours on CPU
+MAP_TRAIN_SAMPLES = 1000
+MAP_TEST_SAMPLES = 200
+MAP_EPOCHS = 10
+MAP_BASE_MODEL = 'yolo11n.pt'
+# ---------------------
+
+# --- SAMPLES ---
+
+def _synthetic_sources(rng, size=(1920, 1080)):
+    """Screen-like stand-ins when the real wallpapers/foregrounds are missing: a blurred wallpaper and a text window."""
+    bg = Image.fromarray(rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)).resize(size, Image.Resampling.BICUBIC)
+    bg = bg.filter(ImageFilter.GaussianBlur(8)).convert("RGBA")
+    fg = Image.new("RGBA", (1200, 800), (250, 250, 250, 255))
+    draw = ImageDraw.Draw(fg)
+    draw.rectangle((0, 0, 1200, 48), fill=tuple(int(v) for v in rng.integers(0, 255, 3)) + (255,))
+    for y in range(80, 780, 22):
+        draw.rectangle((40, y, 40 + int(rng.integers(200, 1100)), y + 10), fill=(60, 60, 60, 255))
+    return bg, fg
+
+def iter_samples(n, seed=SEED, fg_root=DatasetGenerator.FOREGROUND_ROOT_TRAIN):
+    """n seeded composites as (RGB image, YOLO label line) - identical for every setting and every call."""
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    backgrounds = get_images(DatasetGenerator.BACKGROUND_DIR)
+    class_names = sorted(DatasetGenerator.TARGET_CLASSES)
+    foregrounds = [(i, p) for i, name in enumerate(class_names) for p in get_images(os.path.join(fg_root, name))]
+    if not backgrounds or not foregrounds:
+        print("No wallpapers/foregrounds found - using synthetic screens.")
+    for _ in range(n):
+        if backgrounds and foregrounds:
+            class_id, fg_path = random.choice(foregrounds)
+            bg, fg = get_RGBA_image(random.choice(backgrounds)), get_RGBA_image(fg_path)
+        else:
+            class_id = 0
+            bg, fg = _synthetic_sources(rng)
+        img, (x1, y1, x2, y2), _ = paste_window_safe(bg, fg, DatasetGenerator.SCALE_MIN, DatasetGenerator.SCALE_MAX)
+        xc, yc, w, h = convert_to_yolo(img.width, img.height, x1, y1, x2, y2)
+        yield img.convert("RGB"), f"{class_id} {xc:.6f} {yc:.6f} {w:.6f} {h:.6f}\n"
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255 ** 2 / mse))
+
+# --- MEASUREMENTS ---
+
+def measure(samples, encoding, out_dir):
+    """Encode/decode times, size and PSNR of one setting over the samples."""
+    os.makedirs(out_dir, exist_ok=True)
+    encode = decode = size = 0.0
+    quality = []
+    for i, (img, _) in enumerate(samples):
+        t0 = time.perf_counter()
+        ext = save_image(img, os.path.join(out_dir, f"{i:05d}"), encoding)
+        encode += time.perf_counter() - t0
+        path = os.path.join(out_dir, f"{i:05d}.{ext}")
+        size += os.path.getsize(path)
+        t0 = time.perf_counter()
+        decoded = cv2.imread(path)
+        decode += time.perf_counter() - t0
+        quality.append(psnr(np.asarray(img)[:, :, ::-1], decoded))
+    n = len(samples)
+    finite = [q for q in quality if np.isfinite(q)]
+    return {'encode_ms': encode / n * 1000, 'decode_ms': decode / n * 1000, 'size_kb': size / n / 1024,
+            'psnr': float(np.mean(finite)) if finite else float('inf')}
+
+def _write_split(samples, root, split, encoding):
+    os.makedirs(f'{root}/images/{split}', exist_ok=True)
+    os.makedirs(f'{root}/labels/{split}', exist_ok=True)
+    for i, (img, line) in enumerate(samples):
+        save_image(img, f'{root}/images/{split}/{split}_{i:05d}', encoding)
+        with open(f'{root}/labels/{split}/{split}_{i:05d}.txt', 'w') as f:
+            f.write(line)
+
+def measure_map(name, encoding):
+    """Short seeded training run on images stored with `encoding`, scored on a lossless test set."""
+    from ultralytics import YOLO
+    from Evaluator import Evaluation
+    root = os.path.abspath(f'{BENCH_DIR}/map/{name.replace(" ", "_")}')
+    shutil.rmtree(root, ignore_errors=True)
+    # Regenerated per setting from the same seeds (a thousand full-HD composites don't fit in memory)
+    _write_split(iter_samples(MAP_TRAIN_SAMPLES, SEED + 1), root, 'train', encoding)
+    _write_split(iter_samples(MAP_TEST_SAMPLES, SEED + 2, DatasetGenerator.FOREGROUND_ROOT_TEST), root, 'test',
+                 {'format': 'png', 'compress_level': 1})
+    class_names = sorted(DatasetGenerator.TARGET_CLASSES)
+    data_yaml = f'{root}/data.yaml'
+    with open(data_yaml, 'w') as f:
+        f.write(f"path: {root}\ntrain: images/train\nval: images/test\ntest: images/test\n\n"
+                f"nc: {len(class_names)}\nnames: {class_names}\n")
+    model = YOLO(MAP_BASE_MODEL)
+    model.train(data=data_yaml, epochs=MAP_EPOCHS, imgsz=640, batch=16, seed=SEED, deterministic=True,
+                project=root, name='run', exist_ok=True, verbose=False, plots=False)
+    report = Evaluation(f'{root}/run/weights/best.pt', data_yaml, split='test').evaluate(verbose=False)
+    return report['overall']['mAP50']
+
+def run(settings=SETTINGS, n_samples=N_SAMPLES, run_map=RUN_MAP):
+    samples = list(iter_samples(n_samples))
+    print(f"\nEncoding {len(samples)} composites ({samples[0][0].width}x{samples[0][0].height}) per setting...")
+    results = {}
+    for name, encoding in tqdm(settings.items()):
+        results[name] = measure(samples, encoding, f'{BENCH_DIR}/speed/{name.replace(" ", "_")}')
+    shutil.rmtree(f'{BENCH_DIR}/speed', ignore_errors=True)
+
+    if run_map:
+        for name, encoding in settings.items():
+            results[name]['map50'] = measure_map(name, encoding)
+
+    base = results.get(BASELINE)
+    print(f"\n--- OUTPUT ENCODING ({len(samples)} images, seed {SEED}) ---")
+    print(f"  {'setting':<24}{'encode ms':>10}{'decode ms':>10}{'KB/img':>9}{'size':>7}{'PSNR dB':>9}{'mAP50':>8}")
+    for name, r in results.items():
+        rel = f"{r['size_kb'] / base['size_kb']:.2f}x" if base else ''
+        map50 = f"{r['map50']:.4f}" if 'map50' in r else '-'
+        print(f"  {name:<24}{r['encode_ms']:>10.1f}{r['decode_ms']:>10.1f}{r['size_kb']:>9.0f}{rel:>7}"
+              f"{r['psnr']:>9.1f}{map50:>8}")
+    print("  Set DatasetGenerator.OUTPUT_ENCODING to the chosen settings.")
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump({'seed': SEED, 'samples': len(samples), 'settings': settings, 'results': results}, f, indent=1)
+    return results
+
+if __name__ == "__main__":
+    run()
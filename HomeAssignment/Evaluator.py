@@ -0,0 +1,359 @@
+import os
+import json
+import hashlib
+import multiprocessing as mp
+import numpy as np
+import yaml
+from tqdm import tqdm
+import SampleMetadata
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'HomeAssignment/AI Models/FinalAIModel/weights/best.pt'
+DATA_YAML = 'HomeAssignment/finalDataset.yaml'
+SPLIT = 'test'
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cache', 'predictions')   # Same for notebooks run from HomeAssignment/
+
+NUM_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+CHUNK_SIZE = 32       # Images handed to a worker at a time
+IMG_SIZE = 640
+
+# Predictions are cached at a very low confidence so any threshold can be re-applied later
+CACHE_CONFIDENCE = 0.001
+CONFIDENCE_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.5
+# ---------------------
+
+IOU_RANGE = np.linspace(0.5, 0.95, 10)  # COCO style mAP@50-95 thresholds
+
+def hash_file(path, block_size=1 << 20):
+    """SHA256 of a file, used to key the prediction cache to an exact set of weights."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_dataset_config(data_yaml):
+    with open(data_yaml, 'r') as f:
+        return yaml.safe_load(f)
+
+def get_split_dirs(data_cfg, split):
+    """Returns (images_dir, labels_dir) for a split, following the generators' images/labels layout."""
+    rel = data_cfg.get(split, f'images/{split}')
+    images_dir = os.path.join(data_cfg['path'], rel)
+    labels_dir = os.path.join(data_cfg['path'], rel.replace('images', 'labels', 1))
+    return images_dir, labels_dir
+
+def get_images(folder):
+    if not os.path.exists(folder): return []
+    valid = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(valid))
+
+def sample_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+# https://roboflow.com/formats/yolo
+def yolo_to_xyxy(xc, yc, w, h):
+    return xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2
+
+def load_ground_truth(labels_dir, names):
+    """Reads every YOLO label file into {name: (classes[N], boxes[N, 4] normalized xyxy)}."""
+    gt = {}
+    for name in names:
+        classes, boxes = [], []
+        label_path = os.path.join(labels_dir, f"{name}.txt")
+        if os.path.exists(label_path):
+            with open(label_path, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 5: continue
+                    classes.append(int(parts[0]))
+                    boxes.append(yolo_to_xyxy(*map(float, parts[1:])))
+        gt[name] = (np.array(classes, dtype=np.int64), np.array(boxes, dtype=np.float64).reshape(-1, 4))
+    return gt
+
+def get_sample_tags(name, sidecar):
+    """
+    Augmentation tags for one sample. The generators record these per sample;
+    older datasets without a sidecar fall back to what the file name tells us.
+    """
+    if name in sidecar:
+        return sidecar[name]
+    return ['negative'] if '_neg_' in name else ['plain']
+
+def load_sidecar(dataset_root, split):
+    """Loads the per-split augmentation tags from the generation metadata (if present)."""
+    try:
+        return SampleMetadata.load_tags(dataset_root, split)
+    except FileNotFoundError:
+        return {}
+
+# --- PARALLEL INFERENCE ---
+
+_worker_model = None
+
+def _init_worker(model_path, torch_threads):
+    """Loads the model once per worker process (not once per image)."""
+    global _worker_model
+    import torch
+    from ultralytics import YOLO
+    torch.set_num_threads(torch_threads)
+    _worker_model = YOLO(model_path)
+
+def _predict_chunk(paths):
+    out = {}
+    results = _worker_model(paths, conf=CACHE_CONFIDENCE, imgsz=IMG_SIZE, verbose=False)
+    for path, r in zip(paths, results):
+        boxes = r.boxes
+        out[sample_name(path)] = {
+            'cls': boxes.cls.cpu().numpy().astype(int).tolist(),
+            'conf': boxes.conf.cpu().numpy().round(5).tolist(),
+            'xyxyn': boxes.xyxyn.cpu().numpy().round(6).tolist(),
+        }
+    return out
+
+def get_cache_path(model_hash, split, images_dir):
+    """One cache file per weights + image folder, so a different dataset with the same split name never shares it."""
+    dir_hash = hashlib.sha256(os.path.abspath(images_dir).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"{model_hash[:16]}_{split}_{dir_hash}_{IMG_SIZE}.json")
+
+def file_stamp(path):
+    """Size + mtime: regenerated datasets reuse the sample names, so the name alone can't identify the image."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def predict_split(model_path, image_paths, split, num_workers=NUM_WORKERS):
+    """
+    Runs inference over a split in parallel worker processes.
+    Results are cached to disk keyed by the weight hash and image folder; an
+    image is only sent through the model if it is not cached yet or its size
+    or mtime changed since it was predicted.
+    """
+    model_hash = hash_file(model_path)
+    images_dir = os.path.dirname(image_paths[0]) if image_paths else ''
+    cache_path = get_cache_path(model_hash, split, images_dir)
+
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+
+    stamps = {sample_name(p): file_stamp(p) for p in image_paths}
+    todo = [p for p in image_paths if cache.get(sample_name(p), {}).get('stamp') != stamps[sample_name(p)]]
+    stale = sum(1 for p in todo if sample_name(p) in cache)
+    print(f"Model {model_hash[:12]}: {len(image_paths) - len(todo)} cached, {len(todo)} to predict"
+          f"{f' ({stale} changed since they were cached)' if stale else ''}.")
+
+    if todo:
+        chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+        workers = max(1, min(num_workers, len(chunks)))
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+
+        with mp.Pool(workers, initializer=_init_worker, initargs=(model_path, torch_threads)) as pool:
+            for chunk_result in tqdm(pool.imap_unordered(_predict_chunk, chunks), total=len(chunks)):
+                for name, pred in chunk_result.items():
+                    pred['stamp'] = stamps[name]
+                cache.update(chunk_result)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f)
+
+    return {sample_name(p): cache[sample_name(p)] for p in image_paths}
+
+# --- METRICS ---
+
+def box_iou(a, b):
+    """Pairwise IoU between two sets of xyxy boxes -> [len(a), len(b)]."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def match_predictions(pred_cls, pred_conf, pred_boxes, gt_cls, gt_boxes, iou_thresholds):
+    """
+    Greedy (highest confidence first) matching of predictions to ground truth.
+    Returns a [n_pred, n_iou] boolean array of true positives.
+    """
+    tp = np.zeros((len(pred_cls), len(iou_thresholds)), dtype=bool)
+    if len(pred_cls) == 0 or len(gt_cls) == 0:
+        return tp
+
+    iou = box_iou(pred_boxes, gt_boxes)
+    iou[pred_cls[:, None] != gt_cls[None, :]] = 0
+    order = np.argsort(-pred_conf)
+
+    for t, thr in enumerate(iou_thresholds):
+        taken = np.zeros(len(gt_cls), dtype=bool)
+        for i in order:
+            candidates = np.where((iou[i] >= thr) & ~taken)[0]
+            if len(candidates):
+                best = candidates[np.argmax(iou[i, candidates])]
+                taken[best] = True
+                tp[i, t] = True
+    return tp
+
+def compute_ap(recall, precision):
+    """Area under the precision envelope (101-point interpolation, as COCO/ultralytics do)."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+    return trapezoid(np.interp(x, mrec, mpre), x)
+
+def build_match_table(predictions, gt, extra_iou=(IOU_THRESHOLD,)):
+    """
+    Flattens every cached prediction into arrays matched against ground truth at
+    all IoU thresholds. This is the only O(boxes) step; thresholds are applied afterwards.
+    """
+    names, cls, conf, tp, n_gt = [], [], [], [], {}
+    iou_thresholds = np.unique(np.round(np.concatenate((IOU_RANGE, extra_iou)), 4))
+
+    for name, (gt_cls, gt_boxes) in gt.items():
+        pred = predictions.get(name, {'cls': [], 'conf': [], 'xyxyn': []})
+        p_cls = np.array(pred['cls'], dtype=np.int64)
+        p_conf = np.array(pred['conf'], dtype=np.float64)
+        p_boxes = np.array(pred['xyxyn'], dtype=np.float64).reshape(-1, 4)
+
+        tp.append(match_predictions(p_cls, p_conf, p_boxes, gt_cls, gt_boxes, iou_thresholds))
+        names.extend([name] * len(p_cls))
+        cls.append(p_cls)
+        conf.append(p_conf)
+        for c in gt_cls:
+            n_gt[(name, int(c))] = n_gt.get((name, int(c)), 0) + 1
+
+    return {
+        'names': np.array(names),
+        'cls': np.concatenate(cls) if cls else np.zeros(0, dtype=np.int64),
+        'conf': np.concatenate(conf) if conf else np.zeros(0),
+        'tp': np.concatenate(tp) if tp else np.zeros((0, len(iou_thresholds)), dtype=bool),
+        'n_gt': n_gt,
+        'iou_thresholds': iou_thresholds,
+    }
+
+def compute_metrics(table, class_ids, sample_names=None, conf_threshold=CONFIDENCE_THRESHOLD, iou_threshold=IOU_THRESHOLD):
+    """
+    mAP50, mAP50-95, P, R and F1 per class from a match table, optionally
+    restricted to a subset of samples (e.g. only occluded ones).
+    """
+    keep = np.ones(len(table['cls']), dtype=bool)
+    if sample_names is not None:
+        keep = np.isin(table['names'], list(sample_names))
+    n_gt_items = [(k, v) for k, v in table['n_gt'].items() if sample_names is None or k[0] in sample_names]
+
+    thresholds = table['iou_thresholds']
+    t_sel = int(np.argmin(np.abs(thresholds - iou_threshold)))
+    t_range = np.isin(np.round(thresholds, 2), np.round(IOU_RANGE, 2))
+
+    per_class = {}
+    for c in class_ids:
+        mask = keep & (table['cls'] == c)
+        n_gt = sum(v for (_, k), v in n_gt_items if k == c)
+        conf = table['conf'][mask]
+        tp = table['tp'][mask]
+
+        order = np.argsort(-conf)
+        conf, tp = conf[order], tp[order]
+        ctp = np.cumsum(tp, axis=0)
+        cfp = np.cumsum(~tp, axis=0)
+
+        aps = np.zeros(len(thresholds))
+        if n_gt and len(conf):
+            recall = ctp / n_gt
+            precision = ctp / (ctp + cfp)
+            aps = np.array([compute_ap(recall[:, t], precision[:, t]) for t in range(len(thresholds))])
+
+        above = conf >= conf_threshold
+        n_tp = int(tp[above, t_sel].sum())
+        n_fp = int(above.sum()) - n_tp
+        p = n_tp / (n_tp + n_fp) if (n_tp + n_fp) else 0.0
+        r = n_tp / n_gt if n_gt else 0.0
+        f1 = 2 * p * r / (p + r) if (p + r) else 0.0
+
+        per_class[c] = {
+            'P': p, 'R': r, 'F1': f1,
+            'mAP50': float(aps[np.argmin(np.abs(thresholds - 0.5))]),
+            'mAP50-95': float(aps[t_range].mean()),
+            'TP': n_tp, 'FP': n_fp, 'GT': n_gt,
+        }
+    return per_class
+
+def summarize(per_class):
+    """Mean over classes that actually have ground truth in the subset."""
+    rows = [m for m in per_class.values() if m['GT'] > 0]
+    if not rows:
+        fp = sum(m['FP'] for m in per_class.values())
+        return {'P': 0.0, 'R': 0.0, 'F1': 0.0, 'mAP50': 0.0, 'mAP50-95': 0.0, 'TP': 0, 'FP': fp, 'GT': 0}
+    out = {k: float(np.mean([m[k] for m in rows])) for k in ('P', 'R', 'mAP50', 'mAP50-95')}
+    out['F1'] = 2 * out['P'] * out['R'] / (out['P'] + out['R']) if (out['P'] + out['R']) else 0.0
+    for k in ('TP', 'FP', 'GT'):
+        out[k] = sum(m[k] for m in per_class.values())
+    return out
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"  {'':<14}{'P':>8}{'R':>8}{'F1':>8}{'mAP50':>8}{'mAP50-95':>10}{'TP':>7}{'FP':>7}{'GT':>7}")
+    for label, m in rows.items():
+        print(f"  {label:<14}{m['P']:>8.4f}{m['R']:>8.4f}{m['F1']:>8.4f}{m['mAP50']:>8.4f}{m['mAP50-95']:>10.4f}"
+              f"{m['TP']:>7}{m['FP']:>7}{m['GT']:>7}")
+
+class Evaluation:
+    """
+    Holds the cached predictions and the match table for one model + split.
+    Re-scoring with a different confidence/IoU threshold never touches the model.
+    """
+    def __init__(self, model_path=MODEL_PATH, data_yaml=DATA_YAML, split=SPLIT, num_workers=NUM_WORKERS):
+        data_cfg = load_dataset_config(data_yaml)
+        self.class_names = data_cfg['names']
+        if isinstance(self.class_names, dict):
+            self.class_names = [self.class_names[k] for k in sorted(self.class_names)]
+
+        images_dir, labels_dir = get_split_dirs(data_cfg, split)
+        image_paths = get_images(images_dir)
+        names = [sample_name(p) for p in image_paths]
+
+        self.predictions = predict_split(model_path, image_paths, split, num_workers)
+        self.gt = load_ground_truth(labels_dir, names)
+        self.table = build_match_table(self.predictions, self.gt)
+
+        sidecar = load_sidecar(data_cfg['path'], split)
+        self.groups = {}
+        for name in names:
+            for tag in get_sample_tags(name, sidecar):
+                self.groups.setdefault(tag, set()).add(name)
+
+    def evaluate(self, conf_threshold=CONFIDENCE_THRESHOLD, iou_threshold=IOU_THRESHOLD, verbose=True):
+        # A new IoU only needs re-matching of the cached boxes, never re-inference
+        if not np.isclose(self.table['iou_thresholds'], iou_threshold).any():
+            extra = np.concatenate((self.table['iou_thresholds'], [iou_threshold]))
+            self.table = build_match_table(self.predictions, self.gt, extra)
+
+        class_ids = range(len(self.class_names))
+        per_class = compute_metrics(self.table, class_ids, None, conf_threshold, iou_threshold)
+
+        report = {
+            'overall': summarize(per_class),
+            'per_class': {self.class_names[c]: m for c, m in per_class.items()},
+            'per_augmentation': {},
+        }
+        for tag, names in sorted(self.groups.items()):
+            report['per_augmentation'][tag] = summarize(
+                compute_metrics(self.table, class_ids, names, conf_threshold, iou_threshold))
+
+        if verbose:
+            print(f"\n--- EVALUATION (conf={conf_threshold}, IoU={iou_threshold}) ---")
+            print_table("Per class:", {**report['per_class'], 'ALL': report['overall']})
+            print_table("Per augmentation:", report['per_augmentation'])
+        return report
+
+def main():
+    evaluation = Evaluation(MODEL_PATH, DATA_YAML, SPLIT)
+    evaluation.evaluate(CONFIDENCE_THRESHOLD, IOU_THRESHOLD)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import threading
+from collections import deque, Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from requests.adapters import HTTPAdapter
+
+# Detection events (class appeared / disappeared / dwell exceeded) sent from the
+# runners without ever blocking the inference loop:
+#   DetectionTracker  - per-class debounce: turns per-frame detections into events
+#   EventDispatcher   - bounded queue + one sender thread; publish() only appends under a lock
+#   *Sink             - pooled HTTP session with timeouts; Home Assistant or a plain webhook
+#   StubServer        - local stand-in for Home Assistant, for testing without one
+#
+# Credentials come from the environment (HA_URL, HA_TOKEN, DETECTION_WEBHOOK_URL), not from the source.
+
+# --- CONFIGURATION ---
+APPEAR_FRAMES = 3             # Consecutive frames a class must be seen in before 'appeared'
+DISAPPEAR_SECONDS = 2.0       # How long a class must be gone before 'disappeared'
+DWELL_SECONDS = 60.0          # 'dwell' once a class has been on screen this long (None = off)
+
+MAX_QUEUE = 256               # Pending events; the oldest is dropped when full
+COALESCE_SECONDS = 0.2        # The sender waits this long after the first event so bursts go out together
+RETRIES = 3
+BACKOFF_SECONDS = 0.5         # Doubled after every failed attempt
+TIMEOUT = (3.05, 10)          # (connect, read) seconds
+HA_EVENT_TYPE = 'window_detection'
+# ---------------------
+
+# --- EVENTS ---
+
+def detected_classes(result):
+    """ultralytics Results -> {class name: best confidence} for this frame."""
+    boxes = result.boxes
+    if boxes is None or not len(boxes):
+        return {}
+    found = {}
+    for c, conf in zip(boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy()):
+        name = result.names[int(c)]
+        found[name] = max(found.get(name, 0.0), float(conf))
+    return found
+
+class DetectionTracker:
+    """
+    Per-class presence with debounce. update() takes one frame's {class: confidence}
+    and returns the events it caused, so a class flickering for a frame or two
+    produces nothing and a class missed for a moment doesn't 'disappear'.
+    """
+    def __init__(self, appear_frames=APPEAR_FRAMES, disappear_seconds=DISAPPEAR_SECONDS,
+                 dwell_seconds=DWELL_SECONDS, source=None):
+        self.appear_frames = appear_frames
+        self.disappear_seconds = disappear_seconds
+        self.dwell_seconds = dwell_seconds
+        self.source = source
+        self.state = {}
+
+    def _event(self, kind, name, s, now, **extra):
+        event = {'type': kind, 'class': name, 'time': now, 'confidence': round(s['confidence'], 3), **extra}
+        if self.source:
+            event['source'] = self.source
+        return event
+
+    def update(self, detections, timestamp=None):
+        now = time.time() if timestamp is None else timestamp
+        events = []
+        for name, conf in detections.items():
+            s = self.state.setdefault(name, {'streak': 0, 'present': False})
+            if not s['present'] and s['streak'] == 0:
+                s['since'] = now
+            s['streak'] += 1
+            s['last_seen'], s['confidence'] = now, conf
+            if not s['present'] and s['streak'] >= self.appear_frames:
+                s['present'], s['dwell_sent'] = True, False
+                events.append(self._event('appeared', name, s, now))
+
+        for name, s in self.state.items():
+            if name in detections:
+                if (s['present'] and self.dwell_seconds and not s['dwell_sent']
+                        and now - s['since'] >= self.dwell_seconds):
+                    s['dwell_sent'] = True
+                    events.append(self._event('dwell', name, s, now, duration=round(now - s['since'], 2)))
+                continue
+            s['streak'] = 0
+            if s['present'] and now - s['last_seen'] >= self.disappear_seconds:
+                s['present'] = False
+                events.append(self._event('disappeared', name, s, now, duration=round(s['last_seen'] - s['since'], 2)))
+        return events
+
+# --- SINKS ---
+
+class SinkError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class HttpSink:
+    """One pooled requests.Session; 429/5xx and connection errors are retryable, other 4xx are not."""
+    def __init__(self, headers=None, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    def _post(self, url, payload):
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise SinkError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise SinkError(f"HTTP {response.status_code} from {url}")
+        if response.status_code >= 400:
+            raise SinkError(f"HTTP {response.status_code} from {url}", retryable=False)
+
+    def close(self):
+        self.session.close()
+
+class WebhookSink(HttpSink):
+    """POSTs each batch as {"events": [...]}."""
+    def __init__(self, url, headers=None, timeout=TIMEOUT):
+        super().__init__(headers, timeout)
+        self.url = url
+
+    def send(self, events):
+        self._post(self.url, {'events': events})
+        events.clear()
+
+class HomeAssistantSink(HttpSink):
+    """
+    Detection events are fired as HA events of type HA_EVENT_TYPE (event data = the
+    event dict); {'type': 'automation', 'entity_id': ...} triggers that automation.
+    Delivered events are removed from the list, so a retry only resends the rest.
+    """
+    def __init__(self, url, token, timeout=TIMEOUT):
+        super().__init__({'Authorization': f"Bearer {token}", 'Content-Type': 'application/json'}, timeout)
+        self.url = url.rstrip('/')
+
+    def send(self, events):
+        while events:
+            event = events[0]
+            if event['type'] == 'automation':
+                self._post(f"{self.url}/api/services/automation/trigger", {'entity_id': event['entity_id']})
+            else:
+                self._post(f"{self.url}/api/events/{HA_EVENT_TYPE}", event)
+            events.pop(0)
+
+# --- DISPATCHER ---
+
+class EventDispatcher:
+    """
+    publish() never blocks on the network: it appends to a bounded queue and returns.
+    A consecutive pending event of the same type for the same class is coalesced
+    into the newer one (with a 'count'). One sender thread drains the queue in
+    batches and retries with exponential backoff.
+    """
+    def __init__(self, sink, max_queue=MAX_QUEUE, coalesce_seconds=COALESCE_SECONDS,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS):
+        self.sink = sink
+        self.max_queue = max_queue
+        self.coalesce_seconds = coalesce_seconds
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.closing = False
+        self.stats = Counter()
+        self.thread = threading.Thread(target=self._run, name='event-dispatcher', daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """HomeAssistantSink if HA_URL and HA_TOKEN are set, else WebhookSink(DETECTION_WEBHOOK_URL), else None."""
+        if os.environ.get('HA_URL') and os.environ.get('HA_TOKEN'):
+            return cls(HomeAssistantSink(os.environ['HA_URL'], os.environ['HA_TOKEN']), **kwargs)
+        if os.environ.get('DETECTION_WEBHOOK_URL'):
+            return cls(WebhookSink(os.environ['DETECTION_WEBHOOK_URL']), **kwargs)
+        print("Events disabled: set HA_URL + HA_TOKEN or DETECTION_WEBHOOK_URL.")
+        return None
+
+    def publish(self, event):
+        key = event.get('class', event.get('entity_id'))
+        with self.cond:
+            self.stats['published'] += 1
+            for i in range(len(self.pending) - 1, -1, -1):
+                previous = self.pending[i]
+                if previous.get('class', previous.get('entity_id')) != key:
+                    continue
+                if previous['type'] == event['type']:
+                    self.pending[i] = {**event, 'count': previous.get('count', 1) + 1}
+                    self.stats['coalesced'] += 1
+                    return
+                break
+            self.pending.append(event)
+            if len(self.pending) > self.max_queue:
+                self.pending.popleft()
+                self.stats['dropped'] += 1
+            self.cond.notify()
+
+    def _wait(self, seconds):
+        """Sleeps, but wakes up early when close() is called."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.closing, timeout=seconds)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.closing)
+                if not self.pending:
+                    return
+            if not self.closing:
+                self._wait(self.coalesce_seconds)
+            with self.cond:
+                batch = list(self.pending)
+                self.pending.clear()
+            self._send(batch)
+
+    def _send(self, batch):
+        size = len(batch)
+        for attempt in range(self.retries + 1):
+            t0 = time.perf_counter()
+            try:
+                self.sink.send(batch)
+                self.stats['sent'] += size
+                self.stats['batches'] += 1
+                self.stats['send_ms'] += int((time.perf_counter() - t0) * 1000)
+                return
+            except SinkError as e:
+                error = e
+            self.stats['sent'] += size - len(batch)      # Sinks drop what they already delivered
+            size = len(batch)
+            if not error.retryable or attempt == self.retries:
+                break
+            self.stats['retries'] += 1
+            self._wait(self.backoff * 2 ** attempt)
+        self.stats['failed'] += size
+        print(f"✗ Event delivery failed ({size} events): {error}")
+
+    def close(self, timeout=10.0):
+        """Flushes what is queued (no coalescing wait) and stops the sender. True if nothing was lost."""
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
+        self.sink.close()
+        return not self.thread.is_alive() and not self.stats['failed'] and not self.stats['dropped']
+
+    def report(self):
+        s = self.stats
+        print(f"\n--- EVENTS ---")
+        print(f"  published {s['published']}, coalesced {s['coalesced']}, dropped {s['dropped']}, "
+              f"sent {s['sent']} in {s['batches']} batches, retries {s['retries']}, failed {s['failed']}")
+
+# --- LOCAL STAND-IN SERVER ---
+
+class StubServer:
+    """
+    Minimal HTTP server in a background thread that records every POST
+    (path, JSON body). fail_first makes the first N requests answer 503;
+    delay simulates a slow Home Assistant.
+    """
+    def __init__(self, fail_first=0, delay=0.0, port=0):
+        self.received = []
+        self.requests = 0
+        self.fail_first = fail_first
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(stub.delay)
+                stub.requests += 1
+                if stub.requests <= stub.fail_first:
+                    self.send_response(503)
+                else:
+                    stub.received.append((self.path, json.loads(body or b'null')))
+                    self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def selftest(frames=600, fps=30, delay=0.05):
+    """
+    Simulated detections (with single-frame flicker) through tracker -> dispatcher -> StubServer.
+    Compares the inference loop's cost of publish() with a blocking requests.post per event.
+    """
+    import random
+    rng = random.Random(0)
+    script = []
+    for i in range(frames):
+        t = i / fps
+        found = {}
+        if 1 <= t < 12 and rng.random() > 0.1:    # Claude on screen for 11 s, missed in 10% of frames
+            found['Claude'] = 0.9
+        if 5 <= t < 6 or rng.random() < 0.02:     # ChatGPT briefly, plus single-frame false positives
+            found['ChatGPT'] = 0.6
+        script.append((t, found))
+
+    with StubServer(fail_first=2, delay=delay) as stub:
+        dispatcher = EventDispatcher(WebhookSink(stub.url + '/webhook'), backoff=0.05)
+        tracker = DetectionTracker(dwell_seconds=10, source='selftest')
+        publish_times = []
+        for t, found in script:
+            for event in tracker.update(found, t):
+                t0 = time.perf_counter()
+                dispatcher.publish(event)
+                publish_times.append(time.perf_counter() - t0)
+        ok = dispatcher.close()
+        dispatcher.report()
+        delivered = [e for _, body in stub.received for e in body['events']]
+        print(f"  delivered: {[(e['type'], e['class'], e['time']) for e in delivered]}")
+        print(f"  publish(): max {max(publish_times) * 1e6:.0f} us over {len(publish_times)} events; all delivered: {ok}")
+
+        session = requests.Session()
+        t0 = time.perf_counter()
+        for event in delivered:
+            session.post(stub.url + '/webhook', json={'events': [event]}, timeout=TIMEOUT)
+        blocking = (time.perf_counter() - t0) / max(len(delivered), 1)
+        print(f"  blocking requests.post: {blocking * 1000:.1f} ms per event in the loop (server delay {delay * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    selftest()
@@ -0,0 +1,303 @@
+import time
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+# Shared-memory ring of fixed-size frame slots between a capture process and one
+# or more inference processes (ModelRunnerLive does capture + inference in one
+# process). The writer never waits: it always fills the next slot. Readers always
+# take the newest complete frame and skip anything older (latest frame wins),
+# and they read it in place - no pickling, no copy.
+#
+# Every slot has a sequence number, used as a seqlock: the writer sets it to -1,
+# writes the pixels, then stores the frame's sequence. A reader checks it before
+# and (with still_valid) after using the frame. If the writer lapped the ring in
+# between, the frame is reported as torn instead of being silently mixed.
+#
+# Layout of the shared block: header (int64[8]) | slot sequences (int64[slots])
+# | slot timestamps (float64[slots]) | slots * frame bytes (64-byte aligned).
+
+# --- CONFIGURATION ---
+SLOTS = 4                     # Readers can hold a frame in place for SLOTS - 1 frame intervals before it is overwritten
+POLL_INTERVAL = 0.0005        # Reader sleep while waiting for a new frame
+CAPTURE_FPS = 30
+# ---------------------
+
+_WRITE_SEQ, _SLOTS, _H, _W, _C, _CLAIMED, _CLOSED = range(7)
+_HEADER = 8
+_ALIGN = 64
+
+def _layout(shape, slots):
+    meta = (_HEADER + 2 * slots) * 8
+    offset = (meta + _ALIGN - 1) // _ALIGN * _ALIGN
+    frame_bytes = int(np.prod(shape))
+    return offset, frame_bytes, offset + slots * frame_bytes
+
+class FrameRing:
+    """
+    FrameRing.create(shape) in the owning process, FrameRing.attach(ring.name) in
+    the others. Single writer; any number of readers. Readers given the same
+    multiprocessing Lock share the work (each frame goes to at most one of them);
+    readers without one each see every latest frame (e.g. display + inference).
+    """
+    def __init__(self, shm, owner, lock=None):
+        self.shm = shm
+        self.owner = owner
+        self.lock = lock
+        header = np.ndarray((_HEADER,), np.int64, shm.buf)
+        slots, shape = int(header[_SLOTS]), tuple(int(v) for v in header[_H:_C + 1])
+        self.shape, self.slots = shape, slots
+        offset, frame_bytes, _ = _layout(shape, slots)
+        self.header = header
+        self.seqs = np.ndarray((slots,), np.int64, shm.buf, _HEADER * 8)
+        self.stamps = np.ndarray((slots,), np.float64, shm.buf, (_HEADER + slots) * 8)
+        self.frames = np.ndarray((slots,) + shape, np.uint8, shm.buf, offset)
+        self.torn = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def create(cls, shape, slots=SLOTS, name=None, lock=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_layout(shape, slots)[2])
+        header = np.ndarray((_HEADER,), np.int64, shm.buf)
+        header[:] = 0
+        header[_WRITE_SEQ] = header[_CLAIMED] = -1
+        header[_SLOTS] = slots
+        header[_H:_C + 1] = shape
+        np.ndarray((slots,), np.int64, shm.buf, _HEADER * 8)[:] = -1
+        return cls(shm, owner=True, lock=lock)
+
+    @classmethod
+    def attach(cls, name, lock=None):
+        return cls(shared_memory.SharedMemory(name=name), owner=False, lock=lock)
+
+    # --- writer ---
+
+    def begin_write(self):
+        """View of the next slot to fill in place (e.g. as cvtColor's dst). Finish with commit()."""
+        seq = int(self.header[_WRITE_SEQ]) + 1
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        return self.frames[slot]
+
+    def commit(self, timestamp=None):
+        seq = int(self.header[_WRITE_SEQ]) + 1
+        slot = seq % self.slots
+        self.stamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self.seqs[slot] = seq
+        self.header[_WRITE_SEQ] = seq
+        return seq
+
+    def write(self, frame, timestamp=None):
+        np.copyto(self.begin_write(), frame)
+        return self.commit(timestamp)
+
+    def close_stream(self):
+        """Tells readers no more frames are coming."""
+        self.header[_CLOSED] = 1
+
+    @property
+    def closed(self):
+        return bool(self.header[_CLOSED])
+
+    # --- readers ---
+
+    def latest(self, last_seq=-1):
+        """
+        Newest complete frame after last_seq -> (seq, timestamp, frame view), or
+        None. The view is only guaranteed intact while still_valid(seq) holds.
+        """
+        while True:
+            if self.lock is not None:
+                with self.lock:
+                    seq = int(self.header[_WRITE_SEQ])
+                    if seq <= max(last_seq, int(self.header[_CLAIMED])):
+                        return None
+                    self.header[_CLAIMED] = seq
+            else:
+                seq = int(self.header[_WRITE_SEQ])
+                if seq <= last_seq:
+                    return None
+            slot = seq % self.slots
+            stamp = float(self.stamps[slot])
+            if self.seqs[slot] == seq:
+                return seq, stamp, self.frames[slot]
+            # The writer already reused the slot - take the newer frame instead
+
+    def wait_latest(self, last_seq=-1, timeout=None):
+        """Blocks until a frame newer than last_seq arrives. None on timeout or end of stream."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            item = self.latest(last_seq)
+            if item is not None:
+                return item
+            if self.closed or (deadline is not None and time.monotonic() > deadline):
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def still_valid(self, seq):
+        """True if the frame read as `seq` was not overwritten while it was being used."""
+        if self.seqs[seq % self.slots] == seq:
+            return True
+        self.torn += 1
+        return False
+
+    def close(self):
+        # Drop the numpy views first, SharedMemory refuses to close while they export the buffer
+        self.header = self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# --- PRODUCERS ---
+
+def capture_process(ring_name, capture_area, fps=CAPTURE_FPS, stop_event=None):
+    """mss grabs straight into the ring: the BGRA -> BGR conversion writes into the slot."""
+    import cv2
+    import mss
+
+    ring = FrameRing.attach(ring_name)
+    interval = 1.0 / fps if fps else 0
+    h, w = ring.shape[:2]
+    try:
+        with mss.mss() as sct:
+            while stop_event is None or not stop_event.is_set():
+                start = time.monotonic()
+                bgra = np.frombuffer(sct.grab(capture_area).bgra, np.uint8).reshape(h, w, 4)
+                cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=ring.begin_write())
+                ring.commit(start)
+                time.sleep(max(0.0, interval - (time.monotonic() - start)))
+    finally:
+        ring.close_stream()
+        ring.close()
+
+def _synthetic_frames(shape, count=8, seed=0):
+    """Screen-like frames: flat blocks of colour, pre-rendered so the producer only copies."""
+    import cv2
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (count, shape[0] // 40 + 1, shape[1] // 40 + 1, shape[2]), dtype=np.uint8)
+    return [cv2.resize(b, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST) for b in blocks]
+
+def synthetic_producer(ring_name, fps, seconds, seed=0):
+    """Headless stand-in for capture_process. The frame's sequence is stamped into its first 8 bytes."""
+    ring = FrameRing.attach(ring_name)
+    frames = _synthetic_frames(ring.shape, seed=seed)
+    interval = 1.0 / fps if fps else 0
+    end = time.monotonic() + seconds
+    seq = 0
+    try:
+        while time.monotonic() < end:
+            start = time.monotonic()
+            buf = ring.begin_write()
+            np.copyto(buf, frames[seq % len(frames)])
+            buf.reshape(-1)[:8].view(np.int64)[0] = int(ring.header[_WRITE_SEQ]) + 1
+            seq = ring.commit(start) + 1
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
+    finally:
+        ring.close_stream()
+        ring.close()
+
+# --- BENCHMARK ---
+
+def _simulated_inference(frame, work_ms):
+    """Model stand-in: the letterbox resize the model would do, then work_ms of (GIL-free) waiting."""
+    import cv2
+    small = cv2.resize(frame, (640, 640 * frame.shape[0] // frame.shape[1]), interpolation=cv2.INTER_AREA)
+    time.sleep(work_ms / 1000)
+    return small
+
+def _ring_consumer(ring_name, lock, work_ms, results):
+    ring = FrameRing.attach(ring_name, lock=lock)
+    latencies, processed, corrupt, seq = [], 0, 0, -1
+    while True:
+        item = ring.wait_latest(seq)
+        if item is None:
+            break
+        seq, stamp, frame = item
+        _simulated_inference(frame, work_ms)
+        stamped = int(frame.reshape(-1)[:8].view(np.int64)[0])
+        if ring.still_valid(seq):
+            corrupt += stamped != seq         # Must never happen: the seqlock said the frame was intact
+            processed += 1
+            latencies.append(time.monotonic() - stamp)
+    results.put((processed, ring.torn, corrupt, latencies))
+    ring.close()
+
+def _queue_producer(q, shape, fps, seconds):
+    frames = _synthetic_frames(shape)
+    interval = 1.0 / fps if fps else 0
+    end = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < end:
+        start = time.monotonic()
+        try:
+            q.put_nowait((start, frames[i % len(frames)]))      # Drop when the consumers are behind
+        except queue.Full:
+            pass
+        i += 1
+        time.sleep(max(0.0, interval - (time.monotonic() - start)))
+    q.put(None)
+
+def _queue_consumer(q, work_ms, results):
+    latencies = []
+    while True:
+        item = q.get()
+        if item is None:
+            q.put(None)                       # Let the other consumers stop too
+            break
+        stamp, frame = item
+        _simulated_inference(frame, work_ms)
+        latencies.append(time.monotonic() - stamp)
+    results.put((len(latencies), 0, 0, latencies))
+
+def _run(ctx, producer, consumers):
+    procs = [ctx.Process(target=producer[0], args=producer[1])]
+    procs += [ctx.Process(target=target, args=args) for target, args in consumers]
+    for p in procs[1:] + procs[:1]:           # Consumers first, so they are ready for the first frame
+        p.start()
+    return procs
+
+def benchmark(shape=(1080, 1920, 3), fps=30, seconds=5.0, consumers=1, work_ms=20, slots=SLOTS):
+    """
+    Synthetic producer -> consumers, through the ring and through a multiprocessing
+    Queue (frames pickled across). Reports delivered fps and capture-to-result latency.
+    """
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    rows = []
+
+    ring = FrameRing.create(shape, slots)
+    lock = ctx.Lock()
+    procs = _run(ctx, (synthetic_producer, (ring.name, fps, seconds)),
+                 [(_ring_consumer, (ring.name, lock, work_ms, results))] * consumers)
+    stats = [results.get() for _ in range(consumers)]
+    for p in procs:
+        p.join()
+    produced = int(ring.header[_WRITE_SEQ]) + 1
+    ring.close()
+    rows.append(('shared-memory ring', produced, stats))
+
+    q = ctx.Queue(maxsize=2)
+    procs = _run(ctx, (_queue_producer, (q, shape, fps, seconds)),
+                 [(_queue_consumer, (q, work_ms, results))] * consumers)
+    stats = [results.get() for _ in range(consumers)]
+    for p in procs:
+        p.join()
+    rows.append(('multiprocessing.Queue', None, stats))
+
+    print(f"\n--- FRAME TRANSPORT ({shape[1]}x{shape[0]}, target {fps} fps, {consumers} consumer(s), "
+          f"{work_ms} ms simulated inference, {seconds:.0f} s) ---")
+    for label, produced, stats in rows:
+        processed = sum(s[0] for s in stats)
+        latencies = np.concatenate([s[3] for s in stats]) * 1000 if processed else np.zeros(1)
+        line = (f"  {label:<22} {processed / seconds:6.1f} fps processed, latency "
+                f"p50 {np.percentile(latencies, 50):7.1f} ms, p95 {np.percentile(latencies, 95):7.1f} ms")
+        if produced is not None:
+            line += f", {produced} written, {sum(s[1] for s in stats)} torn, {sum(s[2] for s in stats)} corrupt"
+        print(line)
+
+if __name__ == "__main__":
+    benchmark()
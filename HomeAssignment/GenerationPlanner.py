@@ -0,0 +1,239 @@
+import os
+import json
+import random
+import multiprocessing as mp
+from collections import Counter
+import numpy as np
+from tqdm import tqdm
+
+import DatasetGenerator
+from DatasetGenerator import (get_images, get_RGBA_image, paste_window_safe, apply_occlusion, render_negative,
+                              convert_to_yolo, save_image, load_hard_negatives, load_photometric, split_backgrounds,
+                              DISTRACTOR_NAME)
+from SampleMetadata import MetadataWriter
+from newestDatasetGenerator import get_random_crop
+from ImageOps import Noise
+
+# Plans a whole dataset before rendering anything. Instead of a flat number of
+# copies per screenshot (DatasetGenerator) or a random one (AddToAiMAssProduction),
+# every class gets the same quota, spread evenly over its screenshots and over the
+# wallpapers, and scale bins / occlusion / background noise / cropping are assigned
+# in exact proportions. The plan is a list of self-contained jobs (one JSON line
+# each, with its own seed), so any number of worker processes can render it and a
+# rerun of the same plan gives the same images.
+
+# --- CONFIGURATION ---
+OUTPUT_BASE = 'HomeAssignment/Dataset/PlannedDataset'
+PLAN_FILE = f'{OUTPUT_BASE}/plan.jsonl'
+SAMPLES_PER_CLASS = {'train': 1500, 'test': 150}
+SCALE_BINS = [0.3, 0.45, 0.6, 0.75, 0.9]        # Window width / wallpaper width; equal share per bin
+AUGMENT_MIX = {'occluded': 0.25, 'background_noise': 0.3, 'cropped': 0.15}   # Exact share of each class
+NEGATIVE_RATIO = 0.15                           # Negatives as a share of the whole split
+NEGATIVE_MIX = {'distractor': 0.6, 'cropped': 0.25, 'wallpaper': 0.15}
+TEST_SPLIT = 0.1                                # Share of wallpapers held out for the test split
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+SEED = 0
+# ---------------------
+
+def exact_counts(n, weights):
+    """Splits n into integer counts proportional to weights (largest remainder), summing to exactly n."""
+    w = np.asarray(weights, dtype=np.float64)
+    share = n * w / w.sum()
+    counts = np.floor(share).astype(int)
+    counts[np.argsort(counts - share)[:n - counts.sum()]] += 1
+    return counts
+
+def spread(items, n, rng):
+    """n picks from items, each used floor(n/len) or ceil(n/len) times, in random order."""
+    base = list(items)
+    rng.shuffle(base)                              # Which items get the extra use is random
+    picks = base * (n // len(base)) + base[:n % len(base)] if base else []
+    rng.shuffle(picks)
+    return picks
+
+def exact_flags(n, p, rng):
+    flags = [True] * int(round(n * p)) + [False] * (n - int(round(n * p)))
+    rng.shuffle(flags)
+    return flags
+
+def plan_split(split, fg_root, bg_images, class_map, samples_per_class, hard_negatives=None, seed=SEED):
+    """Job list for one split: positives per class, then negatives."""
+    if not bg_images:
+        print(f"  [Warning] No wallpapers for the {split} split - nothing planned.")
+        return []
+    rng = random.Random(f"{seed}:{split}")
+    distractors = sorted(get_images(os.path.join(fg_root, DISTRACTOR_NAME)))
+    classes = {name: sorted(get_images(os.path.join(fg_root, name))) for name in class_map}
+    classes = {name: fgs for name, fgs in classes.items() if fgs}
+    n_pos = samples_per_class * len(classes)
+    n_neg = int(round(n_pos * NEGATIVE_RATIO / (1 - NEGATIVE_RATIO))) if distractors else 0
+    backgrounds = spread(sorted(bg_images), n_pos + n_neg, rng)
+    jobs = []
+
+    for name, fgs in classes.items():
+        scales = []
+        for (lo, hi), k in zip(zip(SCALE_BINS[:-1], SCALE_BINS[1:]), exact_counts(samples_per_class, [1] * (len(SCALE_BINS) - 1))):
+            scales += [rng.uniform(lo, hi) for _ in range(k)]
+        rng.shuffle(scales)
+        fg_picks = spread(fgs, samples_per_class, rng)
+        flags = {aug: exact_flags(samples_per_class, p if distractors or aug == 'cropped' else 0, rng)
+                 for aug, p in AUGMENT_MIX.items()}
+        for i in range(samples_per_class):
+            jobs.append({
+                'name': f"{split}_{name}_{i:06d}", 'split': split, 'type': 'positive',
+                'class_name': name, 'class_id': class_map[name], 'fg_path': fg_picks[i], 'bg_path': backgrounds.pop(),
+                'scale': scales[i], 'cropped': flags['cropped'][i],
+                'occluder_path': rng.choice(distractors) if flags['occluded'][i] else None,
+                'noise_path': rng.choice(distractors) if flags['background_noise'][i] else None,
+                'seed': rng.getrandbits(32),
+            })
+
+    # Negatives: mined hard negatives first (weighted by the model's false-positive confidence), then the mix
+    bg_set = set(bg_images)
+    hard = [s for s in (hard_negatives or []) if s['bg_path'] in bg_set]
+    n_hard = min(n_neg, int(n_neg * DatasetGenerator.HARD_NEGATIVE_FRACTION)) if hard else 0
+    specs, seen = [], Counter()
+    for spec in rng.choices(hard, weights=[s['weight'] for s in hard], k=n_hard) if n_hard else []:
+        spec = {k: spec[k] for k in ('kind', 'bg_path', 'dist_path', 'seed')}
+        repeat = seen[spec['seed']]
+        seen[spec['seed']] += 1
+        spec['seed'] += repeat                           # Repeats keep wallpaper/window but move it
+        specs.append(dict(spec, hard_negative=True))
+    kinds = [k for k, c in zip(NEGATIVE_MIX, exact_counts(n_neg - n_hard, list(NEGATIVE_MIX.values()))) for _ in range(c)]
+    for kind in kinds:
+        specs.append({'kind': kind, 'bg_path': backgrounds.pop(), 'dist_path': rng.choice(distractors) if kind != 'wallpaper' else None,
+                      'seed': rng.getrandbits(32), 'hard_negative': False})
+    for i, spec in enumerate(specs):
+        jobs.append(dict(spec, name=f"{split}_neg_{i:06d}", split=split, type='negative'))
+    return jobs
+
+def write_plan(jobs, path=PLAN_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        for job in jobs:
+            f.write(json.dumps(job) + '\n')
+
+def load_plan(path=PLAN_FILE):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize_plan(jobs):
+    print(f"\n--- PLAN ({len(jobs)} jobs) ---")
+    for split in sorted({j['split'] for j in jobs}, reverse=True):
+        pos = [j for j in jobs if j['split'] == split and j['type'] == 'positive']
+        neg = [j for j in jobs if j['split'] == split and j['type'] == 'negative']
+        print(f"  {split.upper()}: {len(pos)} positives, {len(neg)} negatives "
+              f"({Counter(j['kind'] for j in neg)}, hard: {sum(j['hard_negative'] for j in neg)})")
+        for name in sorted({j['class_name'] for j in pos}):
+            rows = [j for j in pos if j['class_name'] == name]
+            bins = np.histogram([j['scale'] for j in rows], bins=SCALE_BINS)[0]
+            per_fg = Counter(j['fg_path'] for j in rows).values()
+            print(f"    {name:<10} n={len(rows):<6} scale bins {bins.tolist()}  occluded {sum(bool(j['occluder_path']) for j in rows)}"
+                  f"  noise {sum(bool(j['noise_path']) for j in rows)}  cropped {sum(j['cropped'] for j in rows)}"
+                  f"  copies per screenshot {min(per_fg)}-{max(per_fg)}")
+
+# --- RENDERING ---
+
+_WORKER = {}
+
+def _init_worker(output_base, photometric, encoding=None):
+    _WORKER['output_base'] = output_base
+    _WORKER['encoding'] = encoding
+    _WORKER['luts'] = load_photometric(photometric)
+
+def render_job(job):
+    """Worker: renders one job, writes image + label. Returns (name, split, metadata row, None) or (name, split, None, error)."""
+    out, luts = _WORKER['output_base'], _WORKER['luts']
+    state = random.getstate()
+    random.seed(job['seed'])
+    try:
+        if job['type'] == 'negative':
+            img, bbox = render_negative(job, luts)
+            lines = ''
+            x1, y1, x2, y2 = bbox or (None,) * 4
+            row = dict(negative=True, bg_path=job['bg_path'], distractor_path=job.get('dist_path'),
+                       cropped=job['kind'] == 'cropped', hard_negative=job['hard_negative'],
+                       scale=(x2 - x1) / img.width if bbox else None, paste_x=x1, paste_y=y1,
+                       box_w=x2 - x1 if bbox else None, box_h=y2 - y1 if bbox else None)
+        else:
+            load = lambda path: luts.foreground(path, get_RGBA_image(path)) if luts else get_RGBA_image(path)
+            bg = get_RGBA_image(job['bg_path'])
+            if luts:
+                bg = luts.background(job['bg_path'], bg)
+            if job['noise_path']:
+                bg, _, _ = paste_window_safe(bg, load(job['noise_path']), 0.4, 0.9)
+            fg = load(job['fg_path'])
+            full_w, full_h = fg.size
+            if job['cropped']:
+                fg = get_random_crop(fg)
+            crop_w_ratio, crop_h_ratio = fg.width / full_w, fg.height / full_h
+            img, (x1, y1, x2, y2), _ = paste_window_safe(bg, fg, job['scale'], job['scale'])
+            if job['occluder_path']:
+                img = apply_occlusion(img, (x1, y1, x2, y2), [job['occluder_path']], luts)
+            xc, yc, w, h = convert_to_yolo(img.width, img.height, x1, y1, x2, y2)
+            lines = f"{job['class_id']} {xc:.6f} {yc:.6f} {w:.6f} {h:.6f}\n"
+            row = dict(class_name=job['class_name'], class_id=job['class_id'], bg_path=job['bg_path'],
+                       fg_path=job['fg_path'], scale=(x2 - x1) / img.width, paste_x=x1, paste_y=y1,
+                       box_w=x2 - x1, box_h=y2 - y1, occluded=bool(job['occluder_path']), cropped=crop_w_ratio * crop_h_ratio < 1,
+                       crop_w_ratio=crop_w_ratio, crop_h_ratio=crop_h_ratio, background_noise=bool(job['noise_path']), distractor_path=job['noise_path'])
+
+        img, noise = Noise.augment_pil(img, DatasetGenerator.NOISE_PROBABILITIES, np.random.default_rng(job['seed']))
+        ext = save_image(img, f"{out}/images/{job['split']}/{job['name']}", _WORKER['encoding'])
+        with open(f"{out}/labels/{job['split']}/{job['name']}.txt", 'w') as f:
+            f.write(lines)
+        row.update(ext=ext, bg_w=img.width, bg_h=img.height, noise=','.join(noise) or None)
+        return job['name'], job['split'], row, None
+    except Exception as e:
+        return job['name'], job['split'], None, f"{type(e).__name__}: {e}"
+    finally:
+        random.setstate(state)
+
+def execute_plan(jobs, output_base=OUTPUT_BASE, num_workers=NUM_WORKERS, photometric=DatasetGenerator.PHOTOMETRIC_MODE,
+                 encoding=None):
+    """Renders every job on a process pool; the main process only writes the metadata sidecars."""
+    splits = sorted({j['split'] for j in jobs})
+    for split in splits:
+        os.makedirs(f'{output_base}/images/{split}', exist_ok=True)
+        os.makedirs(f'{output_base}/labels/{split}', exist_ok=True)
+    writers = {split: MetadataWriter(output_base, split) for split in splits}
+    failed = 0
+    try:
+        with mp.Pool(num_workers, initializer=_init_worker, initargs=(output_base, photometric, encoding)) as pool:
+            for name, split, row, error in tqdm(pool.imap_unordered(render_job, jobs, chunksize=8), total=len(jobs)):
+                if row is None:
+                    failed += 1
+                    print(f"  [{name}] failed: {error}")
+                    continue
+                writers[split].add(name, **row)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    print(f"Rendered {len(jobs) - failed} of {len(jobs)} jobs into {output_base} ({failed} failed).")
+
+def main():
+    backgrounds = get_images(DatasetGenerator.BACKGROUND_DIR)
+    if not backgrounds:
+        print(f"Error: No wallpapers found in {DatasetGenerator.BACKGROUND_DIR}")
+        return
+    train_bgs, test_bgs = split_backgrounds(backgrounds, TEST_SPLIT, SEED)     # Train is never left empty
+    class_names = sorted(DatasetGenerator.TARGET_CLASSES)
+    class_map = {name: i for i, name in enumerate(class_names)}
+
+    jobs = plan_split('train', DatasetGenerator.FOREGROUND_ROOT_TRAIN, train_bgs, class_map,
+                      SAMPLES_PER_CLASS['train'], load_hard_negatives())
+    jobs += plan_split('test', DatasetGenerator.FOREGROUND_ROOT_TEST, test_bgs, class_map,
+                       SAMPLES_PER_CLASS['test'])
+    write_plan(jobs)
+    summarize_plan(jobs)
+
+    flat = sum(len(get_images(os.path.join(DatasetGenerator.FOREGROUND_ROOT_TRAIN, c))) for c in class_names)
+    print(f"  (DatasetGenerator's flat plan: {flat * DatasetGenerator.TRAIN_COPIES_PER_IMG + DatasetGenerator.NEGATIVES_COUNT} "
+          f"train images with class shares proportional to screenshot counts)")
+
+    execute_plan(jobs)
+    with open(f'{OUTPUT_BASE}/data.yaml', 'w') as f:
+        f.write(f"path: {os.path.abspath(OUTPUT_BASE)}\ntrain: images/train\nval: images/test\ntest: images/test\n\n"
+                f"nc: {len(class_names)}\nnames: {class_names}\n")
+
+if __name__ == "__main__":
+    main()
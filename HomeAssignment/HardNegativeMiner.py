@@ -0,0 +1,194 @@
+import os
+import json
+import random
+import sqlite3
+import multiprocessing as mp
+import numpy as np
+from tqdm import tqdm
+
+import DatasetGenerator
+from DatasetGenerator import (get_images, render_negative, split_backgrounds, load_photometric, DISTRACTOR_NAME,
+                              HARD_NEGATIVES_FILE)
+from Evaluator import hash_file
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'HomeAssignment/AI Models/FinalAIModel/weights/best.pt'
+BACKGROUND_DIR = DatasetGenerator.BACKGROUND_DIR     # Only its train wallpapers are mined (split_backgrounds)
+FOREGROUND_ROOT = 'HomeAssignment/Dataset/Foregrounds_Train'
+CACHE_DIR = 'HomeAssignment/Cache/hard_negatives'
+
+POOL_SIZE = 100_000          # Candidate composites to score
+POOL_SEED = 1234             # Same seed + same folders = same pool, so the cache stays valid
+POOL_MIX = {'distractor': 0.6, 'cropped': 0.25, 'wallpaper': 0.15}
+
+TOP_K = 2000                 # Hard negatives handed to the next DatasetGenerator run
+MIN_CONFIDENCE = 0.05        # Detections below this are not worth caching
+BATCH_SIZE = 32
+RENDER_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+IMG_SIZE = 640
+PHOTOMETRIC_MODE = DatasetGenerator.PHOTOMETRIC_MODE        # Render candidates the way DatasetGenerator will
+PHOTOMETRIC_TARGETS = DatasetGenerator.PHOTOMETRIC_TARGETS
+# ---------------------
+
+def build_candidate_pool(size, bg_images, distractors, seed=POOL_SEED):
+    """
+    Describes every candidate as a small spec instead of an image, so 100k
+    candidates cost a few MB. Rendering happens lazily in worker processes.
+    """
+    rng = random.Random(seed)
+    kinds = list(POOL_MIX)
+    weights = [POOL_MIX[k] for k in kinds]
+    bg_images, distractors = sorted(bg_images), sorted(distractors)
+
+    pool = []
+    for _ in range(size):
+        kind = rng.choices(kinds, weights)[0] if distractors else 'wallpaper'
+        pool.append({
+            'kind': kind,
+            'bg_path': rng.choice(bg_images),
+            'dist_path': rng.choice(distractors) if kind != 'wallpaper' else None,
+            'seed': rng.getrandbits(32),
+        })
+    return pool
+
+def spec_key(spec):
+    return f"{spec['kind']}|{spec['bg_path']}|{spec['dist_path']}|{spec['seed']}"
+
+_WORKER = {}
+
+def _init_worker(photometric, photometric_targets):
+    _WORKER['luts'] = load_photometric(photometric, photometric_targets)
+
+def _render(spec):
+    """Worker: composite -> BGR numpy array, the channel order ultralytics expects for arrays."""
+    try:
+        img, _ = render_negative(spec, _WORKER.get('luts'))
+        return spec, np.ascontiguousarray(np.asarray(img.convert("RGB"))[:, :, ::-1])
+    except Exception:
+        return spec, None
+
+class ScoreCache:
+    """SQLite table of false-positive scores per candidate, one file per weight hash and photometric setting."""
+    def __init__(self, model_hash, photometric=None):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        suffix = f"_{photometric}" if photometric else ''
+        self.conn = sqlite3.connect(os.path.join(CACHE_DIR, f"{model_hash[:16]}{suffix}.db"))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                key      TEXT PRIMARY KEY,
+                spec     TEXT NOT NULL,
+                max_conf REAL NOT NULL,      -- highest confidence of any (false) detection, 0 if none
+                cls      INTEGER,
+                n_det    INTEGER NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_conf ON scores (max_conf DESC)")
+
+    def scored_keys(self):
+        return {row[0] for row in self.conn.execute("SELECT key FROM scores")}
+
+    def add(self, rows):
+        self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def top(self, k):
+        return self.conn.execute("SELECT spec, max_conf, cls FROM scores WHERE max_conf > 0 "
+                                 "ORDER BY max_conf DESC LIMIT ?", (k,)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+def score_pool(model_path, pool, batch_size=BATCH_SIZE, render_workers=RENDER_WORKERS,
+               photometric=PHOTOMETRIC_MODE, photometric_targets=PHOTOMETRIC_TARGETS):
+    """
+    Runs the model over every candidate not already in the cache.
+    Worker processes render composites while the main process runs batched
+    inference, so decode/composite and inference overlap.
+    """
+    from ultralytics import YOLO
+
+    model_hash = hash_file(model_path)
+    cache = ScoreCache(model_hash, f"{photometric}-{'+'.join(sorted(photometric_targets))}" if photometric else None)
+    done = cache.scored_keys()
+    todo = [s for s in pool if spec_key(s) not in done]
+    print(f"Model {model_hash[:12]}: {len(pool) - len(todo)} candidates cached, {len(todo)} to score.")
+
+    if todo:
+        model = YOLO(model_path)
+        batch, rows = [], []
+
+        def flush():
+            specs = [s for s, _ in batch]
+            results = model([img for _, img in batch], conf=MIN_CONFIDENCE, imgsz=IMG_SIZE, verbose=False)
+            for spec, r in zip(specs, results):
+                conf = r.boxes.conf.cpu().numpy()
+                top = int(conf.argmax()) if len(conf) else None
+                rows.append((spec_key(spec), json.dumps(spec),
+                             float(conf[top]) if top is not None else 0.0,
+                             int(r.boxes.cls[top]) if top is not None else None,
+                             len(conf)))
+            batch.clear()
+            if len(rows) >= 1000:
+                cache.add(rows)
+                rows.clear()
+
+        # Render one window ahead of inference. Full-size frames are large, so only
+        # two windows are ever held in memory instead of letting the pool run ahead.
+        window = batch_size * 4
+        windows = [todo[i:i + window] for i in range(0, len(todo), window)]
+        with mp.Pool(render_workers, initializer=_init_worker,
+                     initargs=(photometric, photometric_targets)) as pool_workers:
+            pending = pool_workers.map_async(_render, windows[0], chunksize=4)
+            for w in tqdm(range(len(windows))):
+                rendered = pending.get()
+                if w + 1 < len(windows):
+                    pending = pool_workers.map_async(_render, windows[w + 1], chunksize=4)
+
+                for spec, img in rendered:
+                    if img is None: continue
+                    batch.append((spec, img))
+                    if len(batch) >= batch_size:
+                        flush()
+            if batch:
+                flush()
+        cache.add(rows)
+
+    return cache
+
+def export_top_k(cache, k=TOP_K, out_path=HARD_NEGATIVES_FILE):
+    """Writes the K most confidently misclassified candidates for DatasetGenerator to consume."""
+    top = cache.top(k)
+    hard = []
+    for spec_json, max_conf, cls in top:
+        spec = json.loads(spec_json)
+        spec['weight'] = max_conf
+        spec['fp_class'] = cls
+        hard.append(spec)
+
+    with open(out_path, 'w') as f:
+        json.dump(hard, f)
+
+    if hard:
+        kinds = {}
+        for s in hard:
+            kinds[s['kind']] = kinds.get(s['kind'], 0) + 1
+        print(f"Exported {len(hard)} hard negatives to {out_path} "
+              f"(conf {hard[-1]['weight']:.3f}-{hard[0]['weight']:.3f}, by kind: {kinds})")
+    else:
+        print("The model produced no false positives on the pool - nothing to export.")
+    return hard
+
+def main():
+    # Test wallpapers are never mined: DatasetGenerator only uses hard negatives on the train split
+    backgrounds, _ = split_backgrounds(get_images(BACKGROUND_DIR))
+    distractors = get_images(os.path.join(FOREGROUND_ROOT, DISTRACTOR_NAME))
+    if not backgrounds:
+        print(f"Error: No wallpapers found in {BACKGROUND_DIR}")
+        return
+
+    pool = build_candidate_pool(POOL_SIZE, backgrounds, distractors)
+    cache = score_pool(MODEL_PATH, pool)
+    export_top_k(cache)
+    cache.close()
+
+if __name__ == "__main__":
+    main()
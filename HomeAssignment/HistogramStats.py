@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import multiprocessing as mp
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from DatasetGenerator import get_images, split_backgrounds, BACKGROUND_DIR, FOREGROUND_ROOT_TRAIN, FOREGROUND_ROOT_TEST, OUTPUT_BASE
+
+# Dataset-wide colour statistics (the Lecture6 / Worksheet7 cv2.calcHist cells, for
+# whole folders). Every image's histograms are cached in SQLite keyed by path,
+# size and mtime, so a rerun only decodes new or changed images and the set
+# totals are summed from the cache instead of rereading every JPEG.
+
+# --- CONFIGURATION ---
+CACHE_DB = 'HomeAssignment/Cache/histograms.db'
+REAL_FRAME_SOURCES = ['HomeAssignment/test.mkv']   # Recordings and/or folders of captured frames
+FRAME_STEP = 30                 # Every Nth video frame counts as a "real" sample
+CHUNK_SIZE = 32                 # Images per worker task
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+HS_BINS = (30, 32)              # Hue x saturation bins of the 2-D histogram used for comparisons
+# ---------------------
+
+# One flat vector per image: B, G, R (256 each), H (180), S, V (256 each), then the H-S 2-D histogram
+LAYOUT = {'b': 256, 'g': 256, 'r': 256, 'h': 180, 's': 256, 'v': 256, 'hs': HS_BINS[0] * HS_BINS[1]}
+OFFSETS = {}
+_pos = 0
+for _name, _n in LAYOUT.items():
+    OFFSETS[_name] = slice(_pos, _pos + _n)
+    _pos += _n
+VECTOR_SIZE = _pos
+
+class Histogram:
+    """
+    Pixel counts for a set of images. Histograms of disjoint sets merge by
+    adding counts, so partial results from workers or from earlier runs combine
+    into exactly the histogram of the union.
+    """
+    def __init__(self, counts=None, images=0):
+        self.counts = np.zeros(VECTOR_SIZE, dtype=np.int64) if counts is None else counts.astype(np.int64)
+        self.images = images
+
+    @classmethod
+    def from_image(cls, img, mask=None):
+        """img is BGR uint8; mask (uint8, non-zero = counted) e.g. a foreground's alpha channel."""
+        counts = np.empty(VECTOR_SIZE, dtype=np.int64)
+        for i, name in enumerate('bgr'):
+            counts[OFFSETS[name]] = cv2.calcHist([img], [i], mask, [256], [0, 256]).ravel()
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        counts[OFFSETS['h']] = cv2.calcHist([hsv], [0], mask, [180], [0, 180]).ravel()
+        counts[OFFSETS['s']] = cv2.calcHist([hsv], [1], mask, [256], [0, 256]).ravel()
+        counts[OFFSETS['v']] = cv2.calcHist([hsv], [2], mask, [256], [0, 256]).ravel()
+        counts[OFFSETS['hs']] = cv2.calcHist([hsv], [0, 1], mask, list(HS_BINS), [0, 180, 0, 256]).ravel()
+        return cls(counts, 1)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.images += other.images
+        return self
+
+    def __add__(self, other):
+        return Histogram(self.counts.copy(), self.images).merge(other)
+
+    @property
+    def pixels(self):
+        return int(self.counts[OFFSETS['b']].sum())
+
+    def channel(self, name):
+        return self.counts[OFFSETS[name]]
+
+    def normalized(self, name):
+        hist = self.channel(name).astype(np.float32)
+        total = hist.sum()
+        return hist / total if total else hist
+
+    def mean_std(self, name):
+        p = self.normalized(name).astype(np.float64)
+        values = np.arange(len(p))
+        mean = (p * values).sum()
+        return mean, np.sqrt((p * (values - mean) ** 2).sum())
+
+    def compare(self, other, name='hs', method=cv2.HISTCMP_BHATTACHARYYA):
+        return cv2.compareHist(self.normalized(name), other.normalized(name), method)
+
+    def to_bytes(self):
+        return self.counts.astype(np.uint32).tobytes()   # one image never exceeds 2^32 pixels
+
+    @classmethod
+    def from_bytes(cls, data, images=1):
+        return cls(np.frombuffer(data, dtype=np.uint32), images)
+
+def _image_histogram(path):
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return None
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    mask = None
+    if img.shape[2] == 4:                  # Foreground PNGs: only count the visible window
+        mask = (img[:, :, 3] > 0).astype(np.uint8)
+        img = np.ascontiguousarray(img[:, :, :3])
+    return Histogram.from_image(img, mask)
+
+def _histogram_chunk(items):
+    """Worker: [(key, path, size, mtime)] -> [(key, size, mtime, blob)] with one entry per readable image."""
+    out = []
+    for key, path, size, mtime in items:
+        hist = _image_histogram(path)
+        if hist is not None:
+            out.append((key, size, mtime, hist.to_bytes()))
+    return out
+
+class HistogramCache:
+    """SQLite table of per-image histograms. Rows are reused while a file's size and mtime are unchanged."""
+    def __init__(self, db_path=CACHE_DB):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS histograms (
+                key    TEXT PRIMARY KEY,     -- file path, or '<video>#<frame>' for recorded frames
+                size   INTEGER NOT NULL,
+                mtime  REAL NOT NULL,
+                counts BLOB NOT NULL
+            )""")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        layout = ','.join(f"{k}:{v}" for k, v in LAYOUT.items())
+        stored = self.conn.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+        if stored and stored[0] != layout:
+            print("Histogram layout changed - clearing the cache.")
+            self.conn.execute("DELETE FROM histograms")
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+        self.conn.commit()
+
+    def stamps(self):
+        return {key: (size, mtime) for key, size, mtime in self.conn.execute("SELECT key, size, mtime FROM histograms")}
+
+    def add(self, rows):
+        self.conn.executemany("INSERT OR REPLACE INTO histograms VALUES (?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def total(self, keys):
+        """Sums the cached histograms of `keys` without touching the images."""
+        hist = Histogram()
+        keys = list(keys)
+        for i in range(0, len(keys), 500):   # SQLite's host parameter limit
+            chunk = keys[i:i + 500]
+            rows = self.conn.execute(f"SELECT counts FROM histograms WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for (blob,) in rows:
+                hist.merge(Histogram.from_bytes(blob))
+        return hist
+
+    def close(self):
+        self.conn.close()
+
+def update_images(cache, paths, num_workers=NUM_WORKERS, chunk_size=CHUNK_SIZE):
+    """Computes histograms for every path that is new or changed since it was cached. Returns the keys."""
+    stamps = cache.stamps()
+    keys, todo = [], []
+    for path in paths:
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        keys.append(key)
+        if stamps.get(key) != (st.st_size, st.st_mtime):
+            todo.append((key, path, st.st_size, st.st_mtime))
+
+    if todo:
+        print(f"  {len(paths) - len(todo)} cached, {len(todo)} to read")
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        with mp.Pool(num_workers) as pool:
+            for rows in tqdm(pool.imap_unordered(_histogram_chunk, chunks), total=len(chunks)):
+                cache.add(rows)
+    return keys
+
+def update_video(cache, video_path, step=FRAME_STEP):
+    """
+    Histograms of every `step`-th frame, keyed '<video>#<step>#<frame>'. The whole video is
+    re-read if the file changed or it was cached with another step.
+    """
+    st = os.stat(video_path)
+    video_prefix = os.path.abspath(video_path) + '#'
+    prefix = f"{video_prefix}{step}#"
+    stamps = cache.stamps()
+    cached = {k: v for k, v in stamps.items() if k.startswith(prefix)}
+    if cached and all(v == (st.st_size, st.st_mtime) for v in cached.values()) \
+            and not any(k.startswith(video_prefix) and k not in cached for k in stamps):
+        return list(cached)
+
+    cap = cv2.VideoCapture(video_path)
+    rows, idx = [], 0
+    while cap.grab():
+        if idx % step == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                rows.append((f"{prefix}{idx}", st.st_size, st.st_mtime, Histogram.from_image(frame).to_bytes()))
+        idx += 1
+    cap.release()
+    cache.conn.execute("DELETE FROM histograms WHERE key LIKE ?", (video_prefix + '%',))   # Every step
+    cache.add(rows)
+    return [r[0] for r in rows]
+
+def update_sources(cache, sources):
+    keys = []
+    for source in sources:
+        if os.path.isdir(source):
+            keys += update_images(cache, get_images(source))
+        elif os.path.isfile(source):
+            keys += update_video(cache, source)
+        else:
+            print(f"Skipping missing source {source}")
+    return keys
+
+def get_background_split(backgrounds, dataset_root=OUTPUT_BASE):
+    """
+    The train/test backgrounds of the last DatasetGenerator run, recovered from its
+    metadata sidecar. Without a sidecar, falls back to DatasetGenerator.split_backgrounds.
+    """
+    from SampleMetadata import get_db_path, query
+    if os.path.exists(get_db_path(dataset_root, 'train')) and os.path.exists(get_db_path(dataset_root, 'test')):
+        split = {s: sorted({os.path.abspath(r['bg_path']) for r in query(dataset_root, s, columns='bg_path')
+                            if r['bg_path']}) for s in ('train', 'test')}
+        if split['train'] and split['test']:
+            return split['train'], split['test']
+    return split_backgrounds(backgrounds)
+
+def collect(sets, db_path=CACHE_DB):
+    """
+    sets: {name: list of image paths / folders / videos}. Brings the cache up to
+    date and returns {name: Histogram}.
+    """
+    cache = HistogramCache(db_path)
+    totals = {}
+    for name, sources in sets.items():
+        print(f"{name}:")
+        files = [s for s in sources if os.path.isfile(s) and s.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
+        other = [s for s in sources if s not in files]
+        keys = update_images(cache, files) + update_sources(cache, other)
+        totals[name] = cache.total(keys)
+    cache.close()
+    return totals
+
+def report(totals, reference):
+    """Per-set colour summary, and how far every set's distribution is from `reference`."""
+    ref = totals[reference]
+    print(f"\n--- COLOUR DISTRIBUTION (distances vs {reference}; 0 = identical) ---")
+    print(f"  {'set':<18}{'images':>8}{'B':>7}{'G':>7}{'R':>7}{'H':>7}{'S':>7}{'V':>7}"
+          f"{'HS bhatt':>10}{'V corr':>9}")
+    for name, hist in totals.items():
+        if not hist.images:
+            print(f"  {name:<18}{0:>8}  (no images)")
+            continue
+        means = [hist.mean_std(c)[0] for c in 'bgrhsv']
+        print(f"  {name:<18}{hist.images:>8}" + ''.join(f"{m:>7.1f}" for m in means) +
+              f"{hist.compare(ref):>10.3f}{hist.compare(ref, 'v', cv2.HISTCMP_CORREL):>9.3f}")
+
+def plot_report(totals, out_path='HomeAssignment/Cache/histograms.png'):
+    from matplotlib import pyplot as plt
+    plt.figure(figsize=(12, 6))
+    for i, channel in enumerate('bgrhsv'):
+        plt.subplot(2, 3, i + 1)
+        plt.title(channel.upper())
+        for name, hist in totals.items():
+            if hist.images:
+                plt.plot(hist.normalized(channel), label=name)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(out_path)
+    plt.close()
+    print(f"Saved plot to {out_path}")
+
+def main():
+    backgrounds = get_images(BACKGROUND_DIR)
+    if not backgrounds:
+        print(f"Error: No wallpapers found in {BACKGROUND_DIR}")
+        return
+    train_bgs, test_bgs = get_background_split(backgrounds)
+
+    totals = collect({
+        'train_backgrounds': train_bgs,
+        'test_backgrounds': test_bgs,
+        'real_frames': REAL_FRAME_SOURCES,
+        'foregrounds_train': [os.path.join(FOREGROUND_ROOT_TRAIN, d) for d in sorted(os.listdir(FOREGROUND_ROOT_TRAIN))]
+                             if os.path.isdir(FOREGROUND_ROOT_TRAIN) else [],
+        'foregrounds_test': [os.path.join(FOREGROUND_ROOT_TEST, d) for d in sorted(os.listdir(FOREGROUND_ROOT_TEST))]
+                            if os.path.isdir(FOREGROUND_ROOT_TEST) else [],
+    })
+    report(totals, 'train_backgrounds')
+    plot_report(totals)
+
+if __name__ == "__main__":
+    main()
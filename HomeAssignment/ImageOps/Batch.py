@@ -0,0 +1,104 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# OpenCV releases the GIL inside its C++ calls, so a thread pool scales
+# across cores without the pickling cost of multiprocessing.
+DEFAULT_WORKERS = os.cpu_count() or 4
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+def apply_batch(func, images, out=None, workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Applies func(image, dst=..., **kwargs) to every image of an N x H x W (x C) array.
+
+    Results are written straight into `out` (allocated from the first result if not
+    given), so calling this repeatedly with the same `out` allocates nothing per frame.
+    """
+    n = len(images)
+    if n == 0:
+        return out
+
+    if out is None:
+        first = func(images[0], **kwargs)
+        out = np.empty((n,) + first.shape, dtype=first.dtype)
+        out[0] = first
+        start = 1
+    else:
+        start = 0
+
+    # OpenCV does its own threading inside each call; with one image per thread that just oversubscribes
+    prev_threads = cv2.getNumThreads()
+    cv2.setNumThreads(1)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda i: func(images[i], dst=out[i], **kwargs), range(start, n)))
+    finally:
+        cv2.setNumThreads(prev_threads)
+    return out
+
+def get_image_paths(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(VALID_EXTENSIONS))
+
+def iter_directory_batches(folder, batch_size=32, size=(640, 640), flags=cv2.IMREAD_COLOR, workers=DEFAULT_WORKERS):
+    """
+    Yields (paths, batch) where batch is a B x H x W x C uint8 array of images resized to `size`.
+
+    The batch array is reused between iterations - copy it if it must outlive the next step.
+    Decoding of the next batch runs in the background while the caller works on the current one.
+    """
+    paths = get_image_paths(folder)
+    channels = 1 if flags == cv2.IMREAD_GRAYSCALE else 3
+    shape = (size[1], size[0]) if channels == 1 else (size[1], size[0], channels)
+    buffers = [np.empty((batch_size,) + shape, dtype=np.uint8) for _ in range(2)]  # ping-pong
+
+    def load_into(batch_paths, buf):
+        def load(i):
+            img = cv2.imread(batch_paths[i], flags)
+            if img is None:
+                buf[i] = 0
+                return
+            if img.shape[:2] != shape[:2]:
+                cv2.resize(img, size, dst=buf[i], interpolation=cv2.INTER_AREA)
+            else:
+                buf[i] = img
+        list(pool.map(load, range(len(batch_paths))))
+        return buf[:len(batch_paths)]
+
+    chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(load_into, chunks[0], buffers[0]) if chunks else None
+        for k, chunk in enumerate(chunks):
+            batch = pending.result()
+            if k + 1 < len(chunks):
+                pending = prefetch.submit(load_into, chunks[k + 1], buffers[(k + 1) % 2])
+            yield chunk, batch
+
+def process_directory(func, folder, out_folder, workers=DEFAULT_WORKERS, ext='.jpg', **kwargs):
+    """
+    Runs func over every image in `folder` (any sizes) and writes the results to `out_folder`.
+    Each worker thread keeps its own output buffers per image shape, so images of the
+    same size never allocate a new result array.
+    """
+    os.makedirs(out_folder, exist_ok=True)
+    local = threading.local()
+
+    def run(path):
+        img = cv2.imread(path)
+        if img is None:
+            return False
+        if not hasattr(local, 'buffers'):
+            local.buffers = {}
+        key = img.shape
+        dst = local.buffers.get(key)
+        result = func(img, dst=dst, **kwargs)
+        local.buffers[key] = result
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cv2.imwrite(os.path.join(out_folder, name + ext), result)
+
+    paths = get_image_paths(folder)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(run, paths))
+    print(f"Processed {written}/{len(paths)} images from {folder} -> {out_folder}")
+    return written
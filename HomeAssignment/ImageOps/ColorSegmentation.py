@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import cv2
+import numpy as np
+
+# HSV range segmentation (Lecture4_Color_Spaces / worksheet5 / Color_Picker_Example)
+# as one table lookup. For every quantised BGR colour the table stores a bit mask
+# of the classes whose HSV ranges contain it, so a frame is segmented for all
+# classes at once with a single gather instead of cvtColor + inRange per class.
+#
+# Profile format (written by the trackbar tuner, HomeAssignment/Profiles/*.json):
+#   {"name": "...", "classes": {"<class>": [{"lower": [h, s, v], "upper": [h, s, v]}, ...], ...}}
+# A range with lower hue > upper hue wraps around 180 (reds). Trackbar-style
+# {"h_min", "h_max", "s_min", "s_max", "v_min", "v_max"} ranges are accepted too.
+
+PROFILE_DIR = 'HomeAssignment/Profiles'
+DEFAULT_BITS = 8                 # 8 = exact (same masks as cvtColor + inRange, 16 MB table); 5-6 = smaller tables
+
+def parse_range(r):
+    if 'lower' in r:
+        return tuple(int(v) for v in r['lower']), tuple(int(v) for v in r['upper'])
+    return (int(r['h_min']), int(r['s_min']), int(r['v_min'])), (int(r['h_max']), int(r['s_max']), int(r['v_max']))
+
+def load_profile(path):
+    """-> (name, {class: [(lower, upper), ...]}) with classes in file order."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    classes = {name: [parse_range(r) for r in (ranges if isinstance(ranges, list) else [ranges])]
+               for name, ranges in data['classes'].items()}
+    return data.get('name', os.path.splitext(os.path.basename(path))[0]), classes
+
+def save_profile(path, classes, name=None):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = {'name': name or os.path.splitext(os.path.basename(path))[0],
+            'classes': {c: [{'lower': list(lo), 'upper': list(hi)} for lo, hi in ranges] for c, ranges in classes.items()}}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def in_hsv_range(hsv, lower, upper):
+    """inRange with hue wrap-around, on an N x 3 HSV array -> bool[N]."""
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    sv = (s >= lower[1]) & (s <= upper[1]) & (v >= lower[2]) & (v <= upper[2])
+    if lower[0] <= upper[0]:
+        return sv & (h >= lower[0]) & (h <= upper[0])
+    return sv & ((h >= lower[0]) | (h <= upper[0]))
+
+class ColorSegmenter:
+    """
+    Precomputed BGR -> class bit mask table. Bit k of segment()'s output is set
+    where the pixel falls in class k's HSV ranges (k in self.class_names order).
+
+    The table is indexed by the pixel's bytes read as one little-endian integer
+    (B | G << 8 | R << 16), which cvtColor(BGR2BGRA) + a uint32 view produce
+    without any per-channel arithmetic. With bits < 8 the channels are first
+    quantised by cv2.LUT, which shrinks the table to 2^(16 + bits) entries.
+    """
+    def __init__(self, classes, bits=DEFAULT_BITS):
+        if not 1 <= len(classes) <= 32:
+            raise ValueError("ColorSegmenter supports 1-32 classes")
+        if sys.byteorder != 'little':
+            raise RuntimeError("ColorSegmenter reads BGRA pixels as little-endian uint32")
+        self.class_names = list(classes)
+        self.bits = bits
+        self.shift = 8 - bits
+        self.code_dtype = np.uint8 if len(classes) <= 8 else np.uint16 if len(classes) <= 16 else np.uint32
+        self.quantise = (np.arange(256) >> self.shift).astype(np.uint8) if bits < 8 else None
+        self.lut = self._build(classes)
+        self._buffers = {}
+
+    def _build(self, classes):
+        n = 1 << self.bits
+        # Centre of every BGR bin (exact colours when bits == 8), converted to HSV in one cvtColor call
+        levels = np.arange(n)
+        centres = (levels << self.shift) + ((1 << self.shift) >> 1)
+        b, g, r = np.meshgrid(centres, centres, centres, indexing='ij')
+        bgr = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1).astype(np.uint8)
+        hsv = cv2.cvtColor(bgr.reshape(-1, 1, 3), cv2.COLOR_BGR2HSV).reshape(-1, 3)
+        qb, qg, qr = np.meshgrid(levels, levels, levels, indexing='ij')
+        position = (qb.ravel() | (qg.ravel() << 8) | (qr.ravel() << 16))
+
+        codes = np.zeros(len(hsv), dtype=self.code_dtype)
+        for k, ranges in enumerate(classes.values()):
+            hit = np.zeros(len(hsv), dtype=bool)
+            for lower, upper in ranges:
+                hit |= in_hsv_range(hsv, lower, upper)
+            codes[hit] |= self.code_dtype(1 << k)
+
+        lut = np.zeros(n << 16, dtype=self.code_dtype)
+        lut[position] = codes
+        return lut
+
+    @classmethod
+    def from_profile(cls, path, bits=DEFAULT_BITS):
+        _, classes = load_profile(path)
+        return cls(classes, bits)
+
+    def _get_buffers(self, shape):
+        if shape not in self._buffers:
+            bgra = np.empty(shape + (4,), np.uint8)
+            quantised = np.empty(shape + (3,), np.uint8) if self.quantise is not None else None
+            self._buffers[shape] = (bgra, bgra.view(np.uint32).reshape(shape), quantised)
+        return self._buffers[shape]
+
+    def segment(self, frame, dst=None):
+        """BGR uint8 frame -> H x W class bit masks (one gather for all classes)."""
+        bgra, index, quantised = self._get_buffers(frame.shape[:2])
+        if quantised is not None:
+            frame = cv2.LUT(frame, self.quantise, dst=quantised)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=bgra)
+        np.bitwise_and(index, 0xFFFFFF, out=index)          # Drop the alpha byte
+        if dst is None:
+            dst = np.empty(frame.shape[:2], self.code_dtype)
+        return np.take(self.lut, index, out=dst, mode='clip')  # 'clip' avoids numpy's buffered bounds check
+
+    def mask(self, codes, class_name):
+        """0/255 uint8 mask of one class, like cv2.inRange returns."""
+        bit = self.code_dtype(1 << self.class_names.index(class_name))
+        return np.where(codes & bit, 255, 0).astype(np.uint8)
+
+    def coverage(self, codes):
+        """{class: fraction of pixels}. For up to 8 classes this is one bincount over the codes."""
+        if self.code_dtype == np.uint8:
+            counts = np.bincount(codes.ravel(), minlength=256)
+            per_code = np.arange(256)
+            return {name: counts[(per_code >> k) & 1 == 1].sum() / codes.size for k, name in enumerate(self.class_names)}
+        return {name: np.count_nonzero(codes & (1 << k)) / codes.size for k, name in enumerate(self.class_names)}
+
+def segment_reference(frame, classes):
+    """cvtColor + inRange per class, as in the lecture cells (benchmark / exactness baseline)."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    masks = {}
+    for name, ranges in classes.items():
+        mask = np.zeros(frame.shape[:2], np.uint8)
+        for lower, upper in ranges:
+            if lower[0] <= upper[0]:
+                mask |= cv2.inRange(hsv, lower, upper)
+            else:
+                mask |= cv2.inRange(hsv, lower, (179,) + tuple(upper[1:]))
+                mask |= cv2.inRange(hsv, (0,) + tuple(lower[1:]), upper)
+        masks[name] = mask
+    return masks
+
+def benchmark(frame_shape=(1080, 1920, 3), repeats=10):
+    """Build time, per-frame time and agreement with cvtColor + inRange for a few example ranges."""
+    classes = {
+        'dark_ui': [((0, 0, 0), (179, 60, 60))],
+        'light_ui': [((0, 0, 200), (179, 30, 255))],
+        'green_accent': [((40, 80, 80), (85, 255, 255))],
+        'red_accent': [((170, 100, 80), (10, 255, 255))],   # wraps around hue 0
+    }
+    rng = np.random.default_rng(0)
+    # Screen-like content: flat blocks of colour rather than per-pixel noise
+    blocks = rng.integers(0, 256, (frame_shape[0] // 20, frame_shape[1] // 20, 3), dtype=np.uint8)
+    frame = cv2.resize(blocks, (frame_shape[1], frame_shape[0]), interpolation=cv2.INTER_NEAREST)
+    reference = segment_reference(frame, classes)
+
+    def timed(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1000
+
+    t_ref = timed(lambda: segment_reference(frame, classes))
+    print(f"\n--- COLOUR SEGMENTATION ({frame_shape[1]}x{frame_shape[0]}, {len(classes)} classes) ---")
+    print(f"  cvtColor + inRange per class: {t_ref:8.2f} ms")
+    for bits in (5, 6, 8):
+        start = time.perf_counter()
+        seg = ColorSegmenter(classes, bits)
+        build = (time.perf_counter() - start) * 1000
+        dst = np.empty(frame_shape[:2], seg.code_dtype)
+        t = timed(lambda: seg.segment(frame, dst))
+        agree = np.mean([np.mean(seg.mask(dst, c) == reference[c]) for c in classes])
+        print(f"  LUT {1 << bits:>3}^3 ({seg.lut.nbytes >> 20:>2} MB, build {build:7.1f} ms): {t:8.2f} ms   pixel agreement {agree:.4%}")
+
+if __name__ == "__main__":
+    benchmark()
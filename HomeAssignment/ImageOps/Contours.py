@@ -0,0 +1,193 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from .Batch import DEFAULT_WORKERS, get_image_paths
+
+# Contour features for whole batches (Lecture12_ContourDetection / Worksheet12).
+# findContours still runs once per image, but every contour of every image is
+# then concatenated into one point array and the features are computed with
+# np.add.reduceat / np.minimum.reduceat over the contour segments, instead of a
+# moments/contourArea/arcLength call per contour.
+
+FEATURE_DTYPE = np.dtype([
+    ('image', np.int32), ('contour', np.int32), ('n_points', np.int32),
+    ('area', np.float64), ('perimeter', np.float64), ('cx', np.float64), ('cy', np.float64),
+    ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+    ('extent', np.float64),       # area / bounding box area
+    ('solidity', np.float64),     # area / convex hull area (NaN when not computed)
+])
+
+def find_contours(binaries, mode=cv2.RETR_EXTERNAL, workers=DEFAULT_WORKERS):
+    """findContours over a batch on a thread pool -> list (per image) of contour lists."""
+    def run(img):
+        contours, _ = cv2.findContours(img, mode, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, binaries))
+
+def flatten(contours_per_image):
+    """
+    -> (points[M, 2] float64, starts[K], image_index[K], contour_index[K]) where
+    contour k owns points[starts[k]:starts[k + 1]].
+    """
+    counts = [len(contours) for contours in contours_per_image]
+    flat = [c for contours in contours_per_image for c in contours]
+    if not flat:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros((0, 2)), empty, empty, empty
+    lengths = np.fromiter(map(len, flat), dtype=np.int64, count=len(flat))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    image_index = np.repeat(np.arange(len(counts)), counts)
+    contour_index = np.arange(len(flat)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.concatenate(flat).reshape(-1, 2).astype(np.float64), starts, image_index, contour_index
+
+def _next_index(starts, total):
+    """Index of the following point inside the same (closed) contour."""
+    nxt = np.arange(1, total + 1)
+    ends = np.append(starts[1:], total)
+    nxt[ends - 1] = starts
+    return nxt
+
+def _signed_areas(points, starts):
+    """Shoelace formula per contour; same value cv2.contourArea(c, oriented=True) gives (up to sign)."""
+    x, y = points[:, 0], points[:, 1]
+    nxt = _next_index(starts, len(points))
+    cross = x * y[nxt] - x[nxt] * y
+    return 0.5 * np.add.reduceat(cross, starts), cross, nxt
+
+def _hull_areas(contours):
+    """Convex hull areas: one cv2.convexHull per contour (the only per-contour call), areas vectorized."""
+    points, starts, _, _ = flatten([[cv2.convexHull(c) for c in contours]])
+    if not len(starts):
+        return np.zeros(0)
+    return np.abs(_signed_areas(points, starts)[0])
+
+def contour_features(contours_per_image, solidity=True, hull_min_area=0):
+    """
+    Structured array (FEATURE_DTYPE), one row per contour of every image.
+    The convex hull is the one feature that needs a cv2 call per contour, so it is
+    only computed for contours of at least `hull_min_area` (solidity NaN otherwise).
+    """
+    points, starts, image_index, contour_index = flatten(contours_per_image)
+    out = np.zeros(len(starts), dtype=FEATURE_DTYPE)
+    if not len(starts):
+        return out
+
+    signed, cross, nxt = _signed_areas(points, starts)
+    x, y = points[:, 0], points[:, 1]
+    n_points = np.diff(np.append(starts, len(points)))
+
+    # Polygon moments (as cv2.moments on a contour): m10 = sum((x_i + x_i+1) * cross_i) / 6
+    m10 = np.add.reduceat((x + x[nxt]) * cross, starts) / 6
+    m01 = np.add.reduceat((y + y[nxt]) * cross, starts) / 6
+    safe = np.abs(signed) > 1e-9
+    denom = np.where(safe, signed, 1)
+    mean_x = np.add.reduceat(x, starts) / n_points      # Degenerate (line/point) contours: mean of the points
+    mean_y = np.add.reduceat(y, starts) / n_points
+
+    x0, y0 = np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts)
+    w = np.maximum.reduceat(x, starts) - x0 + 1
+    h = np.maximum.reduceat(y, starts) - y0 + 1
+
+    out['image'], out['contour'], out['n_points'] = image_index, contour_index, n_points
+    out['area'] = np.abs(signed)
+    out['perimeter'] = np.add.reduceat(np.hypot(x[nxt] - x, y[nxt] - y), starts)
+    out['cx'] = np.where(safe, m10 / denom, mean_x)
+    out['cy'] = np.where(safe, m01 / denom, mean_y)
+    out['x'], out['y'], out['w'], out['h'] = x0, y0, w, h
+    out['extent'] = out['area'] / (w * h)
+    out['solidity'] = np.nan
+    if solidity:
+        idx = np.flatnonzero(out['area'] >= hull_min_area)
+        flat = [c for contours in contours_per_image for c in contours]
+        hull = _hull_areas([flat[i] for i in idx])
+        out['solidity'][idx] = np.where(hull > 0, out['area'][idx] / np.where(hull > 0, hull, 1), 0)
+    return out
+
+def batch_features(binaries, mode=cv2.RETR_EXTERNAL, solidity=True, hull_min_area=0, workers=DEFAULT_WORKERS):
+    """Contours + features for a batch of binary (uint8) images."""
+    return contour_features(find_contours(binaries, mode, workers), solidity, hull_min_area)
+
+def to_dataframe(features):
+    """Optional pandas view of a feature array."""
+    import pandas as pd
+    return pd.DataFrame.from_records(features)
+
+# --- DATASET SANITY CHECK ---
+
+def check_foregrounds(folder, min_solidity=0.97, min_extent=0.95, workers=DEFAULT_WORKERS):
+    """
+    Foreground screenshots should have an alpha mask that is one solid rectangle.
+    Returns [(path, reason)] for files whose largest visible region isn't.
+    """
+    paths = get_image_paths(folder)
+
+    def load_mask(path):
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return None
+        if img.ndim == 3 and img.shape[2] == 4:
+            return np.where(img[:, :, 3] > 0, 255, 0).astype(np.uint8)
+        return np.full(img.shape[:2], 255, np.uint8)   # No alpha: the whole image is the window
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        masks = list(pool.map(load_mask, paths))
+    valid = [i for i, m in enumerate(masks) if m is not None]
+    features = batch_features([masks[i] for i in valid], workers=workers)
+
+    problems = [(paths[i], 'unreadable') for i, m in enumerate(masks) if m is None]
+    for k, i in enumerate(valid):
+        rows = features[features['image'] == k]
+        if not len(rows):
+            problems.append((paths[i], 'fully transparent'))
+            continue
+        main = rows[np.argmax(rows['area'])]
+        if len(rows) > 1:
+            problems.append((paths[i], f"{len(rows)} separate regions"))
+        elif main['solidity'] < min_solidity or main['extent'] < min_extent:
+            problems.append((paths[i], f"not rectangular (solidity {main['solidity']:.2f}, extent {main['extent']:.2f})"))
+    print(f"Checked {len(paths)} foregrounds in {folder}: {len(problems)} problems")
+    return problems
+
+def benchmark(n_images=64, size=(720, 1280), blobs=40):
+    """Per-contour cv2 loop (as in the lecture) vs contour_features() on random blob masks."""
+    rng = np.random.default_rng(0)
+    binaries = np.zeros((n_images,) + size, dtype=np.uint8)
+    for img in binaries:
+        for _ in range(blobs):
+            cx, cy = rng.integers(0, size[1]), rng.integers(0, size[0])
+            cv2.ellipse(img, (int(cx), int(cy)), tuple(int(a) for a in rng.integers(5, 40, 2)),
+                        float(rng.uniform(0, 180)), 0, 360, 255, -1)
+    contours = find_contours(binaries)
+    n = sum(len(c) for c in contours)
+
+    start = time.perf_counter()
+    for cs in contours:
+        for c in cs:
+            M = cv2.moments(c)
+            area = cv2.contourArea(c)
+            perimeter = cv2.arcLength(c, True)
+            x, y, w, h = cv2.boundingRect(c)
+            hull_area = cv2.contourArea(cv2.convexHull(c))
+            cx, cy = (M['m10'] / M['m00'], M['m01'] / M['m00']) if M['m00'] else (x, y)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    contour_features(contours)
+    t_vec = time.perf_counter() - start
+    start = time.perf_counter()
+    contour_features(contours, hull_min_area=1000)
+    t_vec_big = time.perf_counter() - start
+    start = time.perf_counter()
+    contour_features(contours, solidity=False)
+    t_vec_nohull = time.perf_counter() - start
+
+    print(f"\n--- CONTOUR FEATURES ({n_images} images, {n} contours) ---")
+    print(f"  per-contour cv2 loop:        {t_loop * 1000:8.1f} ms")
+    print(f"  contour_features():          {t_vec * 1000:8.1f} ms  ({t_loop / t_vec:.1f}x)")
+    print(f"  hull only for area >= 1000:  {t_vec_big * 1000:8.1f} ms  ({t_loop / t_vec_big:.1f}x)")
+    print(f"  contour_features(no hull):   {t_vec_nohull * 1000:8.1f} ms  ({t_loop / t_vec_nohull:.1f}x)")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,150 @@
+import time
+from functools import lru_cache
+import cv2
+import numpy as np
+
+# Picks the cheapest way to apply a 2-D kernel:
+#   rank-1 kernel      -> two 1-D passes (cv2.sepFilter2D), cost ~ 2k per pixel instead of k^2
+#   large dense kernel -> FFT, cost independent of kernel size (opt-in, see FFT_KERNEL_THRESHOLD)
+#   small dense kernel -> cv2.filter2D
+# Results match cv2.filter2D(image, -1, kernel) (correlation, BORDER_REFLECT_101).
+
+SEPARABLE_TOLERANCE = 1e-6   # 2nd singular value / 1st below this counts as rank-1
+
+# Dense kernels at least this wide go through fft_filter(). None keeps them on
+# cv2.filter2D, which already switches to its own tiled DFT from 11x11 upwards and
+# was 2-3x faster than a whole-frame FFT on 4K frames in benchmark(). Set a value
+# for inputs filter2D can't take (e.g. float64 batches) or machines where FFT wins.
+FFT_KERNEL_THRESHOLD = None
+
+@lru_cache(maxsize=64)
+def _analyse(kernel_bytes, shape):
+    kernel = np.frombuffer(kernel_bytes, dtype=np.float64).reshape(shape)
+    u, s, vt = np.linalg.svd(kernel)
+    if s[0] == 0 or (len(s) > 1 and s[1] / s[0] > SEPARABLE_TOLERANCE):
+        return None
+    root = np.sqrt(s[0])
+    return (u[:, 0] * root).astype(np.float32), (vt[0] * root).astype(np.float32)
+
+def separable_factors(kernel):
+    """Returns (column, row) 1-D kernels with outer(column, row) == kernel, or None if not rank-1."""
+    kernel = np.ascontiguousarray(kernel, dtype=np.float64)
+    return _analyse(kernel.tobytes(), kernel.shape)
+
+def choose_method(kernel, fft_threshold=FFT_KERNEL_THRESHOLD):
+    if separable_factors(kernel) is not None:
+        return 'separable'
+    if fft_threshold is not None and max(kernel.shape) >= fft_threshold:
+        return 'fft'
+    return 'filter2d'
+
+def _saturate(result, dtype, dst):
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        np.rint(result, out=result)
+        np.clip(result, info.min, info.max, out=result)
+    if dst is None:
+        return result.astype(dtype)
+    np.copyto(dst, result, casting='unsafe')
+    return dst
+
+def fft_filter(images, kernel, dst=None, spatial_axes=(0, 1)):
+    """
+    Correlates images with kernel via FFT. `spatial_axes` selects H/W, so a whole
+    N x H x W x C batch is transformed in one call with spatial_axes=(1, 2).
+    """
+    kh, kw = kernel.shape
+    top, left = kh // 2, kw // 2          # filter2D's default anchor is the kernel centre
+    bottom, right = kh - 1 - top, kw - 1 - left
+
+    pad = [(0, 0)] * images.ndim
+    pad[spatial_axes[0]] = (top, bottom)
+    pad[spatial_axes[1]] = (left, right)
+    padded = np.pad(images.astype(np.float32, copy=False), pad, mode='reflect')  # == BORDER_REFLECT_101
+
+    h, w = padded.shape[spatial_axes[0]], padded.shape[spatial_axes[1]]
+    fh, fw = cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w)
+
+    # Correlation == convolution with the flipped kernel
+    kernel_f = np.fft.rfft2(kernel[::-1, ::-1].astype(np.float32), s=(fh, fw))
+    shape = [1] * images.ndim
+    shape[spatial_axes[0]], shape[spatial_axes[1]] = kernel_f.shape
+    kernel_f = kernel_f.reshape(shape)
+
+    spectrum = np.fft.rfft2(padded, s=(fh, fw), axes=spatial_axes)
+    spectrum *= kernel_f
+    full = np.fft.irfft2(spectrum, s=(fh, fw), axes=spatial_axes)
+
+    # The 'valid' part of the full convolution is exactly the original image area
+    index = [slice(None)] * images.ndim
+    index[spatial_axes[0]] = slice(kh - 1, kh - 1 + images.shape[spatial_axes[0]])
+    index[spatial_axes[1]] = slice(kw - 1, kw - 1 + images.shape[spatial_axes[1]])
+    return _saturate(np.ascontiguousarray(full[tuple(index)], dtype=np.float32), images.dtype, dst)
+
+def convolve(image, kernel, dst=None, fft_threshold=FFT_KERNEL_THRESHOLD):
+    """Drop-in replacement for cv2.filter2D(image, -1, kernel) that picks the fastest method."""
+    kernel = np.asarray(kernel, dtype=np.float32)
+    method = choose_method(kernel, fft_threshold)
+
+    if method == 'separable':
+        column, row = separable_factors(kernel)
+        return cv2.sepFilter2D(image, -1, row, column, dst=dst)
+    if method == 'fft':
+        return fft_filter(image, kernel, dst)
+    return cv2.filter2D(image, -1, kernel, dst=dst)
+
+def convolve_batch(images, kernel, out=None, fft_threshold=FFT_KERNEL_THRESHOLD, workers=None):
+    """
+    Same as convolve() for an N x H x W (x C) batch. The FFT path transforms the
+    whole batch at once; the other paths run per image on the thread pool.
+    """
+    from .Batch import apply_batch, DEFAULT_WORKERS
+
+    kernel = np.asarray(kernel, dtype=np.float32)
+    if choose_method(kernel, fft_threshold) == 'fft':
+        return fft_filter(images, kernel, out, spatial_axes=(1, 2))
+    return apply_batch(convolve, images, out=out, workers=workers or DEFAULT_WORKERS,
+                       kernel=kernel, fft_threshold=fft_threshold)
+
+# --- KERNELS (generalised from Worksheet8-Filters) ---
+
+def gaussian_kernel(ksize, sigma=0):
+    """ksize=3 gives the worksheet's [[1,2,1],[2,4,2],[1,2,1]]/16 kernel."""
+    g = cv2.getGaussianKernel(ksize, sigma)
+    return (g @ g.T).astype(np.float32)
+
+def emboss_kernel(ksize):
+    """ksize=3 gives the worksheet's [[-2,-1,0],[-1,1,1],[0,1,2]] kernel."""
+    i, j = np.indices((ksize, ksize))
+    kernel = (i + j - (ksize - 1)).astype(np.float32)
+    kernel[ksize // 2, ksize // 2] += 1
+    return kernel
+
+def benchmark(sizes=(3, 5, 7, 9, 15, 21, 31, 45, 63), frame_shape=(2160, 3840, 3), repeats=3):
+    """Compares cv2.filter2D with convolve() on a 4K frame for separable and dense kernels."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, frame_shape, dtype=np.uint8)
+    dst = np.empty_like(frame)
+
+    def timed(fn):
+        fn()  # warm-up (allocations, FFT plans)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1000
+
+    print(f"\n--- CONVOLUTION BENCHMARK ({frame_shape[1]}x{frame_shape[0]}x{frame_shape[2]}, ms per frame) ---")
+    print(f"  {'kernel':<10}{'k':>4}{'method':>12}{'filter2D':>10}{'engine':>10}{'speed-up':>10}{'fft':>10}{'max diff':>10}")
+    for name, make in (('gaussian', gaussian_kernel), ('emboss', emboss_kernel)):
+        for k in sizes:
+            kernel = make(k)
+            reference = cv2.filter2D(frame, -1, kernel)
+            t_ref = timed(lambda: cv2.filter2D(frame, -1, kernel, dst=dst))
+            t_new = timed(lambda: convolve(frame, kernel, dst=dst))
+            t_fft = timed(lambda: fft_filter(frame, kernel, dst)) if k >= 9 else float('nan')
+            diff = int(np.abs(convolve(frame, kernel).astype(np.int16) - reference).max())
+            print(f"  {name:<10}{k:>4}{choose_method(kernel):>12}{t_ref:>10.1f}{t_new:>10.1f}"
+                  f"{t_ref / t_new:>9.2f}x{t_fft:>10.1f}{diff:>10}")
+
+if __name__ == "__main__":
+    benchmark()
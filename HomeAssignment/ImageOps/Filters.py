@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+from .Convolution import convolve, gaussian_kernel, emboss_kernel
+from . import Noise
+
+# Single-image operators from the worksheets/lectures, made reusable.
+# Every operator accepts an optional `dst` array; when given, the result is
+# written into it instead of allocating a new image (see Batch.py).
+
+EMBOSS_KERNEL = np.array([[ -2, -1, 0],
+                          [ -1,  1, 1],
+                          [  0,  1, 2]], dtype=np.float32)
+
+GAUSSIAN_KERNEL = np.array([[1, 2, 1],
+                            [2, 4, 2],
+                            [1, 2, 1]], dtype=np.float32) / 16  # Divisor is the sum of the kernel
+
+# Worksheet8-Filters
+def emboss(image, dst=None, ksize=3):
+    """Emboss (high pass) filter, shifted by +128 so negative responses stay visible."""
+    kernel = EMBOSS_KERNEL if ksize == 3 else emboss_kernel(ksize)
+    dst = convolve(image, kernel, dst=dst)
+    # 1.5 * filtered + 128 (the zero image from the worksheet is not needed: beta=0)
+    return cv2.addWeighted(dst, 1.5, dst, 0, 128, dst=dst)
+
+# Worksheet8-Filters
+def Gausian_blur(image, dst=None, ksize=3, sigma=0):
+    """ksize=3 is the worksheet kernel; larger sizes are separable and run as two 1-D passes."""
+    kernel = GAUSSIAN_KERNEL if ksize == 3 else gaussian_kernel(ksize, sigma)
+    return convolve(image, kernel, dst=dst)
+
+# Worksheet8-Filters
+def addsalt_pepper(img, SNR, dst=None, rng=None):
+    """
+    Salt & pepper noise on an H x W (x C) image. SNR is the fraction of pixels left untouched.
+    The same mask is used for every channel (as in the worksheet), via broadcasting instead of np.repeat.
+    """
+    if dst is None:
+        dst = img.copy()
+    elif dst is not img:
+        np.copyto(dst, img)
+    return Noise.salt_pepper(dst, SNR, rng)
+
+# worksheet10-binaryImages
+def BWThreshold(im, thresh=0.5, dst=None):
+    limit = int(thresh * 255)
+    ret, dst = cv2.threshold(im, limit, 255, cv2.THRESH_BINARY, dst=dst)
+    return dst
+
+def to_gray(image):
+    if image.ndim == 3 and image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+# Lecture11_Edge_Detection: the chains all start with a 3x3 Gaussian on the grey image
+def laplacian_edges(image, dst=None):
+    img_gaussian = cv2.GaussianBlur(to_gray(image), (3, 3), 0)
+    laplacian = cv2.Laplacian(img_gaussian, cv2.CV_16S)
+    return cv2.convertScaleAbs(laplacian, dst=dst)
+
+def sobel_edges(image, ksize=5, dst=None):
+    """|Sobel X| + |Sobel Y| of the blurred grey image, as uint8."""
+    img_gaussian = cv2.GaussianBlur(to_gray(image), (3, 3), 0)
+    sobelx = cv2.Sobel(img_gaussian, cv2.CV_32F, 1, 0, ksize=ksize)
+    sobely = cv2.Sobel(img_gaussian, cv2.CV_32F, 0, 1, ksize=ksize)
+    magnitude = cv2.add(cv2.absdiff(sobelx, 0), cv2.absdiff(sobely, 0))
+    return cv2.convertScaleAbs(magnitude, dst=dst)
+
+def canny_edges(image, low=40, high=100, dst=None):
+    img_gaussian = cv2.GaussianBlur(to_gray(image), (3, 3), 0)
+    return cv2.Canny(img_gaussian, low, high, edges=dst)
@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+
+# Histogram equalisation / matching as 256-entry lookup tables (Lecture6-Histograms,
+# Worksheet7-HistogramOperations). A LUT is built once from histograms and then
+# applied with cv2.LUT / PIL Image.point, which is a single table lookup per pixel.
+
+IDENTITY_LUT = np.arange(256, dtype=np.uint8)
+
+def channel_histograms(img, mask=None):
+    """calcHist of every channel of an H x W x C uint8 image -> C x 256 float32 array."""
+    if img.ndim == 2:
+        img = img[:, :, None]
+    return np.stack([cv2.calcHist([img], [c], mask, [256], [0, 256]).ravel() for c in range(img.shape[2])])
+
+def equalize_lut(hist):
+    """The LUT cv2.equalizeHist would apply to an image with this histogram."""
+    hist = np.asarray(hist, dtype=np.float64)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    cdf_min = cdf[np.argmax(hist > 0)] if total else 0
+    if total == cdf_min:               # Constant image: equalizeHist leaves it unchanged
+        return IDENTITY_LUT.copy()
+    lut = np.round((cdf - cdf_min) * 255.0 / (total - cdf_min))
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+def match_lut(src_hist, ref_hist):
+    """LUT that maps values distributed like src_hist onto ref_hist's distribution (CDF matching)."""
+    src_cdf = np.cumsum(src_hist, dtype=np.float64)
+    ref_cdf = np.cumsum(ref_hist, dtype=np.float64)
+    if not src_cdf[-1] or not ref_cdf[-1]:
+        return IDENTITY_LUT.copy()
+    src_cdf /= src_cdf[-1]
+    ref_cdf /= ref_cdf[-1]
+    return np.clip(np.searchsorted(ref_cdf, src_cdf), 0, 255).astype(np.uint8)
+
+def blend_lut(lut, strength):
+    """strength 0 = identity, 1 = full LUT. Blending tables is the same as blending the outputs."""
+    if strength >= 1:
+        return lut
+    return np.round(IDENTITY_LUT + (lut.astype(np.float32) - IDENTITY_LUT) * strength).astype(np.uint8)
+
+def apply_lut(img, luts, dst=None):
+    """One LUT for all channels, or a C x 256 array with one LUT per channel."""
+    luts = np.asarray(luts, dtype=np.uint8)
+    if luts.ndim == 1:
+        return cv2.LUT(img, luts, dst=dst)
+    return cv2.LUT(img, np.ascontiguousarray(luts.T.reshape(256, 1, -1)), dst=dst)
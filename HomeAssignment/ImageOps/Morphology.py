@@ -0,0 +1,264 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from .Batch import DEFAULT_WORKERS
+
+# Declarative chain of the binary-image operations from lecture9 / worksheet10
+# (threshold, adaptiveThreshold, medianBlur, erode, dilate, morphologyEx):
+#
+#   pipe = BinaryPipeline(['gray', ('median', {'ksize': 5}), ('adaptive', {'block': 11, 'C': 2}),
+#                          ('open', {'ksize': 3})])
+#   mask = pipe(frame)
+#
+# The chain is compiled once (kernels, flags, halo sizes). Every call then runs
+# through two preallocated ping-pong buffers per frame size, so a step never
+# allocates its output. Frames of TILE_MIN_PIXELS or more are split into
+# horizontal strips processed on a thread pool; each strip is extended by the
+# step's reach (halo) so the result is identical to the untiled one.
+
+TILE_MIN_PIXELS = 4_000_000     # ~4K frames and up are tiled; smaller frames run each step in one call
+DEFAULT_SCREEN_MASK = [          # UI structure mask for screen recordings
+    'gray',
+    ('median', {'ksize': 3}),
+    ('adaptive', {'block': 15, 'C': 5, 'method': 'gaussian', 'inverse': True}),
+    ('close', {'ksize': 5}),
+    ('open', {'ksize': 3}),
+]
+
+SHAPES = {'rect': cv2.MORPH_RECT, 'ellipse': cv2.MORPH_ELLIPSE, 'cross': cv2.MORPH_CROSS}
+MORPH_OPS = {'open': cv2.MORPH_OPEN, 'close': cv2.MORPH_CLOSE, 'gradient': cv2.MORPH_GRADIENT,
+             'tophat': cv2.MORPH_TOPHAT, 'blackhat': cv2.MORPH_BLACKHAT}
+
+class Step:
+    """One compiled operation: func(src, dst) plus how far it reads around a pixel."""
+    def __init__(self, name, func, halo, tileable=True):
+        self.name = name
+        self.func = func
+        self.halo = halo
+        self.tileable = tileable
+
+def _gray(src, dst):
+    if src.ndim == 2:
+        np.copyto(dst, src)
+    else:
+        cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst)
+
+def compile_step(spec):
+    """'name' or ('name', {params}) -> Step."""
+    name, params = (spec, {}) if isinstance(spec, str) else (spec[0], dict(spec[1]) if len(spec) > 1 else {})
+
+    if name == 'gray':
+        return Step(name, _gray, 0)
+
+    if name == 'threshold':
+        thresh = params.get('thresh', 127)
+        kind = cv2.THRESH_BINARY_INV if params.get('inverse') else cv2.THRESH_BINARY
+        if params.get('otsu'):
+            # Otsu picks one threshold from the whole image's histogram, so it can't be split into strips
+            return Step(name, lambda s, d: cv2.threshold(s, 0, 255, kind + cv2.THRESH_OTSU, dst=d), 0, tileable=False)
+        return Step(name, lambda s, d: cv2.threshold(s, thresh, 255, kind, dst=d), 0)
+
+    if name == 'adaptive':
+        block, C = params.get('block', 11), params.get('C', 2)
+        method = cv2.ADAPTIVE_THRESH_GAUSSIAN_C if params.get('method', 'mean') == 'gaussian' else cv2.ADAPTIVE_THRESH_MEAN_C
+        kind = cv2.THRESH_BINARY_INV if params.get('inverse') else cv2.THRESH_BINARY
+        return Step(name, lambda s, d: cv2.adaptiveThreshold(s, 255, method, kind, block, C, dst=d), block // 2)
+
+    if name == 'median':
+        ksize = params.get('ksize', 5)
+        return Step(name, lambda s, d: cv2.medianBlur(s, ksize, dst=d), ksize // 2)
+
+    if name == 'blur':
+        ksize = params.get('ksize', 3)
+        return Step(name, lambda s, d: cv2.GaussianBlur(s, (ksize, ksize), 0, dst=d), ksize // 2)
+
+    if name in ('erode', 'dilate') or name in MORPH_OPS:
+        ksize, iterations = params.get('ksize', 5), params.get('iterations', 1)
+        kernel = cv2.getStructuringElement(SHAPES[params.get('shape', 'rect')], (ksize, ksize))
+        reach = (ksize // 2) * iterations
+        if name == 'erode':
+            return Step(name, lambda s, d: cv2.erode(s, kernel, dst=d, iterations=iterations), reach)
+        if name == 'dilate':
+            return Step(name, lambda s, d: cv2.dilate(s, kernel, dst=d, iterations=iterations), reach)
+        op = MORPH_OPS[name]
+        # open/close/top/black-hat are an erode and a dilate in sequence, so they reach twice as far
+        return Step(name, lambda s, d: cv2.morphologyEx(s, op, kernel, dst=d, iterations=iterations),
+                    reach if name == 'gradient' else 2 * reach)
+
+    raise ValueError(f"Unknown binary pipeline step {name!r}")
+
+class BinaryPipeline:
+    def __init__(self, steps=DEFAULT_SCREEN_MASK, workers=DEFAULT_WORKERS, tile_min_pixels=TILE_MIN_PIXELS):
+        self.steps = [compile_step(s) for s in steps]
+        if not self.steps:
+            raise ValueError("A pipeline needs at least one step")
+        if self.steps[0].name != 'gray':
+            self.steps.insert(0, compile_step('gray'))   # Every later step works on one channel
+        self.workers = workers
+        self.tile_min_pixels = tile_min_pixels
+        self.timings = np.zeros(len(self.steps))
+        self.frames = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _buffers(self, shape):
+        """Two uint8 H x W buffers per frame size and calling thread."""
+        if not hasattr(self._local, 'buffers'):
+            self._local.buffers = {}
+        if shape not in self._local.buffers:
+            self._local.buffers[shape] = (np.empty(shape, np.uint8), np.empty(shape, np.uint8))
+        return self._local.buffers[shape]
+
+    def _scratch(self, shape):
+        """Per worker-thread strip buffer for steps with a halo."""
+        if not hasattr(self._local, 'scratch') or self._local.scratch.shape != shape:
+            self._local.scratch = np.empty(shape, np.uint8)
+        return self._local.scratch
+
+    def _run_tiled(self, step, src, dst):
+        h = src.shape[0]
+        rows = -(-h // self.workers)
+
+        def work(k):
+            y0, y1 = k * rows, min(h, (k + 1) * rows)
+            if y0 >= y1:
+                return
+            if step.halo == 0:
+                step.func(src[y0:y1], dst[y0:y1])
+                return
+            a, b = max(0, y0 - step.halo), min(h, y1 + step.halo)
+            scratch = self._scratch((b - a,) + dst.shape[1:])
+            step.func(src[a:b], scratch)
+            dst[y0:y1] = scratch[y0 - a:y1 - a]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='binary-tile')
+        list(self._pool.map(work, range(self.workers)))
+
+    def __call__(self, image, dst=None):
+        """
+        Runs the chain on one frame. The last step writes into `dst` when given;
+        otherwise the result is copied out of the ping-pong buffers.
+        """
+        shape = image.shape[:2]
+        buffers = self._buffers(shape)
+        tiled = self.workers > 1 and shape[0] * shape[1] >= self.tile_min_pixels
+        elapsed = np.zeros(len(self.steps))
+
+        src = image
+        for i, step in enumerate(self.steps):
+            last = i == len(self.steps) - 1
+            out = dst if last and dst is not None else buffers[i % 2]
+            t0 = time.perf_counter()
+            if tiled and step.tileable:
+                self._run_tiled(step, src, out)
+            else:
+                step.func(src, out)
+            elapsed[i] = time.perf_counter() - t0
+            src = out
+
+        with self._lock:
+            self.timings += elapsed
+            self.frames += 1
+        return src if dst is not None else src.copy()
+
+    def run_batch(self, images, out=None):
+        """N x H x W (x C) batch -> N x H x W masks, each frame written straight into `out`."""
+        if out is None:
+            out = np.empty((len(images),) + images[0].shape[:2], dtype=np.uint8)
+        for i, img in enumerate(images):
+            self(img, dst=out[i])
+        return out
+
+    def iter_video(self, video_path, step=1):
+        """
+        Yields (frame index, mask) for every `step`-th frame. The mask array is reused:
+        copy it if it has to outlive the next iteration.
+        """
+        cap = cv2.VideoCapture(video_path)
+        mask, idx = None, 0
+        while cap.grab():
+            if idx % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok: break
+                if mask is None:
+                    mask = np.empty(frame.shape[:2], np.uint8)
+                yield idx, self(frame, dst=mask)
+            idx += 1
+        cap.release()
+
+    def process_video(self, video_path, out_path, step=1):
+        """Writes the mask of every `step`-th frame of a recording to a greyscale video."""
+        cap = cv2.VideoCapture(video_path)
+        fps = (cap.get(cv2.CAP_PROP_FPS) or 30) / step
+        cap.release()
+        writer = None
+        n = 0
+        for _, mask in self.iter_video(video_path, step):
+            if writer is None:
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps,
+                                         (mask.shape[1], mask.shape[0]), isColor=False)
+            writer.write(mask)
+            n += 1
+        if writer is not None:
+            writer.release()
+        print(f"Wrote {n} masks from {video_path} to {out_path}")
+        self.report()
+        return n
+
+    def report(self):
+        if not self.frames: return
+        total = self.timings.sum()
+        print(f"\n--- BINARY PIPELINE ({self.frames} frames, {total / self.frames * 1000:.2f} ms/frame) ---")
+        for step, t in zip(self.steps, self.timings):
+            print(f"  {step.name:<10}{t / self.frames * 1000:8.2f} ms  {t / max(total, 1e-12):6.1%}")
+
+    def reset_timings(self):
+        self.timings[:] = 0
+        self.frames = 0
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+def _worksheet_chain(frame):
+    """The same DEFAULT_SCREEN_MASK chain written cell-style, allocating at every step (benchmark baseline)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.medianBlur(gray, 3)
+    th = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 15, 5)
+    closed = cv2.morphologyEx(th, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+    return cv2.morphologyEx(closed, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+def benchmark(frame_shapes=((1080, 1920, 3), (2160, 3840, 3)), repeats=10):
+    rng = np.random.default_rng(0)
+    for shape in frame_shapes:
+        frame = cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (5, 5), 0)
+        reference = _worksheet_chain(frame)
+        dst = np.empty(shape[:2], np.uint8)
+        single = BinaryPipeline(workers=1)
+        tiled = BinaryPipeline(tile_min_pixels=0)
+
+        def timed(fn):
+            fn()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn()
+            return (time.perf_counter() - start) / repeats * 1000
+
+        t_ref = timed(lambda: _worksheet_chain(frame))
+        single.reset_timings()
+        t_single = timed(lambda: single(frame, dst=dst))
+        assert np.array_equal(dst, reference)
+        t_tiled = timed(lambda: tiled(frame, dst=dst))
+        assert np.array_equal(dst, reference)
+        print(f"\n{shape[1]}x{shape[0]}: worksheet chain {t_ref:.2f} ms, pipeline {t_single:.2f} ms, "
+              f"tiled ({tiled.workers} threads) {t_tiled:.2f} ms")
+        single.report()
+        tiled.close()
+
+if __name__ == "__main__":
+    benchmark()
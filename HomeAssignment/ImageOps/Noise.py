@@ -0,0 +1,139 @@
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+# Noise augmentations that work IN PLACE on uint8 H x W (x C) images.
+# Per-pixel random draws are made once per pixel (not per channel) and broadcast
+# over the channels, and float work is done in row blocks so the temporaries
+# stay a few MB even on 4K frames.
+
+ROW_BLOCK = 64    # Rows per block: bounds the temporaries to ~1-4 MB on a 4K frame
+
+def _rng(rng):
+    return rng if rng is not None else np.random.default_rng()
+
+def salt_pepper(img, snr=0.9, rng=None):
+    """
+    Sets (1 - snr) of the pixels to white or black (half each), all channels at once.
+    Draws one uint16 per pixel instead of an int64 choice per pixel, and no channel repeat.
+    """
+    rng = _rng(rng)
+    h = img.shape[0]
+    half = int((1 - snr) / 2 * 65536)
+    for y in range(0, h, ROW_BLOCK):
+        block = img[y:y + ROW_BLOCK]
+        r = rng.integers(0, 65536, size=block.shape[:2], dtype=np.uint16)
+        block[r < half] = 255                           # salt noise
+        block[(r >= half) & (r < 2 * half)] = 0         # pepper noise
+    return img
+
+def gaussian(img, mean=0.0, sigma=10.0, rng=None):
+    """Additive Gaussian noise (like cv2.randn + cv2.add in Worksheet8), saturated to 0..255."""
+    rng = _rng(rng)
+    for y in range(0, img.shape[0], ROW_BLOCK):
+        block = img[y:y + ROW_BLOCK]
+        noise = rng.standard_normal(block.shape, dtype=np.float32)
+        noise *= sigma
+        noise += mean
+        noise += block
+        np.clip(noise, 0, 255, out=noise)
+        np.copyto(block, noise, casting='unsafe')
+    return img
+
+def poisson(img, scale=1.0, rng=None):
+    """Shot noise: each value becomes Poisson(value * scale) / scale. Lower scale = noisier."""
+    rng = _rng(rng)
+    for y in range(0, img.shape[0], ROW_BLOCK):
+        block = img[y:y + ROW_BLOCK]
+        lam = block.astype(np.float32)
+        lam *= scale
+        noisy = rng.poisson(lam).astype(np.float32)
+        noisy /= scale
+        np.clip(noisy, 0, 255, out=noisy)
+        np.copyto(block, noisy, casting='unsafe')
+    return img
+
+def jpeg_artifacts(img, quality=30, rng=None):
+    """Round-trips the image through a low-quality JPEG encode. quality may be an int or (min, max)."""
+    if isinstance(quality, (tuple, list)):
+        quality = int(_rng(rng).integers(quality[0], quality[1] + 1))
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if ok:
+        np.copyto(img, cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED).reshape(img.shape))
+    return img
+
+NOISES = {
+    'salt_pepper': lambda img, rng: salt_pepper(img, snr=rng.uniform(0.9, 0.99), rng=rng),
+    'gaussian': lambda img, rng: gaussian(img, sigma=rng.uniform(3, 20), rng=rng),
+    'poisson': lambda img, rng: poisson(img, scale=rng.uniform(0.2, 1.0), rng=rng),
+    'jpeg': lambda img, rng: jpeg_artifacts(img, quality=(15, 60), rng=rng),
+}
+
+def augment(img, probabilities, rng=None):
+    """
+    Applies each noise in `probabilities` ({name: p}) with its probability, in place.
+    Returns the names that were applied.
+    """
+    rng = _rng(rng)
+    applied = []
+    for name, p in probabilities.items():
+        if p > 0 and rng.random() < p:
+            NOISES[name](img, rng)
+            applied.append(name)
+    return applied
+
+def augment_pil(img, probabilities, rng=None):
+    """augment() for the generators' PIL images. Returns (RGB image, applied names)."""
+    from PIL import Image
+    if not any(probabilities.values()):
+        return img, []
+    arr = np.array(img.convert("RGB"))
+    applied = augment(arr, probabilities, rng)
+    return (Image.fromarray(arr) if applied else img), applied
+
+# The original Worksheet8 version, kept only as the benchmark baseline (expects C x H x W)
+def _addsalt_pepper_worksheet(img, SNR):
+    img_ = img.copy()
+    c, h, w = img_.shape
+    mask = np.random.choice((0, 1, 2), size=(1, h, w), p=[SNR, (1 - SNR) / 2., (1 - SNR) / 2.])
+    mask = np.repeat(mask, c, axis=0)
+    img_[mask == 1] = 255 # salt noise
+    img_[mask == 2] = 0 #
+    return img_
+
+def benchmark(frame_shape=(2160, 3840, 3), repeats=3):
+    """Time and peak extra memory per 4K frame, new in-place noises vs the worksheet function."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, frame_shape, dtype=np.uint8)
+    chw = np.ascontiguousarray(frame.transpose(2, 0, 1))
+    work = frame.copy()
+
+    def measure(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak / 2**20
+
+    cases = [
+        ('worksheet addsalt_pepper', lambda: _addsalt_pepper_worksheet(chw, 0.8)),
+        ('salt_pepper (in place)', lambda: salt_pepper(work, 0.8, rng)),
+        ('gaussian (in place)', lambda: gaussian(work, 20, 50, rng)),
+        ('poisson (in place)', lambda: poisson(work, 0.5, rng)),
+        ('jpeg q=30 (in place)', lambda: jpeg_artifacts(work, 30)),
+    ]
+    print(f"\n--- NOISE BENCHMARK ({frame_shape[1]}x{frame_shape[0]}x{frame_shape[2]}, frame = "
+          f"{frame.nbytes / 2**20:.1f} MB) ---")
+    print(f"  {'':<28}{'ms/frame':>10}{'peak MB':>10}")
+    for name, fn in cases:
+        t, mem = measure(fn)
+        print(f"  {name:<28}{t:>10.1f}{mem:>10.1f}")
+
+if __name__ == "__main__":
+    benchmark()
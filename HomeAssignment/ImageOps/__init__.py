@@ -0,0 +1,8 @@
+from .Filters import emboss, Gausian_blur, addsalt_pepper, BWThreshold, laplacian_edges, sobel_edges, canny_edges
+from .Batch import apply_batch, iter_directory_batches, process_directory
+from .Convolution import convolve, convolve_batch, separable_factors, gaussian_kernel, emboss_kernel
+from . import Noise
+from . import Histograms
+from . import Contours
+from .Morphology import BinaryPipeline
+from .ColorSegmentation import ColorSegmenter
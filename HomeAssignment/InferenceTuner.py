@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import queue
+import random
+import platform
+import multiprocessing as mp
+from datetime import datetime
+import numpy as np
+
+import ModelCache
+from Evaluator import (load_dataset_config, get_split_dirs, get_images, sample_name, load_ground_truth,
+                       build_match_table, compute_metrics, summarize)
+
+# Finds the fastest way to run the detector on THIS machine. Sweeps backend,
+# input size, batch size and torch intra/inter-op threads on frames from the
+# test split and measures latency, throughput and mAP50 against the reference
+# (.pt weights at 640). The winners are stored per machine and per weight file
+# (hash) in PROFILE_PATH; ModelRunner / ModelRunnerLive load the 'latency'
+# profile for their MODEL_PATH at startup, batch consumers can use the
+# 'throughput' one. A profile is only saved if the reference mAP was measured.
+# Tune the weights each runner loads: tune() for ModelRunner's MODEL_PATH,
+# tune(<ModelRunnerLive.MODEL_PATH>) for the live runner if it differs.
+#
+# Inter-op threads can only be set once per process, so every thread setting is
+# measured in a fresh process. Heavy imports stay inside functions - the runners
+# import this module before the model has started loading.
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'HomeAssignment/AI Models/AI Detector/weights/best.pt'   # Same weights as ModelRunner
+DATA_YAML = 'HomeAssignment/finalDataset.yaml'
+SPLIT = 'test'
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cache', 'inference_profile.json')
+
+N_FRAMES = 32                       # Test frames per configuration (also used for mAP)
+WARMUP_RUNS = 2
+BACKENDS = ['pytorch', 'torchscript', 'onnx', 'openvino']   # Unavailable ones are skipped
+IMG_SIZES = [320, 416, 512, 640]
+BATCH_SIZES = [1, 2, 4, 8]
+MAX_MAP_DROP = 0.01                 # A configuration may lose at most this much mAP50 vs the reference
+CONFIDENCE = 0.001                  # Low, so mAP sees the whole precision/recall curve
+REFERENCE = ('pytorch', 640)
+SEED = 0
+PROCESS_TIMEOUT = 3600              # Seconds one thread setting may take before its process is given up on
+# ---------------------
+
+def thread_options(cores=None):
+    """(intra, inter) pairs worth trying: one core, half, all; inter-op 1 or 2."""
+    cores = cores or os.cpu_count() or 1
+    intra = sorted({1, max(1, cores // 2), cores})
+    return [(i, j) for i in intra for j in (1, 2) if i * j <= max(cores, 2)]
+
+def cpu_name():
+    if platform.system() == 'Linux':
+        try:
+            with open('/proc/cpuinfo') as f:
+                for line in f:
+                    if line.startswith('model name'):
+                        return line.split(':', 1)[1].strip()
+        except OSError:
+            pass
+    return platform.processor() or platform.machine()
+
+def machine_key():
+    """Profiles are per CPU model and core count - the fleet has mixed SKUs."""
+    return f"{cpu_name()} | {os.cpu_count()} cores | {platform.system()}"
+
+# --- PROFILE FILE ---
+
+def load_profile(model_path, mode='latency', path=PROFILE_PATH, weights_hash=None):
+    """
+    The tuned settings ({backend, imgsz, batch, intra, inter, ...}) for this machine
+    and these exact weights, or None - a profile tuned on other weights says
+    nothing about this model's accuracy at a smaller imgsz or another backend.
+    Pass weights_hash if the caller has already hashed model_path.
+    """
+    if not os.path.exists(path) or (weights_hash is None and not os.path.exists(model_path)):
+        return None
+    with open(path) as f:
+        machines = json.load(f).get('machines', {})
+    weights_hash = weights_hash or ModelCache.hash_weights(model_path)
+    entry = machines.get(machine_key(), {}).get(weights_hash[:16])
+    return entry.get(mode) if entry else None
+
+def save_profile(entry, path=PROFILE_PATH):
+    data = {'machines': {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data.setdefault('machines', {}).setdefault(machine_key(), {})[entry['weights'][:16]] = entry
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+# --- MEASUREMENT (one process per thread setting) ---
+
+def _load_backend(model_path, backend, imgsz):
+    return ModelCache.load_model(model_path, export_format=backend, imgsz=imgsz, fallback=False)
+
+def _map50(model, frames, gt, names, imgsz, class_ids):
+    preds = {}
+    for name, frame in zip(names, frames):
+        boxes = model(frame, conf=CONFIDENCE, imgsz=imgsz, verbose=False)[0].boxes
+        preds[name] = {'cls': boxes.cls.cpu().numpy().astype(int).tolist(),
+                       'conf': boxes.conf.cpu().numpy().tolist(),
+                       'xyxyn': boxes.xyxyn.cpu().numpy().tolist()}
+    table = build_match_table(preds, gt)
+    return summarize(compute_metrics(table, class_ids))['mAP50']
+
+def measure_threads(model_path, intra, inter, image_paths, labels_dir, class_ids, with_map, out_queue):
+    """Child process: every backend x imgsz x batch at one thread setting. Always puts a (possibly empty) list."""
+    results = []
+    try:
+        _measure(model_path, intra, inter, image_paths, labels_dir, class_ids, with_map, results)
+    except Exception as e:
+        print(f"  [threads {intra}/{inter}] aborted: {e}")
+    finally:
+        out_queue.put(results)
+
+def _measure(model_path, intra, inter, image_paths, labels_dir, class_ids, with_map, results):
+    import cv2
+    import torch
+    torch.set_num_threads(intra)
+    torch.set_num_interop_threads(inter)
+    frames = [cv2.imread(p) for p in image_paths]
+    names = [sample_name(p) for p in image_paths]
+    gt = load_ground_truth(labels_dir, names)
+
+    for backend in BACKENDS:
+        for imgsz in IMG_SIZES:
+            try:
+                model = _load_backend(model_path, backend, imgsz)
+                map50 = _map50(model, frames, gt, names, imgsz, class_ids) if with_map else None
+            except Exception as e:
+                print(f"  [{backend} @ {imgsz}] skipped: {e}")
+                continue
+            for batch in BATCH_SIZES:
+                try:
+                    for _ in range(WARMUP_RUNS):
+                        model(frames[:batch], conf=CONFIDENCE, imgsz=imgsz, verbose=False)
+                    per_frame = []
+                    start = time.perf_counter()
+                    for i in range(0, len(frames) - batch + 1, batch):
+                        t0 = time.perf_counter()
+                        model(frames[i:i + batch], conf=CONFIDENCE, imgsz=imgsz, verbose=False)
+                        per_frame.append((time.perf_counter() - t0) / batch)
+                    elapsed = time.perf_counter() - start
+                except Exception as e:        # Exported static-batch models refuse batch > 1
+                    print(f"  [{backend} @ {imgsz}, batch {batch}] failed: {e}")
+                    break
+                results.append({'backend': backend, 'imgsz': imgsz, 'batch': batch, 'intra': intra, 'inter': inter,
+                                'latency_ms': round(float(np.median(per_frame)) * 1000 * batch, 2),
+                                'fps': round(len(per_frame) * batch / elapsed, 2), 'map50': map50})
+                print(f"  {backend:<12}{imgsz:>5}  batch {batch}  threads {intra}/{inter}: "
+                      f"{results[-1]['latency_ms']:8.1f} ms/call  {results[-1]['fps']:6.1f} fps")
+
+# --- SWEEP ---
+
+def pick(results, reference_map, mode):
+    """
+    Best configuration within MAX_MAP_DROP of the reference: lowest batch-1 latency, or highest fps.
+    Configurations without a measured mAP never qualify, and without a reference nothing does.
+    """
+    if reference_map is None:
+        return None
+    ok = [r for r in results if r['map50'] is not None and reference_map - r['map50'] <= MAX_MAP_DROP]
+    if mode == 'latency':
+        ok = [r for r in ok if r['batch'] == 1]
+        best = min(ok, key=lambda r: r['latency_ms'], default=None)
+    else:
+        best = max(ok, key=lambda r: r['fps'], default=None)
+    if best is not None:
+        best = dict(best, map_drop=round(reference_map - best['map50'], 4))
+    return best
+
+def tune(model_path=MODEL_PATH, n_frames=N_FRAMES, save=True):
+    if not os.path.exists(model_path):
+        print(f"Error: no weights at {model_path}")
+        return None
+    cfg = load_dataset_config(DATA_YAML)
+    images_dir, labels_dir = get_split_dirs(cfg, SPLIT)
+    image_paths = get_images(images_dir)
+    if not image_paths:
+        print(f"Error: no images in {images_dir}")
+        return None
+    random.Random(SEED).shuffle(image_paths)
+    image_paths = image_paths[:n_frames]
+    names = cfg['names']
+    class_ids = list(names) if isinstance(names, dict) else list(range(len(names)))
+
+    print(f"Tuning {model_path} on {len(image_paths)} frames from {images_dir} - {machine_key()}")
+    ctx = mp.get_context('spawn')
+    results = []
+    accuracy = {}
+    for k, (intra, inter) in enumerate(thread_options()):
+        out_queue = ctx.Queue()
+        # Accuracy does not depend on threads: only the first process computes mAP
+        proc = ctx.Process(target=measure_threads,
+                           args=(model_path, intra, inter, image_paths, labels_dir, class_ids, k == 0, out_queue))
+        proc.start()
+        try:
+            part = out_queue.get(timeout=PROCESS_TIMEOUT)
+        except queue.Empty:
+            print(f"  [threads {intra}/{inter}] no result after {PROCESS_TIMEOUT} s (exit code {proc.exitcode}) - skipped")
+            proc.terminate()
+            part = []
+        proc.join()
+        if proc.exitcode:
+            print(f"  [threads {intra}/{inter}] process exited with code {proc.exitcode}")
+        for r in part:
+            if k == 0:
+                accuracy[(r['backend'], r['imgsz'])] = r['map50']
+            r['map50'] = accuracy.get((r['backend'], r['imgsz']))
+        results += part
+
+    reference_map = accuracy.get(REFERENCE)
+    entry = {'weights': ModelCache.hash_weights(model_path), 'model_path': model_path, 'cpu': cpu_name(),
+             'cores': os.cpu_count(), 'created': datetime.now().isoformat(timespec='seconds'),
+             'frames': len(image_paths), 'reference_map50': reference_map,
+             'latency': pick(results, reference_map, 'latency'),
+             'throughput': pick(results, reference_map, 'throughput'), 'all': results}
+
+    print(f"\n--- INFERENCE PROFILE: {machine_key()} ---")
+    print(f"  reference {REFERENCE[0]} @ {REFERENCE[1]}: mAP50 {reference_map}")
+    for mode in ('latency', 'throughput'):
+        best = entry[mode]
+        if best is None:
+            print(f"  {mode}: no configuration met the accuracy limit")
+            continue
+        print(f"  {mode:<10} {best['backend']} @ {best['imgsz']}, batch {best['batch']}, threads "
+              f"{best['intra']}/{best['inter']}: {best['latency_ms']:.1f} ms/call, {best['fps']:.1f} fps, "
+              f"mAP50 drop {best.get('map_drop')}")
+    if save and reference_map is None:
+        print("  Reference mAP could not be measured - profile NOT saved.")
+    elif save:
+        save_profile(entry)
+        print(f"  Saved to {PROFILE_PATH}")
+    return entry
+
+if __name__ == "__main__":
+    tune()
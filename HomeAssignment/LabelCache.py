@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import zipfile
+import multiprocessing as mp
+from collections import Counter
+import numpy as np
+import yaml
+from PIL import Image
+from tqdm import tqdm
+
+from SampleMetadata import get_db_path
+from DatasetGenerator import OUTPUT_BASE
+
+# Validates a YOLO split (images/<split> + labels/<split>) and caches its labels as
+# one compact array file next to the metadata sidecar:
+#   <dataset root>/meta/<split>.labels.npz
+# Image sizes come from header-only reads (PIL opens lazily and never decodes the
+# pixels) and the label files are parsed once, in parallel. Downstream tools then
+# call load_labels() and get every box of the split in milliseconds instead of
+# reopening thousands of one-line .txt files.
+#
+# The cache is invalidated by a fingerprint of the split:
+#   'mtime'   - modification times of the two directories (creating, deleting or
+#               renaming files changes them; editing a file in place does not)
+#   'content' - hash of every label file's bytes and every image's name and size
+# and by the class count the labels were checked against.
+
+# --- CONFIGURATION ---
+DATASET_ROOT = OUTPUT_BASE
+DATA_YAML = 'HomeAssignment/finalDataset.yaml'   # Class count (nc / names) if the root has no data.yaml of its own
+SPLITS = ['train', 'test']
+CHECK = 'mtime'                  # 'mtime' or 'content'
+CHUNK_SIZE = 64                  # Samples per worker task
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MIN_BOX_PIXELS = 4               # Boxes narrower/shorter than this (in pixels) are flagged as degenerate
+META_TOLERANCE = 0.02            # Allowed relative difference between label boxes and the metadata sidecar
+SHOW_ISSUES = 10                 # Example files printed per issue type
+# ---------------------
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+# Issues that drop the affected line (or sample) from the cache
+ERRORS = ['unreadable_image', 'malformed', 'bad_class', 'out_of_range', 'box_outside', 'degenerate', 'orphan_label']
+# Disagreements with the metadata sidecar: counted as errors, but the labels are kept (either side may be wrong)
+META_ERRORS = ['meta_size', 'meta_box', 'meta_negative']
+# Reported only
+WARNINGS = ['no_label', 'duplicate']
+
+def get_cache_path(dataset_root, split):
+    return os.path.join(dataset_root, 'meta', f"{split}.labels.npz")
+
+def _split_dirs(dataset_root, split):
+    return os.path.join(dataset_root, 'images', split), os.path.join(dataset_root, 'labels', split)
+
+def load_nc(dataset_root, data_yaml=DATA_YAML):
+    """Number of classes from <dataset_root>/data.yaml, else from data_yaml; None if neither exists."""
+    for path in (os.path.join(dataset_root, 'data.yaml'), data_yaml):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                cfg = yaml.safe_load(f) or {}
+            if cfg.get('nc') is not None:
+                return int(cfg['nc'])
+            if cfg.get('names'):
+                return len(cfg['names'])
+    return None
+
+def fingerprint(dataset_root, split, check=CHECK, nc=None):
+    img_dir, lbl_dir = _split_dirs(dataset_root, split)
+    suffix = f"|nc={nc}"                 # bad_class depends on it
+    if check == 'mtime':
+        parts = [str(os.stat(d).st_mtime_ns) if os.path.isdir(d) else '-' for d in (img_dir, lbl_dir)]
+        return 'mtime:' + ':'.join(parts) + suffix
+    if check != 'content':
+        raise ValueError(f"Unknown cache check '{check}' (use 'mtime' or 'content').")
+    h = hashlib.sha1()
+    for d, read in ((img_dir, False), (lbl_dir, True)):
+        if not os.path.isdir(d):
+            continue
+        for entry in sorted(os.scandir(d), key=lambda e: e.name):
+            h.update(entry.name.encode())
+            if read:
+                with open(entry.path, 'rb') as f:
+                    h.update(f.read())
+            else:
+                h.update(str(entry.stat().st_size).encode())
+    return 'content:' + h.hexdigest() + suffix
+
+class LabelSet:
+    """
+    All labels of a split. boxes is an (M, 5) float32 array of YOLO rows
+    (class, xc, yc, w, h); the rows of image i are boxes[offsets[i]:offsets[i + 1]].
+    """
+    def __init__(self, names, sizes, offsets, boxes, issues=None):
+        self.names = names              # Image file names, sorted
+        self.sizes = sizes              # (N, 2) int32 width, height
+        self.offsets = offsets
+        self.boxes = boxes
+        self.issues = issues or {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def labels(self, i):
+        return self.boxes[self.offsets[i]:self.offsets[i + 1]]
+
+    def pixel_boxes(self, i):
+        """(K, 5) array of class, x1, y1, x2, y2 in pixels."""
+        rows = self.labels(i)
+        w, h = self.sizes[i]
+        out = np.empty_like(rows)
+        out[:, 0] = rows[:, 0]
+        out[:, 1] = (rows[:, 1] - rows[:, 3] / 2) * w
+        out[:, 2] = (rows[:, 2] - rows[:, 4] / 2) * h
+        out[:, 3] = (rows[:, 1] + rows[:, 3] / 2) * w
+        out[:, 4] = (rows[:, 2] + rows[:, 4] / 2) * h
+        return out
+
+    def class_counts(self):
+        return Counter(self.boxes[:, 0].astype(int).tolist())
+
+    def negatives(self):
+        return int((np.diff(self.offsets) == 0).sum())
+
+    def save(self, path, fp):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, fingerprint=np.array(fp), names=np.array(self.names), sizes=self.sizes,
+                 offsets=self.offsets, boxes=self.boxes, issues=np.array(json.dumps(self.issues)))
+        os.replace(tmp, path)          # Readers never see a half-written cache
+
+    @classmethod
+    def load(cls, path, fp=None):
+        """Returns the cached LabelSet, or None if missing, unreadable or (when fp is given) stale."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if fp is not None and str(data['fingerprint']) != fp:
+                    return None
+                return cls(data['names'].tolist(), data['sizes'], data['offsets'], data['boxes'],
+                           json.loads(str(data['issues'])))
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):   # Truncated or empty file
+            return None
+
+def check_sample(args):
+    """Worker: (image path or None, label path or None, nc) -> (width, height, rows, issues)."""
+    img_path, lbl_path, nc = args
+    issues = []
+    w = h = 0
+    if img_path is not None:
+        try:
+            with Image.open(img_path) as im:       # Header only - pixels are never decoded
+                w, h = im.size
+        except Exception as e:
+            issues.append(('unreadable_image', str(e)))
+    if lbl_path is None:
+        if img_path is not None:
+            issues.append(('no_label', 'treated as a negative'))
+        return w, h, np.zeros((0, 5), np.float32), issues
+    if img_path is None:
+        return w, h, np.zeros((0, 5), np.float32), [('orphan_label', 'no image with this name')]
+
+    rows, seen = [], set()
+    with open(lbl_path) as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    for n, line in enumerate(lines, 1):
+        parts = line.split()
+        try:
+            if len(parts) != 5:
+                raise ValueError
+            cls, xc, yc, bw, bh = int(parts[0]), *map(float, parts[1:])
+        except ValueError:
+            issues.append(('malformed', f"line {n}: {line.strip()[:60]}"))
+            continue
+        if cls < 0 or (nc and cls >= nc):
+            issues.append(('bad_class', f"line {n}: class {cls} (nc={nc})"))
+            continue
+        if not all(0.0 <= v <= 1.0 for v in (xc, yc, bw, bh)):
+            # Pixel coordinates or a wrong bg_w/bg_h in convert_to_yolo usually show up here
+            issues.append(('out_of_range', f"line {n}: {xc:g} {yc:g} {bw:g} {bh:g}"))
+            continue
+        if xc - bw / 2 < -1e-4 or yc - bh / 2 < -1e-4 or xc + bw / 2 > 1 + 1e-4 or yc + bh / 2 > 1 + 1e-4:
+            issues.append(('box_outside', f"line {n}: extends past the image edge"))
+            continue
+        if w and (bw * w < MIN_BOX_PIXELS or bh * h < MIN_BOX_PIXELS):
+            issues.append(('degenerate', f"line {n}: {bw * w:.1f} x {bh * h:.1f} px"))
+            continue
+        key = (cls, round(xc, 4), round(yc, 4), round(bw, 4), round(bh, 4))
+        if key in seen:
+            issues.append(('duplicate', f"line {n}"))
+            continue
+        seen.add(key)
+        rows.append((cls, xc, yc, bw, bh))
+    return w, h, np.array(rows, np.float32).reshape(-1, 5), issues
+
+def _check_metadata(dataset_root, split, labels, issues):
+    """Cross-checks image sizes and boxes against the generator's metadata sidecar, if there is one."""
+    db_path = get_db_path(dataset_root, split)
+    if not os.path.exists(db_path):
+        return
+    index = {os.path.splitext(n)[0]: i for i, n in enumerate(labels.names)}
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT name, bg_w, bg_h, box_w, box_h, negative FROM samples").fetchall()
+    finally:
+        conn.close()
+    for name, bg_w, bg_h, box_w, box_h, negative in rows:
+        i = index.get(name)
+        if i is None:
+            continue
+        w, h = labels.sizes[i]
+        rows_i = labels.labels(i)
+        if bg_w and bg_h and (bg_w, bg_h) != (w, h):
+            issues['meta_size'].append((labels.names[i], f"image {w}x{h}, metadata {bg_w}x{bg_h}"))
+        if negative and len(rows_i):
+            issues['meta_negative'].append((labels.names[i], f"{len(rows_i)} boxes on a negative"))
+        if box_w and box_h and len(rows_i):
+            # The metadata box is in pixels; one of the label rows has to match it
+            err = np.minimum(np.abs(rows_i[:, 3] * w - box_w) / box_w, 1) + np.minimum(np.abs(rows_i[:, 4] * h - box_h) / box_h, 1)
+            if err.min() > 2 * META_TOLERANCE:
+                issues['meta_box'].append((labels.names[i], f"label {rows_i[err.argmin(), 3] * w:.0f}x"
+                                                            f"{rows_i[err.argmin(), 4] * h:.0f} px, metadata {box_w}x{box_h}"))
+
+def validate_split(dataset_root, split, nc=None, check=CHECK, num_workers=NUM_WORKERS):
+    """Scans and checks the split, writes the label cache and returns the LabelSet."""
+    img_dir, lbl_dir = _split_dirs(dataset_root, split)
+    fp = fingerprint(dataset_root, split, check, nc)   # Taken before scanning: a change during the scan makes it stale
+    images = {os.path.splitext(f)[0]: f for f in os.listdir(img_dir) if f.lower().endswith(IMAGE_EXTS)} \
+        if os.path.isdir(img_dir) else {}
+    label_stems = {os.path.splitext(f)[0] for f in os.listdir(lbl_dir) if f.endswith('.txt')} \
+        if os.path.isdir(lbl_dir) else set()
+
+    names = sorted(images.values())
+    jobs = [(os.path.join(img_dir, n), os.path.join(lbl_dir, os.path.splitext(n)[0] + '.txt')
+             if os.path.splitext(n)[0] in label_stems else None, nc) for n in names]
+    orphans = sorted(label_stems - images.keys())
+    jobs += [(None, os.path.join(lbl_dir, s + '.txt'), nc) for s in orphans]
+
+    if num_workers > 1 and len(jobs) > CHUNK_SIZE:
+        with mp.Pool(num_workers) as pool:
+            results = list(tqdm(pool.imap(check_sample, jobs, chunksize=CHUNK_SIZE), total=len(jobs),
+                                desc=f"Checking {split}"))
+    else:
+        results = [check_sample(job) for job in jobs]
+
+    issues = {code: [] for code in ERRORS + META_ERRORS + WARNINGS}
+    sizes = np.zeros((len(names), 2), np.int32)
+    counts = np.zeros(len(names), np.int64)
+    kept = []
+    for i, (w, h, rows, sample_issues) in enumerate(results):
+        shown = names[i] if i < len(names) else orphans[i - len(names)] + '.txt'
+        for code, detail in sample_issues:
+            issues[code].append((shown, detail))
+        if i >= len(names):
+            continue
+        sizes[i] = (w, h)
+        if any(code == 'unreadable_image' for code, _ in sample_issues):
+            rows = rows[:0]
+        counts[i] = len(rows)
+        kept.append(rows)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    boxes = np.concatenate(kept) if kept else np.zeros((0, 5), np.float32)
+    labels = LabelSet(names, sizes, offsets, boxes)
+    _check_metadata(dataset_root, split, labels, issues)
+    labels.issues = {code: found for code, found in issues.items() if found}
+    labels.save(get_cache_path(dataset_root, split), fp)
+    return labels
+
+def load_labels(dataset_root, split, nc=None, check=CHECK):
+    """
+    The split's LabelSet - from the cache if it is still valid, otherwise validated and cached again.
+    nc defaults to load_nc(dataset_root).
+    """
+    nc = load_nc(dataset_root) if nc is None else nc
+    labels = LabelSet.load(get_cache_path(dataset_root, split), fingerprint(dataset_root, split, check, nc))
+    if labels is None:
+        labels = validate_split(dataset_root, split, nc, check)
+    return labels
+
+def report(split, labels):
+    print(f"\n--- {split.upper()}: {len(labels)} images, {len(labels.boxes)} boxes, {labels.negatives()} negatives ---")
+    for cls, n in sorted(labels.class_counts().items()):
+        print(f"  class {cls}: {n} boxes")
+    if not labels.issues:
+        print("  No issues found.")
+    for code, found in labels.issues.items():
+        kind = 'ERROR' if code in ERRORS + META_ERRORS else 'warning'
+        print(f"  [{kind}] {code}: {len(found)}")
+        for name, detail in found[:SHOW_ISSUES]:
+            print(f"      {name}: {detail}")
+    return sum(len(found) for code, found in labels.issues.items() if code in ERRORS + META_ERRORS)
+
+def main(dataset_root=DATASET_ROOT, splits=SPLITS, nc=None):
+    nc = load_nc(dataset_root) if nc is None else nc
+    if nc is None:
+        print("No nc/names in data.yaml - class ids are only checked for being negative.")
+    errors = 0
+    for split in splits:
+        start = time.perf_counter()
+        labels = validate_split(dataset_root, split, nc)
+        elapsed = time.perf_counter() - start
+        errors += report(split, labels)
+        start = time.perf_counter()
+        load_labels(dataset_root, split, nc)
+        print(f"  validated in {elapsed:.2f} s; cached labels load in {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({get_cache_path(dataset_root, split)})")
+    print(f"\n{errors} label errors in total." if errors else "\nAll labels valid.")
+    return errors
+
+if __name__ == "__main__":
+    main()
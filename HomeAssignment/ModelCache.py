@@ -0,0 +1,110 @@
+import os
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Heavy imports (torch/ultralytics) are deliberately NOT at module level.
+# They happen inside load_model(), which the runners start on a background
+# thread while they open the video/screen capture.
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cache', 'models')
+EXPORT_FORMAT = 'torchscript'   # 'torchscript' needs only torch; 'onnx'/'openvino' need their runtimes
+IMG_SIZE = 640
+WARMUP_RUNS = 2
+# ---------------------
+
+class StartupTimer:
+    """Collects named timestamps from when it was created, so cold-start cost can be reported."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        print("\n--- STARTUP TIMINGS ---")
+        prev = self.start
+        for name, t in sorted(self.marks, key=lambda m: m[1]):
+            print(f"  {name:<24} +{(t - prev) * 1000:8.1f} ms   (at {(t - self.start) * 1000:8.1f} ms)")
+            prev = t
+
+def hash_weights(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def get_cached_path(weights_path, export_format=EXPORT_FORMAT, imgsz=IMG_SIZE, weights_hash=None):
+    ext = {'torchscript': '.torchscript', 'onnx': '.onnx', 'openvino': '_openvino_model'}[export_format]
+    return os.path.join(CACHE_DIR, f"{(weights_hash or hash_weights(weights_path))[:16]}_{imgsz}{ext}")
+
+def set_threads(threads):
+    """(intra, inter) torch thread counts, e.g. from an InferenceTuner profile. Inter-op is fixed once torch has run."""
+    import torch
+    torch.set_num_threads(threads[0])
+    try:
+        torch.set_num_interop_threads(threads[1])
+    except RuntimeError:
+        print(f"Inter-op threads are already fixed at {torch.get_num_interop_threads()}; keeping them.")
+
+def load_model(weights_path, export_format=EXPORT_FORMAT, imgsz=IMG_SIZE, timer=None, threads=None, fallback=True,
+               weights_hash=None):
+    """
+    Returns a ready YOLO model. The first call for a given weight file exports a
+    fused model into CACHE_DIR; every later call loads that artifact directly,
+    skipping the .pt unpickle + fuse. Falls back to the plain .pt if export fails
+    (unless fallback=False, then the export error is raised).
+    export_format='pytorch' skips the export and uses the fused .pt weights.
+    weights_hash (hash_weights of weights_path) saves re-hashing if the caller already has it.
+    """
+    from ultralytics import YOLO
+    if threads: set_threads(threads)
+    if timer: timer.mark('import ultralytics')
+
+    if export_format == 'pytorch':
+        model = YOLO(weights_path)
+        model.fuse()
+        if timer: timer.mark('load + fuse .pt')
+        return model
+
+    cached_path = get_cached_path(weights_path, export_format, imgsz, weights_hash)
+    if os.path.exists(cached_path):
+        model = YOLO(cached_path, task='detect')
+        if timer: timer.mark('load cached model')
+        return model
+
+    print(f"No cached {export_format} model for {weights_path} yet - exporting once...")
+    model = YOLO(weights_path)
+    try:
+        exported = model.export(format=export_format, imgsz=imgsz, verbose=False)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        shutil.move(exported, cached_path)
+        model = YOLO(cached_path, task='detect')
+        if timer: timer.mark('export + load model')
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"Export failed ({e}); using the .pt weights directly.")
+        model.fuse()
+        if timer: timer.mark('load + fuse .pt')
+    return model
+
+def load_model_async(weights_path, export_format=EXPORT_FORMAT, imgsz=IMG_SIZE, timer=None, threads=None,
+                     weights_hash=None):
+    """Starts load_model() on a background thread and returns a Future."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+    future = executor.submit(load_model, weights_path, export_format, imgsz, timer, threads, weights_hash=weights_hash)
+    executor.shutdown(wait=False)
+    return future
+
+def warm_up(model, frame_shape, conf=0.5, imgsz=IMG_SIZE, runs=WARMUP_RUNS, timer=None):
+    """Runs the model on blank frames of the real capture size so the first real frame isn't a cold call."""
+    import numpy as np
+    dummy = np.zeros(frame_shape, dtype=np.uint8)
+    for _ in range(runs):
+        model(dummy, conf=conf, imgsz=imgsz, verbose=False)
+    if timer: timer.mark('warm-up')
@@ -1,22 +1,45 @@
+import time
+import ModelCache
+
+# The timer starts before cv2/ultralytics are touched so the report covers the whole cold start
+STARTUP = ModelCache.StartupTimer()
+
 import cv2
-from ultralytics import YOLO
+from RegionPrefilter import RegionPrefilter
+from EventDispatcher import EventDispatcher, DetectionTracker, detected_classes
+import InferenceTuner
+
+STARTUP.mark('imports')
 
 # --- CONFIGURATION ---
 MODEL_PATH = 'HomeAssignment/AI Models/AI Detector/weights/best.pt'
 INPUT_VIDEO = 'HomeAssignment/test.mkv'
 OUTPUT_VIDEO = 'output_result.mp4'
 CONFIDENCE_THRESHOLD = 0.5  # Only show detections with >50% confidence
+IMG_SIZE = 640
+USE_TUNED_PROFILE = True   # InferenceTuner profile (imgsz / backend / threads) for this machine + MODEL_PATH, if any
+USE_PREFILTER = False      # Canny/contour window proposals gate the model - off until its recall is measured with the real weights
+SEND_EVENTS = False        # Publish appeared/disappeared/dwell events (HA_URL + HA_TOKEN or DETECTION_WEBHOOK_URL env vars)
 # ---------------------
 
 def process_video_custom():
-    # 1. Load Model
-    model = YOLO(MODEL_PATH)
+    # 1. Start loading the model in the background (torch import + cached model)
+    imgsz, export_format, threads = IMG_SIZE, ModelCache.EXPORT_FORMAT, None
+    # Hashed once here: it keys both the tuned profile and ModelCache's exported model
+    weights_hash = ModelCache.hash_weights(MODEL_PATH) if USE_TUNED_PROFILE else None
+    profile = InferenceTuner.load_profile(MODEL_PATH, weights_hash=weights_hash) if USE_TUNED_PROFILE else None
+    if profile:
+        imgsz, export_format, threads = profile['imgsz'], profile['backend'], (profile['intra'], profile['inter'])
+        print(f"Tuned profile: {export_format} @ {imgsz}, threads {threads[0]}/{threads[1]}")
+    model_future = ModelCache.load_model_async(MODEL_PATH, export_format, imgsz, timer=STARTUP, threads=threads,
+                                               weights_hash=weights_hash)
 
     # 2. Open Input Video
     cap = cv2.VideoCapture(INPUT_VIDEO)
     if not cap.isOpened():
         print(f"Error: Could not open video {INPUT_VIDEO}")
         return
+    STARTUP.mark('open video')
 
     # 3. Get Video Properties (for saving)
     w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -27,6 +50,14 @@ def process_video_custom():
     # 'mp4v' is a standard codec for MP4
     out = cv2.VideoWriter(OUTPUT_VIDEO, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
 
+    # Wait for the model, then warm it up on a frame of the real size
+    model = model_future.result()
+    ModelCache.warm_up(model, (h, w, 3), CONFIDENCE_THRESHOLD, imgsz, timer=STARTUP)
+    detector = RegionPrefilter(model) if USE_PREFILTER else model
+    first_frame = True
+    events = EventDispatcher.from_env() if SEND_EVENTS else None
+    tracker = DetectionTracker(source='video')
+
     print(f"Processing {INPUT_VIDEO} (Press 'q' to exit early)...")
 
     while cap.isOpened():
@@ -36,11 +67,20 @@ def process_video_custom():
 
         # 5. Run Prediction on the current frame
         # stream=True is efficient for videos as it uses a generator
-        results = model(frame, conf=CONFIDENCE_THRESHOLD, verbose=False)
+        t0 = time.perf_counter()
+        results = detector(frame, conf=CONFIDENCE_THRESHOLD, imgsz=imgsz, verbose=False)
+        if first_frame:
+            STARTUP.mark('first frame')
+            STARTUP.report()
+            print(f"First-frame inference latency: {(time.perf_counter() - t0) * 1000:.1f} ms")
+            first_frame = False
 
         # 6. Plot results
         # results[0].plot() returns the frame with boxes drawn on it
         annotated_frame = results[0].plot()
+        if events is not None:
+            for event in tracker.update(detected_classes(results[0]), cap.get(cv2.CAP_PROP_POS_MSEC) / 1000):
+                events.publish(event)   # Only queues it - sending happens on the dispatcher thread
 
         # 7. Write to output file
         out.write(annotated_frame)
@@ -53,6 +93,10 @@ def process_video_custom():
             break
 
     # 9. Cleanup
+    if USE_PREFILTER: detector.report()
+    if events is not None:
+        events.close()
+        events.report()
     cap.release()
     out.release()
     cv2.destroyAllWindows()
@@ -1,8 +1,19 @@
+import time
+import ModelCache
+
+# The timer starts before cv2/mss/ultralytics are touched so the report covers the whole cold start
+STARTUP = ModelCache.StartupTimer()
+
 import cv2
 import numpy as np
 import mss
-from ultralytics import YOLO
-import time
+import multiprocessing as mp
+from RegionPrefilter import RegionPrefilter
+from EventDispatcher import EventDispatcher, DetectionTracker, detected_classes
+from FrameRing import FrameRing, capture_process
+import InferenceTuner
+
+STARTUP.mark('imports')
 
 # --- CONFIGURATION ---
 MODEL_PATH = 'AI Models/FinalAIModel/weights/best.pt'
@@ -12,11 +23,25 @@ OUTPUT_FILENAME = 'output_1fps.mp4'  # Name of the saved file
 # Display Settings
 PREVIEW_SCALE = 0.5  # 0.5 = 50% size. Adjust this to make the window smaller/larger
 MONITOR_INDEX = 3    # 1 is usually the primary monitor. Use 2 for secondary.
+IMG_SIZE = 640
+USE_TUNED_PROFILE = True   # InferenceTuner profile (imgsz / backend / threads) for this machine + MODEL_PATH, if any
+USE_PREFILTER = False      # Canny/contour window proposals gate the model - off until its recall is measured with the real weights
+SEND_EVENTS = False        # Publish appeared/disappeared/dwell events (HA_URL + HA_TOKEN or DETECTION_WEBHOOK_URL env vars)
+USE_CAPTURE_PROCESS = False  # Grab frames in a separate process (FrameRing), so capture overlaps inference
+CAPTURE_FPS = 5             # Capture process rate; the loop below always takes the newest frame
 # ---------------------
 
 def process_screen_capture():
-    # 1. Load Model
-    model = YOLO(MODEL_PATH)
+    # 1. Start loading the model in the background (torch import + cached model)
+    imgsz, export_format, threads = IMG_SIZE, ModelCache.EXPORT_FORMAT, None
+    # Hashed once here: it keys both the tuned profile and ModelCache's exported model
+    weights_hash = ModelCache.hash_weights(MODEL_PATH) if USE_TUNED_PROFILE else None
+    profile = InferenceTuner.load_profile(MODEL_PATH, weights_hash=weights_hash) if USE_TUNED_PROFILE else None
+    if profile:
+        imgsz, export_format, threads = profile['imgsz'], profile['backend'], (profile['intra'], profile['inter'])
+        print(f"Tuned profile: {export_format} @ {imgsz}, threads {threads[0]}/{threads[1]}")
+    model_future = ModelCache.load_model_async(MODEL_PATH, export_format, imgsz, timer=STARTUP, threads=threads,
+                                               weights_hash=weights_hash)
 
     # 2. Initialize Screen Capture
     sct = mss.mss()
@@ -44,6 +69,23 @@ def process_screen_capture():
     # The '1' below is the playback FPS. Since we record at 1 FPS, this makes the video play at real-time speed.
     out = cv2.VideoWriter(OUTPUT_FILENAME, fourcc, 1.0, (monitor["width"], monitor["height"]))
     # ------------------------------------
+    STARTUP.mark('open capture + writer')
+
+    # Wait for the model, then warm it up on a frame of the monitor size before capture begins
+    model = model_future.result()
+    ModelCache.warm_up(model, (monitor["height"], monitor["width"], 3), CONFIDENCE_THRESHOLD, imgsz, timer=STARTUP)
+    detector = RegionPrefilter(model) if USE_PREFILTER else model
+    first_frame = True
+    events = EventDispatcher.from_env() if SEND_EVENTS else None
+    tracker = DetectionTracker(source='live')
+
+    ring = capture = None
+    if USE_CAPTURE_PROCESS:
+        ring = FrameRing.create((monitor["height"], monitor["width"], 3))
+        stop_capture = mp.Event()
+        capture = mp.Process(target=capture_process, args=(ring.name, capture_area, CAPTURE_FPS, stop_capture), daemon=True)
+        capture.start()
+        last_seq = -1
 
     print(f"Capturing Monitor {MONITOR_INDEX} ({monitor['width']}x{monitor['height']})")
     print(f"Saving to {OUTPUT_FILENAME} at 1 FPS.")
@@ -54,17 +96,36 @@ def process_screen_capture():
             # Start timer for FPS control
             start_time = time.time()
 
-            sct_img = sct.grab(capture_area)
-            
-            # Convert to numpy array and drop Alpha channel (BGRA -> BGR)
-            frame = np.array(sct_img)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            if ring is not None:
+                # Newest frame from the capture process, read in place from shared memory
+                item = ring.wait_latest(last_seq, timeout=5.0)
+                if item is None:
+                    print("Capture process stopped delivering frames.")
+                    break
+                last_seq, _, frame = item
+            else:
+                sct_img = sct.grab(capture_area)
+
+                # Convert to numpy array and drop Alpha channel (BGRA -> BGR)
+                frame = np.array(sct_img)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
 
             # 4. Run Prediction
-            results = model(frame, conf=CONFIDENCE_THRESHOLD, verbose=False)
+            t0 = time.perf_counter()
+            results = detector(frame, conf=CONFIDENCE_THRESHOLD, imgsz=imgsz, verbose=False)
+            if first_frame:
+                STARTUP.mark('first frame')
+                STARTUP.report()
+                print(f"First-frame inference latency: {(time.perf_counter() - t0) * 1000:.1f} ms")
+                first_frame = False
 
             # 5. Annotate Frame
             annotated_frame = results[0].plot()
+            if events is not None:
+                for event in tracker.update(detected_classes(results[0]), None):
+                    events.publish(event)   # Only queues it - sending happens on the dispatcher thread
+            if ring is not None:
+                ring.still_valid(last_seq)      # Counts frames the capture process overwrote mid-inference
 
             # --- NEW: SAVE FRAME ---
             # Write the full-resolution frame to the video file
@@ -96,6 +157,15 @@ def process_screen_capture():
 
     finally:
         # 7. Cleanup
+        if USE_PREFILTER: detector.report()
+        if events is not None:
+            events.close()
+            events.report()
+        if ring is not None:
+            stop_capture.set()
+            capture.join(timeout=5)
+            print(f"Capture process: {ring.torn} frames overwritten during inference")
+            ring.close()
         out.release() # Save the video file properly
         cv2.destroyAllWindows()
         print(f"Finished. Video saved to {OUTPUT_FILENAME}")
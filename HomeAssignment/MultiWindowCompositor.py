@@ -0,0 +1,274 @@
+import os
+import time
+import random
+import multiprocessing as mp
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+import DatasetGenerator
+from DatasetGenerator import get_images, get_RGBA_image, convert_to_yolo, save_image, DISTRACTOR_NAME
+from SampleMetadata import MetadataWriter
+
+# Desktop-like composites with several windows each: K targets and distractors
+# stacked in a random z-order, so one wallpaper decode + one JPEG encode yields K
+# labels instead of one (paste_window_safe).
+#
+# Placement uses an occupancy grid over the wallpaper. Every cell stores which
+# window is on top there. For a new window, the number of cells it would take
+# from each earlier target is a summed-area-table lookup, evaluated for every grid
+# position at once, so the set of positions that keep every target at least
+# MIN_VISIBLE visible is computed directly. The grid is coarse, so the position
+# drawn from that set is confirmed on a full-resolution z-buffer; only then is the
+# window pasted. Every labelled target is therefore at least MIN_VISIBLE visible.
+#
+# Labels are the bounding box of what is still visible of each target, read from
+# that z-buffer after all windows are placed.
+
+# --- CONFIGURATION ---
+OUTPUT_BASE = 'HomeAssignment/Dataset/MultiWindowDataset'
+IMAGES_PER_SPLIT = {'train': 5000, 'test': 500}
+TARGETS_PER_IMAGE = (1, 4)           # Inclusive range
+DISTRACTORS_PER_IMAGE = (0, 3)
+SCALE_RANGE = (0.25, 0.6)            # Window width / wallpaper width
+MIN_VISIBLE = 0.6                    # Share of every target that must stay uncovered
+GRID_CELLS = 64                      # Occupancy grid columns (rows follow the aspect ratio)
+SHRINK_TRIES = 3                     # Times a window that fits nowhere is shrunk by 20% before it is dropped
+POSITION_TRIES = 8                   # Grid positions checked exactly at full resolution per window size
+RESAMPLE = Image.Resampling.BILINEAR # Window scaling; LANCZOS made the resizes most of the CPU time
+WINDOW_CACHE_MB = 512                # Decoded windows kept per worker (a 1080p RGBA screenshot is ~8 MB)
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# ---------------------
+
+_WINDOWS = OrderedDict()                 # path -> decoded RGBA image, least recently used first
+
+def load_window(path, max_bytes=WINDOW_CACHE_MB * 2**20):
+    """Foregrounds are pasted many times per worker, so each is decoded once - within a byte budget."""
+    if path in _WINDOWS:
+        _WINDOWS.move_to_end(path)
+        return _WINDOWS[path]
+    img = get_RGBA_image(path)
+    _WINDOWS[path] = img
+    used = sum(4 * im.width * im.height for im in _WINDOWS.values() if im is not None)
+    while used > max_bytes and len(_WINDOWS) > 1:
+        _, old = _WINDOWS.popitem(last=False)
+        used -= 4 * old.width * old.height if old is not None else 0
+    return img
+
+class OccupancyGrid:
+    """Coarse z-buffer of window indices (-1 = wallpaper) with per-target visible cell counts."""
+    def __init__(self, width, height, cells=GRID_CELLS):
+        self.cell = width / cells
+        self.shape = (max(1, int(round(height / self.cell))), cells)
+        self.top = np.full(self.shape, -1, dtype=np.int16)
+        self.targets = {}                                  # window index -> required visible cells
+
+    def to_cells(self, w, h):
+        return max(1, int(np.ceil(h / self.cell))), max(1, int(np.ceil(w / self.cell)))
+
+    def valid_positions(self, ch, cw):
+        """Bool map over top-left cells: True where a ch x cw window keeps every target visible enough."""
+        gh, gw = self.shape
+        if ch > gh or cw > gw:
+            return np.zeros((0, 0), dtype=bool)
+        valid = np.ones((gh - ch + 1, gw - cw + 1), dtype=bool)
+        for idx, required in self.targets.items():
+            mine = self.top == idx
+            visible = int(mine.sum())
+            sat = np.zeros((gh + 1, gw + 1), dtype=np.int32)
+            sat[1:, 1:] = mine.cumsum(0).cumsum(1)
+            taken = sat[ch:, cw:] - sat[:-ch, cw:] - sat[ch:, :-cw] + sat[:-ch, :-cw]
+            valid &= visible - taken >= required
+        return valid
+
+    def place(self, idx, gy, gx, ch, cw, is_target):
+        self.top[gy:gy + ch, gx:gx + cw] = idx
+        if is_target:
+            self.targets[idx] = int(np.ceil(MIN_VISIBLE * ch * cw))
+
+def compose(bg, windows, rng, min_visible=MIN_VISIBLE):
+    """
+    bg: RGBA wallpaper. windows: [(RGBA image, class id or None for a distractor)] in z-order, back to front.
+    Returns (composite, labels) with labels as [(class id, x1, y1, x2, y2, visible share)].
+    """
+    W, H = bg.size
+    grid = OccupancyGrid(W, H)
+    zbuf = np.full((H, W), -1, dtype=np.int16)            # Exact top window per pixel
+    visible = {}                                           # target index -> [visible pixels, required pixels]
+    placed = []                                            # (index, class id, x1, y1, x2, y2)
+
+    def keeps_targets(x1, y1, x2, y2):
+        for t, (seen, required) in visible.items():
+            taken = int((zbuf[y1:y2, x1:x2] == t).sum())
+            if seen - taken < required:
+                return False
+        return True
+    for idx, (img, class_id) in enumerate(windows):
+        scale = rng.uniform(*SCALE_RANGE)
+        for _ in range(SHRINK_TRIES + 1):
+            w = int(W * scale)
+            h = int(w * img.height / img.width)
+            if h > H * 0.95:
+                h = int(H * 0.95)
+                w = int(h * img.width / img.height)
+            ch, cw = grid.to_cells(w, h)
+            valid = grid.valid_positions(ch, cw)
+            options = list(np.flatnonzero(valid))
+            rng.shuffle(options)
+            for option in options[:POSITION_TRIES]:
+                gy, gx = divmod(int(option), valid.shape[1])
+                x1, y1 = min(int(gx * grid.cell), W - w), min(int(gy * grid.cell), H - h)
+                if keeps_targets(x1, y1, x1 + w, y1 + h):
+                    break
+            else:
+                scale *= 0.8
+                continue
+            break
+        else:
+            continue                                       # No room left for this window
+        for t in visible:
+            visible[t][0] -= int((zbuf[y1:y1 + h, x1:x1 + w] == t).sum())
+        zbuf[y1:y1 + h, x1:x1 + w] = idx
+        if class_id is not None:
+            visible[idx] = [w * h, int(np.ceil(min_visible * w * h))]
+        grid.place(idx, gy, gx, ch, cw, class_id is not None)
+        resized = img.resize((w, h), RESAMPLE)
+        bg.paste(resized, (x1, y1), resized)
+        placed.append((idx, class_id, x1, y1, x1 + w, y1 + h))
+
+    labels = []
+    for idx, class_id, x1, y1, x2, y2 in placed:
+        if class_id is None:
+            continue
+        mine = zbuf[y1:y2, x1:x2] == idx
+        share = mine.mean()
+        rows, cols = np.flatnonzero(mine.any(axis=1)), np.flatnonzero(mine.any(axis=0))
+        labels.append((class_id, x1 + cols[0], y1 + rows[0], x1 + cols[-1] + 1, y1 + rows[-1] + 1, float(share)))
+    return bg, labels
+
+# --- GENERATION ---
+
+_WORKER = {}
+
+def _init_worker(bg_images, classes, distractors, output_base, encoding=None):
+    _WORKER.update(bg_images=bg_images, classes=classes, distractors=distractors, output_base=output_base,
+                   encoding=encoding)
+
+def render_sample(job):
+    """Worker: one composite from (split, name, seed) -> (name, split, metadata row or None)."""
+    split, name, seed = job
+    rng = random.Random(seed)
+    w = _WORKER
+    try:
+        bg_path = rng.choice(w['bg_images'])
+        bg = get_RGBA_image(bg_path)
+        windows = []
+        for _ in range(rng.randint(*TARGETS_PER_IMAGE)):
+            class_id = rng.choice(list(w['classes']))
+            windows.append((load_window(rng.choice(w['classes'][class_id])), class_id))
+        if w['distractors']:
+            windows += [(load_window(rng.choice(w['distractors'])), None)
+                        for _ in range(rng.randint(*DISTRACTORS_PER_IMAGE))]
+        rng.shuffle(windows)
+
+        img, labels = compose(bg, windows, rng)
+        W, H = img.size
+        ext = save_image(img, f"{w['output_base']}/images/{split}/{name}", w['encoding'])
+        with open(f"{w['output_base']}/labels/{split}/{name}.txt", 'w') as f:
+            for class_id, x1, y1, x2, y2, _ in labels:
+                xc, yc, bw, bh = convert_to_yolo(W, H, x1, y1, x2, y2)
+                f.write(f"{class_id} {xc:.6f} {yc:.6f} {bw:.6f} {bh:.6f}\n")
+        # The sidecar has one class per sample: record the largest visible target
+        main = max(labels, key=lambda l: (l[3] - l[1]) * (l[4] - l[2])) if labels else None
+        row = dict(ext=ext, bg_path=bg_path, bg_w=W, bg_h=H, negative=not labels,
+                   occluded=any(l[5] < 1 for l in labels))
+        if main:
+            row.update(class_id=main[0], scale=(main[3] - main[1]) / W, paste_x=main[1], paste_y=main[2],
+                       box_w=main[3] - main[1], box_h=main[4] - main[2])
+        return name, split, row, len(labels)
+    except Exception:
+        return name, split, None, 0
+
+def generate_split(split, fg_root, bg_images, class_map, n_images, output_base=OUTPUT_BASE,
+                   num_workers=NUM_WORKERS, seed=0, encoding=None):
+    classes = {class_id: get_images(os.path.join(fg_root, name)) for name, class_id in class_map.items()}
+    classes = {class_id: fgs for class_id, fgs in classes.items() if fgs}
+    distractors = get_images(os.path.join(fg_root, DISTRACTOR_NAME))
+    os.makedirs(f'{output_base}/images/{split}', exist_ok=True)
+    os.makedirs(f'{output_base}/labels/{split}', exist_ok=True)
+    id_to_name = {i: n for n, i in class_map.items()}
+
+    rng = random.Random(f"{seed}:{split}")
+    jobs = [(split, f"{split}_multi_{i:06d}", rng.getrandbits(32)) for i in range(n_images)]
+    n_labels = 0
+    start = time.perf_counter()
+    with MetadataWriter(output_base, split) as meta, \
+            mp.Pool(num_workers, initializer=_init_worker, initargs=(bg_images, classes, distractors, output_base, encoding)) as pool:
+        for name, split_name, row, k in tqdm(pool.imap_unordered(render_sample, jobs, chunksize=8), total=len(jobs)):
+            if row is None:
+                continue
+            if row.get('class_id') is not None:
+                row['class_name'] = id_to_name[row['class_id']]
+            meta.add(name, **row)
+            n_labels += k
+    elapsed = time.perf_counter() - start
+    print(f"  {split}: {n_images} images, {n_labels} labels ({n_labels / max(n_images, 1):.2f} per image, "
+          f"{n_labels / elapsed:.1f} labels/s)")
+
+def benchmark(n_images=40, size=(1920, 1080), seed=0):
+    """Labels per CPU-second: one window per image (paste_window_safe) vs compose() with several."""
+    import tempfile
+    tmp = tempfile.mkdtemp()
+    rng = np.random.default_rng(seed)
+    bg_path, fg_paths = os.path.join(tmp, 'bg.jpg'), []
+    Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(bg_path)
+    for i in range(4):
+        fg_paths.append(os.path.join(tmp, f'fg{i}.png'))
+        Image.fromarray(rng.integers(0, 255, (800, 1200, 4), dtype=np.uint8)).save(fg_paths[-1])
+    out = os.path.join(tmp, 'out.jpg')
+
+    py_rng = random.Random(seed)
+    start, labels_single = time.process_time(), 0
+    for _ in range(n_images):
+        bg = get_RGBA_image(bg_path)
+        img, bbox, _ = DatasetGenerator.paste_window_safe(bg, load_window(py_rng.choice(fg_paths)),
+                                                          DatasetGenerator.SCALE_MIN, DatasetGenerator.SCALE_MAX)
+        img.convert("RGB").save(out)
+        labels_single += 1
+    t_single = time.process_time() - start
+
+    start, labels_multi, shares = time.process_time(), 0, []
+    for _ in range(n_images):
+        bg = get_RGBA_image(bg_path)
+        windows = [(load_window(py_rng.choice(fg_paths)), 0) for _ in range(py_rng.randint(*TARGETS_PER_IMAGE))]
+        windows += [(load_window(py_rng.choice(fg_paths)), None) for _ in range(py_rng.randint(*DISTRACTORS_PER_IMAGE))]
+        py_rng.shuffle(windows)
+        img, labels = compose(bg, windows, py_rng)
+        img.convert("RGB").save(out)
+        labels_multi += len(labels)
+        shares += [l[5] for l in labels]
+    t_multi = time.process_time() - start
+
+    print(f"\n--- MULTI-WINDOW COMPOSITING ({n_images} images, {size[0]}x{size[1]}) ---")
+    print(f"  single window:  {labels_single / t_single:6.1f} labels per CPU-second ({labels_single} labels)")
+    print(f"  multi-window:   {labels_multi / t_multi:6.1f} labels per CPU-second ({labels_multi} labels, "
+          f"{labels_multi / n_images:.2f} per image, min visible share {min(shares):.2f})")
+
+def main():
+    backgrounds = get_images(DatasetGenerator.BACKGROUND_DIR)
+    if not backgrounds:
+        print(f"Error: No wallpapers found in {DatasetGenerator.BACKGROUND_DIR}")
+        return
+    random.Random(0).shuffle(backgrounds)
+    split_idx = int(len(backgrounds) * 0.9)
+    class_names = sorted(DatasetGenerator.TARGET_CLASSES)
+    class_map = {name: i for i, name in enumerate(class_names)}
+    generate_split('train', DatasetGenerator.FOREGROUND_ROOT_TRAIN, backgrounds[:split_idx], class_map, IMAGES_PER_SPLIT['train'])
+    generate_split('test', DatasetGenerator.FOREGROUND_ROOT_TEST, backgrounds[split_idx:], class_map, IMAGES_PER_SPLIT['test'])
+    with open(f'{OUTPUT_BASE}/data.yaml', 'w') as f:
+        f.write(f"path: {os.path.abspath(OUTPUT_BASE)}\ntrain: images/train\nval: images/test\ntest: images/test\n\n"
+                f"nc: {len(class_names)}\nnames: {class_names}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import os
+import time
+import cv2
+import numpy as np
+
+# Cheap classical-CV stage in front of YOLO (Lecture11 Canny + Lecture12 contours).
+# Application windows are large, bright-edged rectangles, so on a downsampled
+# frame: blur -> Canny -> close small gaps -> contours -> keep the ones whose
+# polygon approximation is a big, axis-aligned rectangle. No candidate = the
+# model is not run at all; otherwise the model only sees the crop around them.
+
+# --- CONFIGURATION ---
+PROPOSAL_WIDTH = 640          # Frames are downsampled to this width before edge detection
+CANNY_LOW, CANNY_HIGH = 40, 100
+MIN_AREA_RATIO = 0.03         # Smallest window worth proposing, as a share of the frame area
+MIN_RECTANGULARITY = 0.85     # contourArea / boundingRect area
+APPROX_EPSILON = 0.02         # approxPolyDP tolerance as a share of the contour perimeter
+PAD_RATIO = 0.05              # Crop padding on each side, as a share of the crop size
+MAX_CROP_RATIO = 0.7          # A crop bigger than this share of the frame is not worth it - use the full frame
+
+MODEL_PATH = 'HomeAssignment/AI Models/FinalAIModel/weights/best.pt'   # Only used by benchmark()
+TEST_IMAGES_DIR = 'HomeAssignment/Dataset/Dataset/images/test'   # TestDataGenerator output
+TEST_LABELS_DIR = 'HomeAssignment/Dataset/Dataset/labels/test'
+COVER_RATIO = 0.9             # A ground-truth box counts as kept if this much of it lies inside the crop
+# ---------------------
+
+def propose_regions(frame, width=PROPOSAL_WIDTH):
+    """Returns window-like rectangles as an N x 4 int array of full-resolution xyxy boxes."""
+    h, w = frame.shape[:2]
+    scale = min(1.0, width / w)
+    small = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else frame
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), CANNY_LOW, CANNY_HIGH)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = MIN_AREA_RATIO * gray.shape[0] * gray.shape[1]
+    boxes = []
+    for c in contours:
+        x, y, bw, bh = cv2.boundingRect(c)
+        if bw * bh < min_area:
+            continue
+        area = cv2.contourArea(c)
+        if area < MIN_RECTANGULARITY * bw * bh:
+            continue
+        approx = cv2.approxPolyDP(c, APPROX_EPSILON * cv2.arcLength(c, True), True)
+        if not 4 <= len(approx) <= 6:       # Rounded window corners can add a vertex or two
+            continue
+        boxes.append((x, y, x + bw, y + bh))
+
+    if not boxes:
+        return np.zeros((0, 4), dtype=np.int64)
+    return np.round(np.array(boxes, dtype=np.float64) / scale).astype(np.int64)
+
+def crop_region(boxes, frame_shape, pad=PAD_RATIO):
+    """Padded union of the proposals, or None if it covers so much of the frame that cropping saves nothing."""
+    h, w = frame_shape[:2]
+    x1, y1 = boxes[:, :2].min(axis=0)
+    x2, y2 = boxes[:, 2:].max(axis=0)
+    px, py = int((x2 - x1) * pad), int((y2 - y1) * pad)
+    x1, y1, x2, y2 = max(0, x1 - px), max(0, y1 - py), min(w, x2 + px), min(h, y2 + py)
+    if (x2 - x1) * (y2 - y1) > MAX_CROP_RATIO * w * h:
+        return None
+    return int(x1), int(y1), int(x2), int(y2)
+
+class RegionPrefilter:
+    """
+    Wraps a YOLO model: model(frame, ...) becomes prefilter(frame, ...).
+    Returns a one-element list of ultralytics Results in full-frame coordinates,
+    so the runners' results[0].plot() keeps working. Counts what it skipped.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.frames = self.skipped = self.cropped = 0
+        self.prefilter_time = self.model_time = 0.0
+
+    def __call__(self, frame, **kwargs):
+        from ultralytics.engine.results import Results
+        import torch
+
+        self.frames += 1
+        t0 = time.perf_counter()
+        boxes = propose_regions(frame)
+        self.prefilter_time += time.perf_counter() - t0
+
+        if not len(boxes):
+            self.skipped += 1
+            return [Results(frame, path='', names=self.model.names, boxes=torch.zeros((0, 6)))]
+
+        region = crop_region(boxes, frame.shape)
+        t0 = time.perf_counter()
+        if region is None:
+            results = self.model(frame, **kwargs)
+        else:
+            self.cropped += 1
+            x1, y1, x2, y2 = region
+            r = self.model(np.ascontiguousarray(frame[y1:y2, x1:x2]), **kwargs)[0]
+            data = r.boxes.data.clone()
+            data[:, [0, 2]] += x1
+            data[:, [1, 3]] += y1
+            results = [Results(frame, path=r.path, names=r.names, boxes=data)]
+        self.model_time += time.perf_counter() - t0
+        return results
+
+    def report(self):
+        if not self.frames: return
+        print(f"\n--- PRE-FILTER ({self.frames} frames) ---")
+        print(f"  skipped inference: {self.skipped} ({self.skipped / self.frames:.1%}), "
+              f"cropped: {self.cropped} ({self.cropped / self.frames:.1%})")
+        print(f"  pre-filter {self.prefilter_time / self.frames * 1000:.1f} ms/frame, "
+              f"model {self.model_time / self.frames * 1000:.1f} ms/frame")
+
+def _covered(gt_boxes, region):
+    """Which pixel-xyxy ground-truth boxes have at least COVER_RATIO of their area inside region."""
+    if region is None:
+        return np.ones(len(gt_boxes), dtype=bool)
+    x1, y1, x2, y2 = region
+    iw = np.clip(np.minimum(gt_boxes[:, 2], x2) - np.maximum(gt_boxes[:, 0], x1), 0, None)
+    ih = np.clip(np.minimum(gt_boxes[:, 3], y2) - np.maximum(gt_boxes[:, 1], y1), 0, None)
+    area = (gt_boxes[:, 2] - gt_boxes[:, 0]) * (gt_boxes[:, 3] - gt_boxes[:, 1])
+    return iw * ih >= COVER_RATIO * area
+
+def benchmark(images_dir=TEST_IMAGES_DIR, labels_dir=TEST_LABELS_DIR, model_path=None, conf=0.5, imgsz=640, limit=None):
+    """
+    Measures the pre-filter on a labelled set (TestDataGenerator output):
+      - how many frames it skips / crops and what it costs per frame
+      - recall loss: ground-truth windows that end up outside the region the model sees
+    With model_path, also times the model with and without the pre-filter and
+    compares detection recall at IoU 0.5.
+    """
+    from Evaluator import get_images, sample_name, load_ground_truth, box_iou
+
+    paths = get_images(images_dir)[:limit]
+    if not paths:
+        print(f"No images in {images_dir} - run TestDataGenerator.py first.")
+        return
+    gt = load_ground_truth(labels_dir, [sample_name(p) for p in paths])
+
+    model = prefilter = None
+    if model_path:
+        import ModelCache
+        model = ModelCache.load_model(model_path, imgsz=imgsz)
+        prefilter = RegionPrefilter(model)
+
+    n = n_gt = kept = skipped = cropped = 0
+    neg_frames = neg_skipped = 0
+    t_prefilter = t_full = 0.0
+    found_full = found_pre = 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None: continue
+        n += 1
+        h, w = frame.shape[:2]
+        _, boxes = gt[sample_name(path)]
+        boxes = boxes * [w, h, w, h]
+
+        t0 = time.perf_counter()
+        proposals = propose_regions(frame)
+        region = crop_region(proposals, frame.shape) if len(proposals) else None
+        t_prefilter += time.perf_counter() - t0
+
+        n_gt += len(boxes)
+        if not len(boxes):
+            neg_frames += 1
+            neg_skipped += not len(proposals)
+        if not len(proposals):
+            skipped += 1
+        else:
+            cropped += region is not None
+            kept += int(_covered(boxes, region).sum())
+
+        if model is not None:
+            t0 = time.perf_counter()
+            full = model(frame, conf=conf, imgsz=imgsz, verbose=False)[0].boxes.xyxy.cpu().numpy()
+            t_full += time.perf_counter() - t0
+            pre = prefilter(frame, conf=conf, imgsz=imgsz, verbose=False)[0].boxes.xyxy.cpu().numpy()
+            found_full += int((box_iou(boxes, full) >= 0.5).any(axis=1).sum())
+            found_pre += int((box_iou(boxes, pre) >= 0.5).any(axis=1).sum())
+
+    if not n:
+        print(f"None of the {len(paths)} images in {images_dir} could be read.")
+        return
+    unread = f", {len(paths) - n} unreadable skipped" if n < len(paths) else ''
+    print(f"\n--- PRE-FILTER BENCHMARK ({n} frames, {n_gt} windows{unread}) ---")
+    print(f"  pre-filter cost:        {t_prefilter / n * 1000:8.2f} ms/frame")
+    print(f"  frames skipped:         {skipped / n:8.1%}   (negatives skipped: {neg_skipped}/{neg_frames})")
+    print(f"  frames cropped:         {cropped / n:8.1%}")
+    print(f"  windows kept in view:   {kept / max(n_gt, 1):8.1%}   (recall ceiling after the pre-filter)")
+    if model is not None:
+        t_pre = prefilter.prefilter_time + prefilter.model_time
+        print(f"  model, full frame:      {t_full / n * 1000:8.2f} ms/frame   recall@0.5 {found_full / max(n_gt, 1):.1%}")
+        print(f"  model, with pre-filter: {t_pre / n * 1000:8.2f} ms/frame   recall@0.5 {found_pre / max(n_gt, 1):.1%}")
+        print(f"  CPU saved:              {1 - t_pre / max(t_full, 1e-9):8.1%}")
+
+if __name__ == "__main__":
+    benchmark(model_path=MODEL_PATH if os.path.exists(MODEL_PATH) else None)
@@ -0,0 +1,187 @@
+import os
+import sqlite3
+
+# Per-sample generation metadata, stored as one SQLite file next to each split:
+#   <OUTPUT_BASE>/meta/<split>.db
+# Answering "which samples were occluded / cropped / small" is then an indexed
+# query instead of regenerating or rescanning the dataset.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    name             TEXT PRIMARY KEY,
+    split            TEXT NOT NULL,
+    image_path       TEXT NOT NULL,      -- relative to the dataset root
+    label_path       TEXT NOT NULL,      -- relative to the dataset root
+    class_name       TEXT,               -- NULL for negatives
+    class_id         INTEGER,
+    bg_path          TEXT,
+    fg_path          TEXT,
+    bg_w             INTEGER,
+    bg_h             INTEGER,
+    scale            REAL,               -- pasted window width / background width
+    paste_x          INTEGER,
+    paste_y          INTEGER,
+    box_w            INTEGER,
+    box_h            INTEGER,
+    crop_w_ratio     REAL,               -- 1.0 when the foreground was not cropped
+    crop_h_ratio     REAL,
+    cropped          INTEGER NOT NULL DEFAULT 0,
+    occluded         INTEGER NOT NULL DEFAULT 0,
+    background_noise INTEGER NOT NULL DEFAULT 0,
+    distractor_path  TEXT,
+    negative         INTEGER NOT NULL DEFAULT 0,
+    hard_negative    INTEGER NOT NULL DEFAULT 0,  -- drawn from HardNegativeMiner output
+    noise            TEXT,                        -- comma separated ImageOps.Noise augmentations, NULL if none
+    photometric      TEXT                         -- '<mode>:<targets>' of DatasetGenerator.PhotometricLUTs, NULL if off
+);
+CREATE INDEX IF NOT EXISTS idx_class    ON samples (class_name);
+CREATE INDEX IF NOT EXISTS idx_scale    ON samples (scale);
+CREATE INDEX IF NOT EXISTS idx_flags    ON samples (occluded, cropped, negative, background_noise, hard_negative);
+CREATE INDEX IF NOT EXISTS idx_bg       ON samples (bg_path);
+CREATE INDEX IF NOT EXISTS idx_fg       ON samples (fg_path);
+"""
+
+COLUMNS = ['name', 'split', 'image_path', 'label_path', 'class_name', 'class_id', 'bg_path', 'fg_path',
+           'bg_w', 'bg_h', 'scale', 'paste_x', 'paste_y', 'box_w', 'box_h', 'crop_w_ratio', 'crop_h_ratio',
+           'cropped', 'occluded', 'background_noise', 'distractor_path', 'negative', 'hard_negative',
+           'noise', 'photometric']
+
+TAG_COLUMNS = ['occluded', 'cropped', 'background_noise', 'negative', 'hard_negative']
+
+def get_db_path(dataset_root, split):
+    return os.path.join(dataset_root, 'meta', f"{split}.db")
+
+class MetadataWriter:
+    """
+    Collects one row per generated sample and writes them in batches.
+    Use as a context manager so the last batch is flushed even if generation is interrupted.
+    The split's sidecar is recreated unless append=True (for callers that add to an existing split);
+    rows with an existing name are then replaced.
+    """
+    def __init__(self, dataset_root, split, batch_size=500, append=False):
+        self.split = split
+        self.batch_size = batch_size
+        self.rows = []
+
+        db_path = get_db_path(dataset_root, split)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        if os.path.exists(db_path) and not append:
+            os.remove(db_path)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def add(self, name, ext='jpg', **fields):
+        row = {c: None for c in COLUMNS}
+        row.update(crop_w_ratio=1.0, crop_h_ratio=1.0, cropped=0, occluded=0, background_noise=0, negative=0,
+                   hard_negative=0)
+        row.update(fields)
+        row['name'] = name
+        row['split'] = self.split
+        row['image_path'] = f"images/{self.split}/{name}.{ext}"
+        row['label_path'] = f"labels/{self.split}/{name}.txt"
+        self.rows.append(tuple(int(row[c]) if isinstance(row[c], bool) else row[c] for c in COLUMNS))
+
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows: return
+        placeholders = ', '.join('?' * len(COLUMNS))
+        self.conn.executemany(f"INSERT OR REPLACE INTO samples ({', '.join(COLUMNS)}) VALUES ({placeholders})", self.rows)
+        self.conn.commit()
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def connect(dataset_root, split):
+    db_path = get_db_path(dataset_root, split)
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No metadata for split '{split}' at {db_path} (regenerate the dataset to create it).")
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def query(dataset_root, split, where=None, params=(), class_name=None, occluded=None, cropped=None,
+          negative=None, background_noise=None, hard_negative=None, scale_min=None, scale_max=None, columns='*'):
+    """
+    Returns matching rows as dicts. Keyword filters are ANDed together with an optional raw SQL `where`.
+
+    Example - all occluded Claude samples at scale < 0.55:
+        query(root, 'train', class_name='Claude', occluded=True, scale_max=0.55)
+    """
+    clauses, args = [], []
+    if class_name is not None:
+        clauses.append("class_name = ?"); args.append(class_name)
+    for column, value in (('occluded', occluded), ('cropped', cropped), ('negative', negative),
+                          ('background_noise', background_noise), ('hard_negative', hard_negative)):
+        if value is not None:
+            clauses.append(f"{column} = ?"); args.append(int(value))
+    if scale_min is not None:
+        clauses.append("scale >= ?"); args.append(scale_min)
+    if scale_max is not None:
+        clauses.append("scale < ?"); args.append(scale_max)
+    if where:
+        clauses.append(f"({where})"); args.extend(params)
+
+    sql = f"SELECT {columns} FROM samples"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY name"
+
+    conn = connect(dataset_root, split)
+    try:
+        return [dict(r) for r in conn.execute(sql, args)]
+    finally:
+        conn.close()
+
+def find_images(dataset_root, split, **filters):
+    """Same filters as query(), but returns absolute image paths."""
+    rows = query(dataset_root, split, columns='image_path', **filters)
+    return [os.path.abspath(os.path.join(dataset_root, r['image_path'])) for r in rows]
+
+def write_file_list(image_paths, out_path):
+    """Writes one image path per line. Ultralytics accepts such .txt files as a train/val source."""
+    with open(out_path, 'w') as f:
+        f.write('\n'.join(image_paths) + '\n')
+    print(f"Wrote {len(image_paths)} images to {out_path}")
+
+def load_tags(dataset_root, split):
+    """{sample name: [augmentation tags]}, e.g. ['occluded', 'background_noise'] or ['plain']."""
+    rows = query(dataset_root, split, columns=f"name, {', '.join(TAG_COLUMNS)}")
+    tags = {}
+    for r in rows:
+        tags[r['name']] = [c for c in TAG_COLUMNS if r[c]] or ['plain']
+    return tags
+
+def summarize(dataset_root, split):
+    """Per-class sample counts and augmentation mix for one split."""
+    conn = connect(dataset_root, split)
+    try:
+        rows = conn.execute("""
+            SELECT class_name, COUNT(*) AS n, AVG(scale) AS avg_scale,
+                   SUM(occluded) AS occluded, SUM(cropped) AS cropped, SUM(background_noise) AS background_noise
+            FROM samples GROUP BY class_name ORDER BY class_name
+        """).fetchall()
+    finally:
+        conn.close()
+
+    print(f"\n--- {split.upper()} ---")
+    for r in rows:
+        print(f"  {r['class_name'] or 'negative':<10} n={r['n']:<6} avg_scale={r['avg_scale'] or 0:.3f} "
+              f"occluded={r['occluded']} cropped={r['cropped']} background_noise={r['background_noise']}")
+
+if __name__ == "__main__":
+    DATASET_ROOT = 'HomeAssignment/Dataset/TestDataset060126/FinalDataset'
+    for split in ['train', 'test']:
+        try:
+            summarize(DATASET_ROOT, split)
+        except FileNotFoundError as e:
+            print(e)
@@ -0,0 +1,244 @@
+import os
+import time
+import math
+import random
+from functools import lru_cache
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, DataLoader, get_worker_info
+
+import DatasetGenerator
+from DatasetGenerator import paste_window_safe, apply_occlusion, get_images, convert_to_yolo
+from newestDatasetGenerator import get_random_crop
+
+# --- CONFIGURATION ---
+BACKGROUND_DIR = 'HomeAssignment/Dataset/wallpaper_dataset'
+FOREGROUND_ROOT = 'HomeAssignment/Dataset/Foregrounds_Train'
+TARGET_CLASSES = ['ChatGPT', 'Claude', 'Gemini']
+DISTRACTOR_NAME = 'distractors'
+
+COPIES_PER_IMG = 100          # Same meaning as TRAIN_COPIES_PER_IMG, but per epoch
+NEGATIVES_PER_EPOCH = 500
+BACKGROUND_NOISE_PROB = 0.3
+OCCLUSION_PROB = 0.3
+CROP_PROB = 0.3
+
+IMG_SIZE = 640
+BATCH_SIZE = 16
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+SEED = 0
+# ---------------------
+
+@lru_cache(maxsize=512)
+def load_rgba(path):
+    """Foregrounds and distractors are reused constantly, so each worker decodes them once."""
+    return DatasetGenerator.get_RGBA_image(path)
+
+def letterbox(img, size, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to size x size. Returns image, scale and (pad_x, pad_y)."""
+    h, w = img.shape[:2]
+    r = size / max(h, w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out = np.full((size, size, 3), color, dtype=np.uint8)
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = img
+    return out, r, (pad_x, pad_y)
+
+class SyntheticWindowStream(IterableDataset):
+    """
+    Composites training samples on demand instead of reading pre-generated JPEGs.
+    Uses the same paste/occlusion/crop logic as the generators, so samples are
+    distributed like a DatasetGenerator run, but every epoch sees fresh composites.
+
+    Yields (image[H, W, 3] BGR uint8 letterboxed to img_size, labels[N, 5] as cls xc yc w h).
+    Each (epoch, worker) pair gets its own fixed seed, so an epoch is reproducible.
+    """
+    def __init__(self, bg_images, fg_root, class_names, copies_per_img=COPIES_PER_IMG,
+                 negatives=NEGATIVES_PER_EPOCH, img_size=IMG_SIZE, seed=SEED):
+        self.bg_images = bg_images
+        self.class_map = {name: i for i, name in enumerate(sorted(class_names))}
+        self.distractors = get_images(os.path.join(fg_root, DISTRACTOR_NAME))
+        self.img_size = img_size
+        self.seed = seed
+        self.epoch = 0
+
+        # The job list only holds (foreground path, class id); negatives use class -1
+        self.jobs = []
+        for class_name, class_id in self.class_map.items():
+            for fg_path in get_images(os.path.join(fg_root, class_name)):
+                self.jobs += [(fg_path, class_id)] * copies_per_img
+        if self.distractors:
+            self.jobs += [(None, -1)] * negatives
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def compose(self, fg_path, class_id, rng):
+        bg = DatasetGenerator.get_RGBA_image(rng.choice(self.bg_images))
+        bg_w, bg_h = bg.size
+
+        if class_id < 0:
+            final_img, _, _ = paste_window_safe(bg, load_rgba(rng.choice(self.distractors)),
+                                                DatasetGenerator.SCALE_MIN, DatasetGenerator.SCALE_MAX)
+            return final_img, np.zeros((0, 5), dtype=np.float32)
+
+        if self.distractors and rng.random() < BACKGROUND_NOISE_PROB:
+            bg, _, _ = paste_window_safe(bg, load_rgba(rng.choice(self.distractors)), 0.4, 0.9)
+
+        fg = load_rgba(fg_path)
+        if rng.random() < CROP_PROB:
+            fg = get_random_crop(fg)
+
+        final_img, (x1, y1, x2, y2), _ = paste_window_safe(bg, fg, DatasetGenerator.SCALE_MIN, DatasetGenerator.SCALE_MAX)
+
+        if self.distractors and rng.random() < OCCLUSION_PROB:
+            final_img = apply_occlusion(final_img, (x1, y1, x2, y2), self.distractors)
+
+        return final_img, np.array([[class_id, *convert_to_yolo(bg_w, bg_h, x1, y1, x2, y2)]], dtype=np.float32)
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker_id, num_workers = (info.id, info.num_workers) if info else (0, 1)
+
+        # Shuffle the job list identically in every worker, then take this worker's slice
+        order = list(range(len(self.jobs)))
+        random.Random(self.seed * 1_000_003 + self.epoch).shuffle(order)
+        order = order[worker_id::num_workers]
+
+        # The generator helpers draw from the module-level `random`, so seed it per worker/epoch
+        worker_seed = self.seed * 1_000_003 + self.epoch * 1_009 + worker_id
+        random.seed(worker_seed)
+        rng = random.Random(worker_seed)
+
+        for idx in order:
+            fg_path, class_id = self.jobs[idx]
+            try:
+                img, labels = self.compose(fg_path, class_id, rng)
+            except Exception:
+                continue
+
+            frame = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGBA2BGR)
+            h0, w0 = frame.shape[:2]
+            frame, r, (pad_x, pad_y) = letterbox(frame, self.img_size)
+            if len(labels):
+                # Map normalized boxes from the original frame into the letterboxed frame
+                labels[:, 1] = (labels[:, 1] * w0 * r + pad_x) / self.img_size
+                labels[:, 2] = (labels[:, 2] * h0 * r + pad_y) / self.img_size
+                labels[:, 3] *= w0 * r / self.img_size
+                labels[:, 4] *= h0 * r / self.img_size
+            yield frame, labels
+
+def collate_batch(samples):
+    """Builds the batch dict ultralytics' detection trainer expects."""
+    imgs, cls, bboxes, batch_idx = [], [], [], []
+    for i, (img, labels) in enumerate(samples):
+        imgs.append(torch.from_numpy(img[:, :, ::-1].transpose(2, 0, 1).copy()))  # BGR HWC -> RGB CHW
+        cls.append(torch.from_numpy(labels[:, :1]))
+        bboxes.append(torch.from_numpy(labels[:, 1:]))
+        batch_idx.append(torch.full((len(labels),), i, dtype=torch.float32))
+
+    size = imgs[0].shape[1:]
+    return {
+        'img': torch.stack(imgs),
+        'cls': torch.cat(cls),
+        'bboxes': torch.cat(bboxes),
+        'batch_idx': torch.cat(batch_idx),
+        'im_file': [f"stream_{i}" for i in range(len(samples))],
+        'ori_shape': [tuple(size)] * len(samples),
+        'resized_shape': [tuple(size)] * len(samples),
+    }
+
+def build_stream_loader(dataset, batch_size=BATCH_SIZE, num_workers=NUM_WORKERS):
+    return DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, collate_fn=collate_batch,
+                      pin_memory=False, persistent_workers=False, prefetch_factor=4 if num_workers else None)
+
+def get_streaming_trainer(dataset):
+    """
+    Returns an ultralytics DetectionTrainer subclass whose train loader is the stream.
+    Validation still uses the materialized test split from the data yaml.
+    """
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class StreamingTrainer(DetectionTrainer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.add_callback("on_train_epoch_start", lambda trainer: dataset.set_epoch(trainer.epoch))
+
+        def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode="train"):
+            if mode != "train":
+                return super().get_dataloader(dataset_path, batch_size, rank, mode)
+            return build_stream_loader(dataset, batch_size, self.args.workers)
+
+        def plot_training_labels(self):
+            pass  # There is no label file list to plot for a stream
+
+    return StreamingTrainer
+
+def train_streaming(model_path='yolo11n.pt', data_yaml='HomeAssignment/finalDataset.yaml', epochs=100, **train_args):
+    """Drop-in replacement for the model.train(...) cell in trainier.ipynb, fed by the stream."""
+    from ultralytics import YOLO
+
+    dataset = make_default_dataset()
+    model = YOLO(model_path)
+    # Mosaic/close_mosaic need a random-access dataset, so they are turned off for the stream
+    return model.train(data=data_yaml, epochs=epochs, imgsz=IMG_SIZE, batch=BATCH_SIZE,
+                       trainer=get_streaming_trainer(dataset),
+                       close_mosaic=0, plots=False, **train_args)
+
+def make_default_dataset():
+    train_bgs, _ = DatasetGenerator.split_backgrounds(get_images(BACKGROUND_DIR))  # Same split as DatasetGenerator.main
+    return SyntheticWindowStream(train_bgs, FOREGROUND_ROOT, TARGET_CLASSES)
+
+def benchmark(num_batches=50, model_path='yolo11n.pt'):
+    """
+    Compares how fast the stream produces batches with how fast a CPU
+    forward/backward pass consumes them at the same batch size.
+    """
+    dataset = make_default_dataset()
+    if not len(dataset):
+        print("No foregrounds/backgrounds found - check BACKGROUND_DIR and FOREGROUND_ROOT.")
+        return
+
+    # 1. Loader throughput
+    loader = build_stream_loader(dataset, BATCH_SIZE, NUM_WORKERS)
+    it = iter(loader)
+    next(it)  # Worker start-up is not part of steady state
+    start = time.perf_counter()
+    n = 0
+    for batch in it:
+        n += 1
+        if n >= num_batches: break
+    loader_time = (time.perf_counter() - start) / max(n, 1)
+
+    # 2. Training step cost on the same batch size (forward + backward, CPU)
+    from ultralytics import YOLO
+    net = YOLO(model_path).model.train()
+    imgs = batch['img'].float() / 255
+    for p in net.parameters():
+        p.requires_grad_(True)
+    steps = 3
+    start = time.perf_counter()
+    for _ in range(steps):
+        preds = net(imgs)
+        loss = sum(p.sum() for p in (preds if isinstance(preds, (list, tuple)) else [preds]))
+        loss.backward()
+        net.zero_grad()
+    step_time = (time.perf_counter() - start) / steps
+
+    print(f"\n--- STREAM BENCHMARK (batch={BATCH_SIZE}, workers={NUM_WORKERS}, imgsz={IMG_SIZE}) ---")
+    print(f"Loader:     {loader_time * 1000:8.1f} ms/batch  ({BATCH_SIZE / loader_time:6.1f} img/s)")
+    print(f"Train step: {step_time * 1000:8.1f} ms/batch  ({BATCH_SIZE / step_time:6.1f} img/s)")
+    if loader_time <= step_time:
+        print("Stream keeps up with CPU training: the trainer will never wait on data.")
+    else:
+        needed = math.ceil(NUM_WORKERS * loader_time / step_time)
+        print(f"Stream is the bottleneck: roughly {needed} workers would be needed to keep up.")
+
+if __name__ == "__main__":
+    benchmark()
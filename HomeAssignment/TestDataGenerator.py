@@ -3,6 +3,8 @@ import random
 import shutil
 from PIL import Image
 from tqdm import tqdm
+import DatasetGenerator
+from DatasetGenerator import save_image
 
 # --- CONFIGURATION ---
 # INPUT: Where your "Test" source images are
@@ -17,6 +19,7 @@ COPIES_PER_IMAGE = 30       # Fewer copies for testing (e.g., 30 per screenshot)
 TOTAL_EMPTY_IMAGES = 50     # Test detecting "nothing" (Negative samples)
 WINDOW_SCALE_MIN = 0.3
 WINDOW_SCALE_MAX = 0.8
+OUTPUT_ENCODING = DatasetGenerator.OUTPUT_ENCODING   # DatasetGenerator.save_image settings - see EncodingBenchmark.py
 # ---------------------
 
 def setup_directories():
@@ -100,7 +103,7 @@ def generate_test_set():
                     comp.paste(fg_resized, (px, py), fg_resized)
                     
                     final_name = f"test_pos_{global_count:05d}"
-                    comp.convert("RGB").save(f"{OUTPUT_BASE}/images/test/{final_name}.jpg")
+                    save_image(comp, f"{OUTPUT_BASE}/images/test/{final_name}", OUTPUT_ENCODING)
 
                     bbox = convert_to_yolo(bg_w, bg_h, px, py, px+new_w, py+new_h)
                     with open(f"{OUTPUT_BASE}/labels/test/{final_name}.txt", 'w') as f:
@@ -117,7 +120,7 @@ def generate_test_set():
             bg = Image.open(bg_path).convert("RGB")
             final_name = f"test_neg_{i:05d}"
             
-            bg.save(f"{OUTPUT_BASE}/images/test/{final_name}.jpg")
+            save_image(bg, f"{OUTPUT_BASE}/images/test/{final_name}", OUTPUT_ENCODING)
             # Empty label file
             with open(f"{OUTPUT_BASE}/labels/test/{final_name}.txt", 'w') as f: pass
         except: continue
@@ -0,0 +1,170 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from ImageOps.ColorSegmentation import PROFILE_DIR, load_profile, save_profile
+
+# Trackbar tuning without the notebooks' busy loop (Color_Picker_Example,
+# ColorAdderUsingSliders, WorksheetRevision). Trackbar callbacks only record the
+# new value; the loop recomputes when something actually changed:
+#   - while a slider moves, a downscaled preview is rendered
+#   - once nothing has moved for DEBOUNCE_SECONDS, the full-resolution result is rendered once
+# All rendering runs on a worker thread, so waitKey keeps the window responsive
+# even on 4K captures.
+
+# --- CONFIGURATION ---
+IMAGE_PATH = None               # None = grab MONITOR_INDEX with mss
+MONITOR_INDEX = 1
+PREVIEW_WIDTH = 960
+DEBOUNCE_SECONDS = 0.25
+WAIT_MS = 15                    # waitKey interval; only UI events are handled at this rate
+PROFILE_PATH = os.path.join(PROFILE_DIR, 'chat_themes.json')
+CLASS_NAMES = ['ChatGPT', 'Claude', 'Gemini']
+# ---------------------
+
+class DebouncedTuner:
+    """
+    Generic slider tuner. `compute(prepared, params)` returns the image to show;
+    `prepare(image)` runs once per resolution for work the sliders don't affect
+    (e.g. the HSV conversion).
+    """
+    def __init__(self, window, trackbars, compute, image, prepare=None,
+                 preview_width=PREVIEW_WIDTH, debounce=DEBOUNCE_SECONDS):
+        self.window = window
+        self.compute = compute
+        self.prepare = prepare or (lambda img: img)
+        self.debounce = debounce
+        self.full = image
+        scale = min(1.0, preview_width / image.shape[1])
+        self.preview = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else image
+        self.prepared = {}
+
+        self.params = {name: initial for name, (initial, _) in trackbars.items()}
+        self.version = 0
+        self.changed_at = time.perf_counter()
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tuner')
+        self.timings = {'preview': [], 'full': []}
+
+        cv2.namedWindow(window, cv2.WINDOW_NORMAL)
+        for name, (initial, maximum) in trackbars.items():
+            cv2.createTrackbar(name, window, initial, maximum, lambda value, name=name: self._on_change(name, value))
+
+    def _on_change(self, name, value):
+        if self.params.get(name) == value:
+            return
+        self.params[name] = value
+        self.version += 1
+        self.changed_at = time.perf_counter()
+
+    def _render(self, kind, params):
+        t0 = time.perf_counter()
+        if kind not in self.prepared:
+            self.prepared[kind] = self.prepare(self.full if kind == 'full' else self.preview)
+        result = self.compute(self.prepared[kind], params)
+        self.timings[kind].append(time.perf_counter() - t0)
+        return result
+
+    def run(self, on_key=None):
+        """UI loop. on_key(key, tuner) handles any key except Esc, which quits."""
+        job, job_state = None, None            # job_state = (version, kind) being rendered
+        shown = (-1, None)                      # (version, kind) on screen
+        cv2.imshow(self.window, self.preview)
+
+        while True:
+            key = cv2.waitKey(WAIT_MS) & 0xFF
+            if key == 27:
+                break
+            if key != 255 and on_key:
+                on_key(key, self)
+
+            if job is not None and job.done():
+                cv2.imshow(self.window, job.result())
+                shown, job = job_state, None
+
+            if job is None:
+                settled = time.perf_counter() - self.changed_at >= self.debounce
+                if shown[0] != self.version and not settled:
+                    job_state = (self.version, 'preview')
+                elif shown != (self.version, 'full') and settled:
+                    job_state = (self.version, 'full')
+                else:
+                    continue
+                job = self.worker.submit(self._render, job_state[1], dict(self.params))
+
+        self.worker.shutdown(wait=True)
+        cv2.destroyWindow(self.window)
+        for kind, times in self.timings.items():
+            if times:
+                print(f"  {kind:<8} renders: {len(times):4d}, avg {np.mean(times) * 1000:7.1f} ms")
+
+# --- HSV RANGE TUNER (writes ColorSegmentation profiles) ---
+
+HSV_TRACKBARS = {'H min': (0, 179), 'H max': (179, 179), 'S min': (0, 255), 'S max': (255, 255),
+                 'V min': (0, 255), 'V max': (255, 255)}
+
+def params_to_range(p):
+    return (p['H min'], p['S min'], p['V min']), (p['H max'], p['S max'], p['V max'])
+
+def hsv_mask(hsv, lower, upper):
+    """inRange with hue wrap-around when H min > H max (same rule as the profiles)."""
+    if lower[0] <= upper[0]:
+        return cv2.inRange(hsv, lower, upper)
+    return cv2.inRange(hsv, lower, (179,) + upper[1:]) | cv2.inRange(hsv, (0,) + lower[1:], upper)
+
+def prepare_hsv(image):
+    return image, cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+
+def render_hsv(prepared, params):
+    image, hsv = prepared
+    mask = hsv_mask(hsv, *params_to_range(params))
+    out = cv2.bitwise_and(image, image, mask=mask)
+    cv2.putText(out, f"{cv2.countNonZero(mask) / mask.size:.1%} selected", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    return out
+
+def grab_screen(monitor_index=MONITOR_INDEX):
+    import mss
+    with mss.mss() as sct:
+        return cv2.cvtColor(np.array(sct.grab(sct.monitors[monitor_index])), cv2.COLOR_BGRA2BGR)
+
+def tune_profile(image, profile_path=PROFILE_PATH, class_names=CLASS_NAMES):
+    """
+    Keys: n = next class, a = add the current range to the class, c = clear the
+    class, s = save the profile, Esc = quit.
+    """
+    classes = {name: [] for name in class_names}
+    if os.path.exists(profile_path):
+        classes.update(load_profile(profile_path)[1])
+    current = [0]
+
+    def on_key(key, tuner):
+        name = list(classes)[current[0]]
+        if key == ord('n'):
+            current[0] = (current[0] + 1) % len(classes)
+            print(f"Class: {list(classes)[current[0]]} ({len(classes[list(classes)[current[0]]])} ranges)")
+        elif key == ord('a'):
+            classes[name].append(params_to_range(tuner.params))
+            print(f"Added {classes[name][-1]} to {name}")
+        elif key == ord('c'):
+            classes[name] = []
+            print(f"Cleared {name}")
+        elif key == ord('s'):
+            save_profile(profile_path, {c: r for c, r in classes.items() if r})
+            print(f"Saved {profile_path}")
+
+    print(tune_profile.__doc__)
+    print(f"Class: {list(classes)[0]}")
+    DebouncedTuner('HSV tuner', HSV_TRACKBARS, render_hsv, image, prepare=prepare_hsv).run(on_key)
+
+def main():
+    image = cv2.imread(IMAGE_PATH) if IMAGE_PATH else grab_screen()
+    if image is None:
+        print(f"Error: could not read {IMAGE_PATH}")
+        return
+    print(f"Tuning on a {image.shape[1]}x{image.shape[0]} image")
+    tune_profile(image)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import os
+import json
+import math
+import time
+import numpy as np
+import psutil
+
+# Where does a training iteration go? Ultralytics callbacks that time every
+# iteration of model.train() and write one JSON line per iteration to
+#   <project>/<name>/profile.jsonl          (e.g. AI Models/FinalAIModel/profile.jsonl)
+# plus profile_summary.json with the recommendation printed at the end of training.
+#
+# Per iteration:
+#   wait      - main process waiting for the next batch from the dataloader
+#   forward   - model(batch) including the loss (forward hooks on the training model)
+#   rest      - the rest of the step: moving/normalising the batch (preprocess_batch), the backward
+#               pass and (every `accumulate` batches) the optimizer step
+#   load, aug - worker-seconds spent decoding images (load_image, RAM/disk cache hits included)
+#               and in the augmentation pipeline, summed over the batch. These run in the
+#               dataloader workers, so the timings travel back inside the batch itself.
+#   rss       - resident memory of the trainer process and of its dataloader workers
+#
+# Usage (trainier.ipynb):
+#   profiler = TrainingProfiler().attach(model)
+#   model.train(...)
+
+# --- CONFIGURATION ---
+LOG_NAME = 'profile.jsonl'
+SUMMARY_NAME = 'profile_summary.json'
+SKIP_ITERATIONS = 5           # Warm-up iterations of each epoch left out of the summary
+WORKER_RSS_EVERY = 10         # Summing the workers' RSS walks the process tree - not every iteration
+DATA_BOUND_SHARE = 0.10       # Waiting more than this share of an iteration = data-loading bound
+CACHE_RAM_FRACTION = 0.5      # Recommend cache='ram' only if the decoded set fits in this share of free memory
+# ---------------------
+
+# --- WORKER SIDE ---
+# Wrapped into the training dataset; both are plain module-level classes so the
+# dataset still pickles into spawned workers (Windows) and checkpoints.
+
+_LOAD_SECONDS = [0.0]         # Per process: load_image time since the last sample was finished
+
+class TimedLoad:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            _LOAD_SECONDS[0] += time.perf_counter() - t0
+
+class TimedTransforms:
+    """Wraps dataset.transforms; stamps each sample with its load and augmentation seconds."""
+    def __init__(self, transforms):
+        self.transforms = transforms
+
+    def __getattr__(self, name):                # close_mosaic etc. still reach the real Compose
+        if name == 'transforms':
+            raise AttributeError(name)
+        return getattr(self.transforms, name)
+
+    def __call__(self, labels):
+        loaded = _LOAD_SECONDS[0]               # The sample's own image, loaded just before
+        t0 = time.perf_counter()
+        out = self.transforms(labels)
+        elapsed = time.perf_counter() - t0
+        extra = _LOAD_SECONDS[0] - loaded       # Mosaic/MixUp load more images inside the transforms
+        out['profile_load'] = _LOAD_SECONDS[0]
+        out['profile_aug'] = elapsed - extra
+        _LOAD_SECONDS[0] = 0.0
+        return out
+
+class TimedBuild:
+    """Wraps dataset.build_transforms, so transforms rebuilt mid-training (close_mosaic) stay timed."""
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        return TimedTransforms(self.fn(*args, **kwargs))
+
+def _instrument(dataset):
+    if not isinstance(dataset.transforms, TimedTransforms):
+        dataset.transforms = TimedTransforms(dataset.transforms)
+    if not isinstance(dataset.__dict__.get('load_image'), TimedLoad):
+        dataset.load_image = TimedLoad(dataset.load_image)
+    if not isinstance(dataset.__dict__.get('build_transforms'), TimedBuild):
+        dataset.build_transforms = TimedBuild(dataset.build_transforms)
+
+# --- TRAINER SIDE ---
+
+_ACTIVE = []                  # The profiler the module-level forward hooks report to
+
+def _forward_start(module, args):
+    if _ACTIVE:
+        _ACTIVE[0]._forward_start(args[0] if args else None)
+
+def _forward_end(module, args, output):
+    if _ACTIVE:
+        _ACTIVE[0]._forward_end()
+
+def _batch_sum(batch, key):
+    values = batch.get(key) if isinstance(batch, dict) else None
+    return float(sum(values)) if values is not None else None
+
+class TrainingProfiler:
+    def __init__(self):
+        self.process = psutil.Process()
+        self.log = None
+        self.records = []
+        self.hooks = []
+        self.sync = None
+
+    def attach(self, model):
+        """Registers the callbacks on an ultralytics YOLO model; returns self."""
+        model.add_callback('on_train_start', self.on_train_start)
+        model.add_callback('on_train_epoch_start', self.on_train_epoch_start)
+        model.add_callback('on_train_batch_start', self.on_train_batch_start)
+        model.add_callback('on_train_batch_end', self.on_train_batch_end)
+        model.add_callback('on_train_epoch_end', self.on_train_epoch_end)
+        model.add_callback('on_train_end', self.on_train_end)
+        return self
+
+    # -- callbacks --
+
+    def on_train_start(self, trainer):
+        self.trainer = trainer
+        self.save_dir = str(trainer.save_dir)
+        self.log = open(os.path.join(self.save_dir, LOG_NAME), 'w')
+        if trainer.device.type == 'cuda':
+            import torch
+            self.sync = torch.cuda.synchronize    # Otherwise GPU work is timed wherever it happens to block
+        _ACTIVE[:] = [self]
+        self.hooks = [trainer.model.register_forward_pre_hook(_forward_start),
+                      trainer.model.register_forward_hook(_forward_end)]
+        _instrument(trainer.train_loader.dataset)
+        # The workers already hold a copy of the dataset from before the wrap - restart them
+        if hasattr(trainer.train_loader, 'reset'):
+            trainer.train_loader.reset()
+        self.iteration = 0
+        self.batch_end = None
+        self.worker_rss = 0
+
+    def on_train_epoch_start(self, trainer):
+        self.batch_end = time.perf_counter()     # The epoch's first wait also covers the iterator start
+        self.epoch_iteration = 0
+
+    def on_train_batch_start(self, trainer):
+        self.batch_start = time.perf_counter()
+        # close_mosaic runs after on_train_epoch_start and rebuilds dataset.transforms; TimedBuild keeps
+        # them wrapped, this catches anything that replaced them some other way
+        if self.epoch_iteration == 0 and not isinstance(trainer.train_loader.dataset.transforms, TimedTransforms):
+            _instrument(trainer.train_loader.dataset)
+            if hasattr(trainer.train_loader, 'reset'):
+                trainer.train_loader.reset()
+        self.forward = self.load = self.aug = None
+
+    def _forward_start(self, batch):
+        if self.sync: self.sync()
+        self.forward_start = time.perf_counter()
+        self.load = _batch_sum(batch, 'profile_load')
+        self.aug = _batch_sum(batch, 'profile_aug')
+
+    def _forward_end(self):
+        if self.sync: self.sync()
+        self.forward = time.perf_counter() - self.forward_start
+
+    def on_train_batch_end(self, trainer):
+        if self.sync: self.sync()
+        now = time.perf_counter()
+        if self.iteration % WORKER_RSS_EVERY == 0:
+            self.worker_rss = sum(_rss(c) for c in self.process.children(recursive=True))
+        step = now - self.batch_start
+        forward = self.forward or 0.0
+        record = {'epoch': trainer.epoch, 'iter': self.epoch_iteration,
+                  'wait': round(self.batch_start - self.batch_end, 5) if self.batch_end else None,
+                  'forward': round(forward, 5), 'rest': round(step - forward, 5),
+                  'load': None if self.load is None else round(self.load, 5),
+                  'aug': None if self.aug is None else round(self.aug, 5),
+                  'rss_mb': round(_rss(self.process) / 2**20, 1), 'worker_rss_mb': round(self.worker_rss / 2**20, 1)}
+        self.records.append(record)
+        self.log.write(json.dumps(record) + '\n')
+        self.iteration += 1
+        self.epoch_iteration += 1
+        self.batch_end = time.perf_counter()     # Excludes the profiler's own bookkeeping from the next wait
+
+    def on_train_epoch_end(self, trainer):
+        self.log.flush()
+
+    def on_train_end(self, trainer):
+        for hook in self.hooks:
+            hook.remove()
+        _ACTIVE.clear()
+        self.log.close()
+        args = trainer.args
+        summary = summarize(self.records, workers=args.workers, batch=args.batch, cache=args.cache, imgsz=args.imgsz,
+                            n_images=len(trainer.train_loader.dataset))
+        with open(os.path.join(self.save_dir, SUMMARY_NAME), 'w') as f:
+            json.dump(summary, f, indent=1)
+        report(summary)
+
+def _rss(process):
+    try:
+        return process.memory_info().rss
+    except psutil.Error:               # A worker exited between listing and reading it
+        return 0
+
+# --- ANALYSIS ---
+
+def load_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(records, workers, batch, cache=False, imgsz=640, n_images=None):
+    """Median per-iteration times and a workers / cache recommendation."""
+    steady = [r for r in records if r['iter'] >= SKIP_ITERATIONS and r['wait'] is not None] or records
+    med = lambda key: float(np.median([r[key] for r in steady if r.get(key) is not None] or [0.0]))
+    wait, forward, rest = med('wait'), med('forward'), med('rest')
+    load, aug = med('load'), med('aug')
+    compute = forward + rest
+    iteration = wait + compute
+    data_share = wait / iteration if iteration else 0.0
+    cpus = os.cpu_count() or 1
+
+    # Each worker has to produce one batch (load + aug worker-seconds) per iteration of compute
+    needed = max(1, math.ceil((load + aug) / compute)) if compute and (load + aug) else workers
+    rec_workers = min(max(needed + 1, 1), max(1, cpus - 1))
+    reasons = []
+    if data_share > DATA_BOUND_SHARE:
+        bound = 'data loading'
+        reasons.append(f"waiting for batches is {data_share:.0%} of each iteration; one batch costs "
+                       f"{load + aug:.2f} worker-seconds vs {compute:.2f} s of compute")
+        if needed <= workers:
+            reasons.append(f"{workers} workers should keep up on paper - the wait is transfer/collate overhead "
+                           f"or workers starved of cores by torch threads")
+        rec_workers = max(rec_workers, workers)
+    else:
+        bound = 'compute'
+        reasons.append(f"waiting for batches is only {data_share:.0%} of each iteration")
+        rec_workers = min(rec_workers, workers) if workers else rec_workers
+        if rec_workers < workers:
+            reasons.append(f"{workers - rec_workers} of the {workers} workers are idle - their cores can go to torch")
+
+    # Decoded images at training size: imgsz^2 * 3 bytes each (what cache='ram' keeps)
+    decoded_mb = n_images * imgsz * imgsz * 3 / 2**20 if n_images else None
+    available_mb = psutil.virtual_memory().available / 2**20
+    rec_cache = cache
+    load_share = load / (load + aug) if load + aug else 0.0
+    if cache in (False, None, 'False') and load_share > 0.3 and bound == 'data loading':
+        if decoded_mb is not None and decoded_mb < CACHE_RAM_FRACTION * available_mb:
+            rec_cache = 'ram'
+            reasons.append(f"JPEG decoding is {load_share:.0%} of worker time and the decoded set "
+                           f"(~{decoded_mb:.0f} MB) fits in RAM")
+        else:
+            rec_cache = 'disk'
+            reasons.append(f"JPEG decoding is {load_share:.0%} of worker time but the decoded set does not fit in RAM")
+
+    return {'iterations': len(records), 'bound': bound, 'data_share': round(data_share, 3),
+            'median_s': {'wait': wait, 'forward': forward, 'rest': rest, 'load': load, 'aug': aug},
+            'peak_rss_mb': max((r['rss_mb'] for r in records), default=0),
+            'peak_worker_rss_mb': max((r['worker_rss_mb'] for r in records), default=0),
+            'current': {'workers': workers, 'batch': batch, 'cache': cache},
+            'recommended': {'workers': rec_workers, 'cache': rec_cache}, 'reasons': reasons}
+
+def report(summary):
+    m = summary['median_s']
+    print(f"\n--- TRAINING PROFILE ({summary['iterations']} iterations, median per iteration) ---")
+    print(f"  wait for batch {m['wait'] * 1000:8.1f} ms")
+    print(f"  forward        {m['forward'] * 1000:8.1f} ms")
+    print(f"  rest of step   {m['rest'] * 1000:8.1f} ms   (preprocess, backward, optimizer)")
+    print(f"  worker load    {m['load'] * 1000:8.1f} ms   (summed over the batch)")
+    print(f"  worker augment {m['aug'] * 1000:8.1f} ms")
+    print(f"  peak RSS: trainer {summary['peak_rss_mb']:.0f} MB, workers {summary['peak_worker_rss_mb']:.0f} MB")
+    cur, rec = summary['current'], summary['recommended']
+    print(f"  Bound by {summary['bound']}. Recommended: workers={rec['workers']} (now {cur['workers']}), "
+          f"cache={rec['cache']!r} (now {cur['cache']!r})")
+    for reason in summary['reasons']:
+        print(f"    - {reason}")
+
+if __name__ == "__main__":
+    # Re-analyse the log of an earlier run
+    run_dir = 'HomeAssignment/AI Models/FinalAIModel'
+    report(summarize(load_log(os.path.join(run_dir, LOG_NAME)), workers=8, batch=16))
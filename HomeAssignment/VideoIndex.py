@@ -0,0 +1,300 @@
+import os
+import sqlite3
+import time
+import multiprocessing as mp
+import cv2
+import numpy as np
+
+# Random access into recordings (output_1fps.mp4, the ModelRunner inputs) without
+# decoding from the start. An index pass reads the compressed packets only
+# (OpenCV raw stream mode: CAP_PROP_FORMAT = -1, nothing is decoded) and records
+# every frame's timestamp and which frames are keyframes. Extraction then decides
+# per requested frame whether to keep decoding forward from the current position
+# or to seek: a seek only pays off when a keyframe lies far enough ahead of the
+# decoder, because OpenCV's own seek lands a little before the target and decodes
+# up to it (~SEEK_COST_FRAMES frames of work).
+#
+# Indexes are cached in SQLite keyed by path, size and mtime (like HistogramStats).
+
+# --- CONFIGURATION ---
+INDEX_DB = 'HomeAssignment/Cache/video_index.db'
+VIDEO_SOURCES = ['HomeAssignment/test.mkv', 'output_1fps.mp4', 'output_result.mp4']
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+JPEG_QUALITY = 95
+SEEK_COST_FRAMES = 24           # Decoded frames one cap.set(CAP_PROP_POS_FRAMES) costs; see calibrate_seek_cost()
+# ---------------------
+
+class VideoIndex:
+    """Per-frame timestamps (ms, display order) and keyframe frame numbers of one video."""
+    def __init__(self, path, size, mtime, fps, width, height, pts, keyframes):
+        self.path, self.size, self.mtime = path, size, mtime
+        self.fps, self.width, self.height = fps, width, height
+        self.pts = pts
+        self.keyframes = keyframes
+
+    @property
+    def frame_count(self):
+        return len(self.pts)
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps else 0.0
+
+    def keyframe_before(self, frame):
+        """Frame number of the keyframe decoding of `frame` has to start from."""
+        return int(self.keyframes[max(0, np.searchsorted(self.keyframes, frame, side='right') - 1)])
+
+    def frames_at(self, seconds):
+        """Frame numbers shown at the given times (seconds from the start)."""
+        ms = np.asarray(seconds, dtype=np.float64) * 1000 + self.pts[0]
+        return np.clip(np.searchsorted(self.pts, ms, side='right') - 1, 0, self.frame_count - 1)
+
+    def frames_between(self, start, end, step=1):
+        """Frame numbers from `start` to `end` seconds, every `step`th frame."""
+        first, last = self.frames_at([start, end])
+        return np.arange(first, last + 1, step)
+
+def build_index(path):
+    """Packet-level pass over the file: timestamps and keyframe flags, no decoding."""
+    stat = os.stat(path)
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    pts, is_key = [], []
+    while cap.grab():
+        pts.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        is_key.append(bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+    cap.release()
+
+    # Packets come in decode order; frame numbers (what cap.read() counts) are in display order
+    pts = np.asarray(pts, dtype=np.float64)
+    order = np.argsort(pts, kind='stable')
+    display_key = np.asarray(is_key, dtype=bool)[order]
+    keyframes = np.flatnonzero(display_key).astype(np.int32)
+    if not len(keyframes) or keyframes[0] != 0:
+        keyframes = np.concatenate(([0], keyframes)).astype(np.int32)
+    return VideoIndex(path, stat.st_size, stat.st_mtime, fps, width, height, pts[order], keyframes)
+
+class IndexStore:
+    """SQLite cache of VideoIndex rows. An entry is rebuilt when the file's size or mtime changes."""
+    def __init__(self, db_path=INDEX_DB):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS videos (
+                path      TEXT PRIMARY KEY,
+                size      INTEGER NOT NULL,
+                mtime     REAL NOT NULL,
+                fps       REAL NOT NULL,
+                width     INTEGER NOT NULL,
+                height    INTEGER NOT NULL,
+                pts       BLOB NOT NULL,      -- float64 ms per frame, display order
+                keyframes BLOB NOT NULL       -- int32 frame numbers
+            )""")
+        self.conn.commit()
+
+    def get(self, path, build=True):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT * FROM videos WHERE path = ?", (path,)).fetchone()
+        if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+            return VideoIndex(*row[:6], np.frombuffer(row[6], np.float64), np.frombuffer(row[7], np.int32))
+        if not build:
+            return None
+        index = build_index(path)
+        self.put(index)
+        return index
+
+    def put(self, index):
+        self.conn.execute("INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          (os.path.abspath(index.path), index.size, index.mtime, index.fps, index.width, index.height,
+                           index.pts.astype(np.float64).tobytes(), index.keyframes.astype(np.int32).tobytes()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_index(path, db_path=INDEX_DB):
+    """The (cached or freshly built) index of one video, without keeping the store open."""
+    with IndexStore(db_path) as store:
+        return store.get(path)
+
+def index_videos(paths, db_path=INDEX_DB, num_workers=NUM_WORKERS):
+    """Indexes every new or changed video (in parallel) -> {path: VideoIndex}."""
+    store = IndexStore(db_path)
+    paths = [p for p in paths if os.path.exists(p)]
+    indexes = {p: store.get(p, build=False) for p in paths}
+    todo = [p for p, index in indexes.items() if index is None]
+    if todo:
+        with mp.Pool(min(num_workers, len(todo))) as pool:
+            for path, index in zip(todo, pool.map(build_index, todo)):
+                store.put(index)
+                indexes[path] = index
+    store.close()
+    return indexes
+
+# --- EXTRACTION ---
+
+def extract_frames(path, frames, index=None, seek_cost=SEEK_COST_FRAMES):
+    """
+    Yields (frame number, BGR image) for the requested frames in ascending order.
+    Seeks when the keyframe before the next target is more than seek_cost frames
+    ahead of the decoder (or the target is behind it); otherwise decodes forward.
+    """
+    index = index or load_index(path)
+    targets = np.unique(np.asarray(frames, dtype=np.int64))
+    targets = targets[(targets >= 0) & (targets < index.frame_count)]
+    cap = cv2.VideoCapture(path)
+    position = 0                                   # Frame number the next grab() decodes
+    try:
+        for target in targets:
+            key = index.keyframe_before(target)
+            if target < position or key - position > seek_cost:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(target))   # OpenCV decodes from the keyframe up to target
+                position = target
+            while position < target:
+                if not cap.grab():
+                    return
+                position += 1
+            ok, image = cap.read()
+            if not ok:
+                return
+            position += 1
+            yield int(target), image
+    finally:
+        cap.release()
+
+def extract_range(path, start, end, step=1, index=None):
+    """Frames between `start` and `end` seconds (every `step`th), as (frame number, image)."""
+    index = index or load_index(path)
+    return extract_frames(path, index.frames_between(start, end, step), index)
+
+def frame_filename(path, frame):
+    return f"{os.path.splitext(os.path.basename(path))[0]}_{frame:07d}.jpg"
+
+def _extract_job(job):
+    path, frames, out_dir, db_path = job
+    index = load_index(path, db_path)
+    written = []
+    for frame, image in extract_frames(path, frames, index):
+        out = os.path.join(out_dir, frame_filename(path, frame))
+        cv2.imwrite(out, image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        written.append(out)
+    return written
+
+def _split_by_gop(frames, index, parts):
+    """Splits sorted frames into up to `parts` chunks without cutting a GOP in two."""
+    frames = np.unique(frames)
+    if parts <= 1 or len(frames) < 2:
+        return [frames]
+    gop = np.searchsorted(index.keyframes, frames, side='right')
+    cuts = np.flatnonzero(np.diff(gop)) + 1                  # Positions where a new GOP starts
+    wanted = np.linspace(0, len(frames), parts + 1)[1:-1]
+    chosen = np.unique(cuts[np.clip(np.searchsorted(cuts, wanted), 0, len(cuts) - 1)]) if len(cuts) else []
+    return [c for c in np.split(frames, chosen) if len(c)]
+
+def extract_parallel(requests, out_dir, db_path=INDEX_DB, num_workers=NUM_WORKERS):
+    """
+    requests: {video path: frame numbers}. Frames are written to out_dir as
+    <video>_<frame>.jpg by a pool of worker processes. Long videos are split
+    into GOP-aligned chunks so one video can keep several workers busy.
+    Returns the written paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    indexes = index_videos(list(requests), db_path, num_workers)
+    total = sum(len(f) for f in requests.values())
+    jobs = []
+    for path, frames in requests.items():
+        if path not in indexes:
+            print(f"  [Warning] {path} not found - skipped.")
+            continue
+        parts = max(1, round(num_workers * len(frames) / max(total, 1)))
+        jobs += [(path, chunk, out_dir, db_path) for chunk in _split_by_gop(frames, indexes[path], parts)]
+    if num_workers <= 1 or len(jobs) <= 1:
+        return [p for job in jobs for p in _extract_job(job)]
+    with mp.Pool(min(num_workers, len(jobs))) as pool:
+        return [p for written in pool.imap_unordered(_extract_job, jobs) for p in written]
+
+# --- BENCHMARK ---
+
+def calibrate_seek_cost(path, index, probes=10, seed=0):
+    """Cost of one POS_FRAMES seek in decoded-frame units, measured on this video."""
+    cap = cv2.VideoCapture(path)
+    n = min(index.frame_count - 1, 200)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cap.grab()
+    per_frame = (time.perf_counter() - t0) / max(n, 1)
+    targets = np.random.default_rng(seed).integers(0, index.frame_count, probes)
+    t0 = time.perf_counter()
+    for f in targets:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(f))
+        cap.grab()
+    per_seek = (time.perf_counter() - t0) / probes - per_frame
+    cap.release()
+    return per_seek / per_frame
+
+def _make_test_video(path, frames=3000, size=(640, 360), fps=30):
+    """mp4v recording (keyframe every 12 frames) with the frame number drawn on each frame."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for i in range(frames):
+        img = np.full((size[1], size[0], 3), (40, 80, 160), np.uint8)
+        cv2.putText(img, str(i), (50, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+        writer.write(img)
+    writer.release()
+
+def benchmark(path=None, samples=(10, 100, 1000), seed=0):
+    """Sequential decode vs per-frame CAP_PROP_POS_FRAMES seeks vs indexed extraction, for random frame sets."""
+    import tempfile
+    if path is None or not os.path.exists(path):
+        path = os.path.join(tempfile.mkdtemp(), 'synthetic.mp4')
+        _make_test_video(path)
+
+    t0 = time.perf_counter()
+    index = build_index(path)
+    t_index = time.perf_counter() - t0
+    print(f"\n--- VIDEO INDEX ({os.path.basename(path)}: {index.frame_count} frames, {len(index.keyframes)} keyframes) ---")
+    print(f"  index build (packets only): {t_index * 1000:.1f} ms; one seek costs ~{calibrate_seek_cost(path, index):.0f} decoded frames")
+
+    rng = np.random.default_rng(seed)
+    for n in samples:
+        frames = np.sort(rng.choice(index.frame_count, size=min(n, index.frame_count), replace=False))
+        t0 = time.perf_counter()
+        cap, reference, i = cv2.VideoCapture(path), {}, 0
+        wanted = set(frames.tolist())
+        while i <= frames[-1] and cap.grab():
+            if i in wanted:
+                reference[i] = cap.retrieve()[1]
+            i += 1
+        cap.release()
+        t_seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cap, naive = cv2.VideoCapture(path), {}
+        for f in frames:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(f))
+            naive[int(f)] = cap.read()[1]
+        cap.release()
+        t_naive = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        indexed = dict(extract_frames(path, frames, index))
+        t_indexed = time.perf_counter() - t0
+
+        exact = all(np.array_equal(indexed[f], reference[f]) for f in reference)
+        print(f"  {len(frames):5d} frames: sequential {t_seq * 1000:8.1f} ms | seek each {t_naive * 1000:8.1f} ms | "
+              f"indexed {t_indexed * 1000:8.1f} ms (identical to sequential: {exact})")
+
+if __name__ == "__main__":
+    indexes = index_videos(VIDEO_SOURCES)
+    for path, index in indexes.items():
+        print(f"{path}: {index.frame_count} frames, {index.duration:.0f} s, {len(index.keyframes)} keyframes")
+    benchmark(next(iter(indexes), None))
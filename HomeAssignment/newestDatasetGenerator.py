@@ -1,8 +1,11 @@
 import os
 import random
 import shutil
+import numpy as np
 from PIL import Image
 from tqdm import tqdm
+from SampleMetadata import MetadataWriter
+from ImageOps import Noise
 
 # --- CONFIGURATION ---
 BACKGROUND_DIR = 'HomeAssignment/Dataset/wallpaper_dataset'
@@ -26,6 +29,13 @@ NEGATIVES_COUNT = 1500
 # (e.g., 0.4 means the crop will be at least 40% of the original window size)
 MIN_CROP_RATIO = 0.4 
 
+# NOISE AUGMENTATIONS (ImageOps.Noise) - chance per sample, 0 disables
+NOISE_PROBABILITIES = {'salt_pepper': 0.0, 'gaussian': 0.0, 'poisson': 0.0, 'jpeg': 0.0}
+NOISE_RNG = np.random.default_rng()
+
+# OUTPUT ENCODING (DatasetGenerator.save_image) - None uses DatasetGenerator.OUTPUT_ENCODING, see EncodingBenchmark.py
+OUTPUT_ENCODING = None
+
 # ---------------------
 
 def setup_directories():
@@ -67,7 +77,6 @@ def get_random_crop(img):
     # Determine random position for the crop
     x = random.randint(0, w - crop_w)
     y = random.randint(0, h - crop_h)
-    return img
     return img.crop((x, y, x + crop_w, y + crop_h))
 
 def paste_window_simple(bg, fg):
@@ -103,82 +112,97 @@ def paste_window_simple(bg, fg):
     return comp, (px, py, px+new_w, py+new_h)
 
 def process_partition(split_name, fg_root, bg_images, class_map, copies_per_img, DistractorsAmt):
+    from DatasetGenerator import save_image     # DatasetGenerator imports get_random_crop from here
     print(f"\n--- Processing {split_name.upper()} ---")
     global_count = 0
-    
-    # 1. Load Distractors
-    distractor_path = os.path.join(fg_root, DISTRACTOR_NAME)
-    distractors = get_images(distractor_path)
-    if distractors:
-        print(f"  Loaded {len(distractors)} distractors.")
-
-    # 2. Process Targets
-    for class_name, class_id in class_map.items():
-        folder_path = os.path.join(fg_root, class_name)
-        foregrounds = get_images(folder_path)
+    with MetadataWriter(OUTPUT_BASE, split_name) as meta:
+        # 1. Load Distractors
+        distractor_path = os.path.join(fg_root, DISTRACTOR_NAME)
+        distractors = get_images(distractor_path)
+        if distractors:
+            print(f"  Loaded {len(distractors)} distractors.")
+
+        # 2. Process Targets
+        for class_name, class_id in class_map.items():
+            folder_path = os.path.join(fg_root, class_name)
+            foregrounds = get_images(folder_path)
         
-        if not foregrounds: continue
-        print(f"  Class '{class_name}' (ID: {class_id}): Generating...")
-
-        for fg_path in foregrounds:
-            try:
-                fg_original = Image.open(fg_path).convert("RGBA")
-            except: continue
+            if not foregrounds: continue
+            print(f"  Class '{class_name}' (ID: {class_id}): Generating...")
 
-            for i in range(copies_per_img):
+            for fg_path in foregrounds:
+                try:
+                    fg_original = Image.open(fg_path).convert("RGBA")
+                except: continue
+
+                for i in range(copies_per_img):
+                    try:
+                        bg_path = random.choice(bg_images)
+                        bg = Image.open(bg_path).convert("RGBA")
+                        bg_w, bg_h = bg.size
+
+                        # --- LOGIC CHANGE HERE ---
+                        # Iteration 0: Use the FULL original image
+                        # Iteration 1+: Use a RANDOM CROP of the image
+                        if i == 0:
+                            fg_to_use = fg_original
+                        else:
+                            fg_to_use = get_random_crop(fg_original)
+
+                        # Paste (Algorithm handles placement and safety scaling)
+                        final_img, (x1, y1, x2, y2) = paste_window_simple(bg, fg_to_use)
+                        final_img, noise = Noise.augment_pil(final_img, NOISE_PROBABILITIES, NOISE_RNG)
+
+                        # Save Image
+                        fname = f"{split_name}_{class_name}_{global_count:06d}"
+                        ext = save_image(final_img, f"{OUTPUT_BASE}/images/{split_name}/{fname}", OUTPUT_ENCODING)
+                    
+                        # Save Label
+                        bbox = convert_to_yolo(bg_w, bg_h, x1, y1, x2, y2)
+                        with open(f"{OUTPUT_BASE}/labels/{split_name}/{fname}.txt", 'w') as f:
+                            f.write(f"{class_id} {bbox[0]:.6f} {bbox[1]:.6f} {bbox[2]:.6f} {bbox[3]:.6f}\n")
+
+                        meta.add(fname, ext, class_name=class_name, class_id=class_id, bg_path=bg_path, fg_path=fg_path,
+                                 bg_w=bg_w, bg_h=bg_h, scale=(x2 - x1) / bg_w, paste_x=x1, paste_y=y1,
+                                 box_w=x2 - x1, box_h=y2 - y1, cropped=fg_to_use is not fg_original,
+                                 crop_w_ratio=fg_to_use.width / fg_original.width,
+                                 crop_h_ratio=fg_to_use.height / fg_original.height, noise=','.join(noise) or None)
+                        global_count += 1
+                    except Exception as e:
+                        continue
+
+        # 3. Generate Distractor Negatives
+        if distractors:
+            print(f"  Generating {DistractorsAmt} Distractor-Only Negatives...")
+            for _ in tqdm(range(DistractorsAmt)):
                 try:
                     bg_path = random.choice(bg_images)
                     bg = Image.open(bg_path).convert("RGBA")
-                    bg_w, bg_h = bg.size
-
-                    # --- LOGIC CHANGE HERE ---
-                    # Iteration 0: Use the FULL original image
-                    # Iteration 1+: Use a RANDOM CROP of the image
-                    if i == 0:
-                        fg_to_use = fg_original
-                    else:
-                        fg_to_use = get_random_crop(fg_original)
-
-                    # Paste (Algorithm handles placement and safety scaling)
-                    final_img, (x1, y1, x2, y2) = paste_window_simple(bg, fg_to_use)
-
-                    # Save Image
-                    fname = f"{split_name}_{class_name}_{global_count:06d}"
-                    final_img.convert("RGB").save(f"{OUTPUT_BASE}/images/{split_name}/{fname}.jpg")
-                    
-                    # Save Label
-                    bbox = convert_to_yolo(bg_w, bg_h, x1, y1, x2, y2)
-                    with open(f"{OUTPUT_BASE}/labels/{split_name}/{fname}.txt", 'w') as f:
-                        f.write(f"{class_id} {bbox[0]:.6f} {bbox[1]:.6f} {bbox[2]:.6f} {bbox[3]:.6f}\n")
-
-                    global_count += 1
-                except Exception as e:
-                    continue
-
-    # 3. Generate Distractor Negatives
-    if distractors:
-        print(f"  Generating {DistractorsAmt} Distractor-Only Negatives...")
-        for _ in tqdm(range(DistractorsAmt)):
-            try:
-                bg = Image.open(random.choice(bg_images)).convert("RGBA")
                 
-                # Apply same logic to distractors? 
-                # Let's crop them too so the AI learns "Partial Notepad" is also NOT Gemini.
-                dist_original = Image.open(random.choice(distractors)).convert("RGBA")
-                if random.random() > 0.5:
-                    dist_to_use = get_random_crop(dist_original)
-                else:
-                    dist_to_use = dist_original
+                    # Apply same logic to distractors? 
+                    # Let's crop them too so the AI learns "Partial Notepad" is also NOT Gemini.
+                    dist_path = random.choice(distractors)
+                    dist_original = Image.open(dist_path).convert("RGBA")
+                    if random.random() > 0.5:
+                        dist_to_use = get_random_crop(dist_original)
+                    else:
+                        dist_to_use = dist_original
                 
-                final_img, _, = paste_window_simple(bg, dist_to_use)
+                    final_img, (x1, y1, x2, y2) = paste_window_simple(bg, dist_to_use)
+                    final_img, noise = Noise.augment_pil(final_img, NOISE_PROBABILITIES, NOISE_RNG)
                 
-                fname = f"{split_name}_neg_{global_count:06d}"
-                final_img.convert("RGB").save(f"{OUTPUT_BASE}/images/{split_name}/{fname}.jpg")
+                    fname = f"{split_name}_neg_{global_count:06d}"
+                    ext = save_image(final_img, f"{OUTPUT_BASE}/images/{split_name}/{fname}", OUTPUT_ENCODING)
                 
-                with open(f"{OUTPUT_BASE}/labels/{split_name}/{fname}.txt", 'w') as f: pass
+                    with open(f"{OUTPUT_BASE}/labels/{split_name}/{fname}.txt", 'w') as f: pass
                 
-                global_count += 1
-            except: continue
+                    meta.add(fname, ext, negative=True, bg_path=bg_path, bg_w=bg.width, bg_h=bg.height,
+                             scale=(x2 - x1) / bg.width, paste_x=x1, paste_y=y1, box_w=x2 - x1, box_h=y2 - y1,
+                             cropped=dist_to_use is not dist_original, distractor_path=dist_path,
+                             crop_w_ratio=dist_to_use.width / dist_original.width,
+                             crop_h_ratio=dist_to_use.height / dist_original.height, noise=','.join(noise) or None)
+                    global_count += 1
+                except: continue
 
     return global_count
 
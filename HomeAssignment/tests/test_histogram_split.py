@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SampleMetadata import MetadataWriter
+from HistogramStats import get_background_split
+
+
+def test_background_split_from_sidecars(tmp_path):
+    root = str(tmp_path)
+    with MetadataWriter(root, 'train') as meta:
+        meta.add('train_a', bg_path='bg/a.jpg')
+        meta.add('train_b', bg_path='bg/b.jpg')
+        meta.add('train_neg', negative=True)
+    with MetadataWriter(root, 'test') as meta:
+        meta.add('test_c', bg_path='bg/c.jpg')
+
+    train, test = get_background_split(['bg/a.jpg', 'bg/b.jpg', 'bg/c.jpg'], dataset_root=root)
+    assert train == sorted(os.path.abspath(p) for p in ('bg/a.jpg', 'bg/b.jpg'))
+    assert test == [os.path.abspath('bg/c.jpg')]
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from HistogramStats import HistogramCache, update_video
+
+
+def test_video_reread_when_step_changes(tmp_path):
+    video = str(tmp_path / 'clip.mp4')
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+    for i in range(120):
+        writer.write(np.full((48, 64, 3), i * 2, np.uint8))
+    writer.release()
+
+    cache = HistogramCache(str(tmp_path / 'histograms.db'))
+    assert len(update_video(cache, video, step=60)) == 2
+    assert len(update_video(cache, video, step=30)) == 4     # Finer step: not served from the 60-frame entries
+    assert len(update_video(cache, video, step=30)) == 4
+    assert len(cache.stamps()) == 4                          # The 60-frame entries were replaced
+    cache.close()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from LabelCache import get_cache_path, load_labels
+
+
+def _make_split(root):
+    os.makedirs(os.path.join(root, 'images', 'train'))
+    os.makedirs(os.path.join(root, 'labels', 'train'))
+    Image.new('RGB', (100, 80)).save(os.path.join(root, 'images', 'train', 'a.png'))
+    with open(os.path.join(root, 'labels', 'train', 'a.txt'), 'w') as f:
+        f.write("0 0.5 0.5 0.2 0.2\n5 0.5 0.5 0.3 0.3\n")
+    with open(os.path.join(root, 'data.yaml'), 'w') as f:
+        f.write("nc: 3\nnames: ['ChatGPT', 'Claude', 'Gemini']\n")
+
+
+def test_class_ids_checked_against_data_yaml(tmp_path):
+    root = str(tmp_path)
+    _make_split(root)
+    labels = load_labels(root, 'train')
+    assert len(labels.boxes) == 1
+    assert len(labels.issues['bad_class']) == 1
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    root = str(tmp_path)
+    _make_split(root)
+    load_labels(root, 'train')
+    path = get_cache_path(root, 'train')
+    for damaged in (open(path, 'rb').read()[:100], b''):     # Truncated, then empty
+        with open(path, 'wb') as f:
+            f.write(damaged)
+        assert len(load_labels(root, 'train').boxes) == 1